@@ -4,7 +4,7 @@ This creates a beautiful, interactive website for our tool.
 """
 
 import streamlit as st
-from content_generator import MarketingContentGenerator
+from generator_service import service
 import time
 
 # Page configuration (makes it look professional)
@@ -15,6 +15,11 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Start loading the generator in the background (shared by all sessions).
+# The page below renders right away; the first click only waits if warm-up
+# hasn't finished yet.
+service.start_warmup()
+
 # Custom CSS to make it look amazing
 st.markdown("""
 <style>
@@ -62,12 +67,12 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Initialize session state (remembers things between clicks)
-if 'generator' not in st.session_state:
-    st.session_state.generator = None
 if 'last_result' not in st.session_state:
     st.session_state.last_result = None
 if 'history' not in st.session_state:
     st.session_state.history = []
+if 'variant' not in st.session_state:
+    st.session_state.variant = 0  # Which of last_result's variants is showing
 
 # Header
 st.markdown('<p class="main-header">✨ Marketing Magic Generator</p>', unsafe_allow_html=True)
@@ -121,6 +126,37 @@ with st.sidebar:
             value=0.7,
             help="0 = strict and predictable, 1 = wild and creative"
         )
+        
+        n_variants = st.slider(
+            "Variants to write",
+            min_value=1,
+            max_value=5,
+            value=1,
+            help="Alternatives from a single request - page through them without waiting again"
+        )
+    
+    # Startup timings (cold = building the generator, warm = what a click waited)
+    with st.expander("⏱️ Startup Timings"):
+        timings = service.timings
+        if "cold_start_seconds" in timings:
+            st.caption(f"Cold start (background): {timings['cold_start_seconds']:.2f}s "
+                       f"(imports {timings['import_seconds']:.2f}s, init {timings['init_seconds']:.2f}s)")
+        else:
+            st.caption("Generator is warming up in the background...")
+        if "last_wait_seconds" in timings:
+            st.caption(f"Last click waited {timings['last_wait_seconds'] * 1000:.0f} ms for warm-up")
+
+    # Token and cost accounting for everything this process generated
+    with st.expander("📈 Token Usage"):
+        if service.is_ready:
+            usage = service.get_generator().usage
+            for row in usage.to_dict()["totals"]:
+                st.caption(f"{row['content_type']} ({row['model']}): {row['requests']} requests, "
+                           f"{row['prompt_tokens']} + {row['completion_tokens']} tokens, ${row['cost']:.4f}")
+            st.download_button("⬇️ Prometheus metrics", usage.to_prometheus(),
+                               file_name="metrics.prom", mime="text/plain")
+        else:
+            st.caption("No usage yet")
 
 # Main content area
 col1, col2 = st.columns([2, 1])
@@ -195,30 +231,21 @@ if st.button("✨ GENERATE MAGIC CONTENT", type="primary", use_container_width=T
         st.error("⚠️ Please fill in both the topic and target audience!")
     else:
         # Show progress
-        progress_bar = st.progress(0)
         status_text = st.empty()
         
         try:
-            # Step 1: Initialize generator
+            # Step 1: Get the generator (usually warm already)
             status_text.text("🚀 Initializing...")
-            progress_bar.progress(10)
-            
-            if st.session_state.generator is None:
-                st.session_state.generator = MarketingContentGenerator()
+            generator = service.get_generator()
             
             # Step 2: Parse key points
-            status_text.text("📝 Analyzing your requirements...")
-            progress_bar.progress(30)
-            
             key_points = [p.strip() for p in key_points_str.split(',') if p.strip()]
             if not key_points:
                 key_points = ["quality", "value"]
             
-            # Step 3: Generate
+            # Step 3: Write the content
             status_text.text("🤖 AI is crafting your content...")
-            progress_bar.progress(50)
-            
-            result = st.session_state.generator.generate(
+            request = dict(
                 content_type=selected_type,
                 topic=topic,
                 tone=tone,
@@ -226,71 +253,95 @@ if st.button("✨ GENERATE MAGIC CONTENT", type="primary", use_container_width=T
                 key_points=key_points,
                 brand_voice=brand_voice if brand_voice else None
             )
-            
-            progress_bar.progress(90)
-            status_text.text("✨ Finalizing...")
+            if n_variants > 1:
+                # One call writes every variant; paging through them is free
+                result = generator.generate(**request, n_variants=n_variants)
+            else:
+                # Stream the content in as the AI writes it
+                stream_box = st.empty()
+                with stream_box.container():
+                    st.markdown("---")
+                    st.subheader("📝 Your Generated Content")
+                    stream = generator.generate_stream(**request)
+                    st.write_stream(iter(stream))
+                result = stream.result
+                stream_box.empty()  # Shown again below, with a copy button
+            status_text.empty()
             
             if result["success"]:
                 # Save to history
                 st.session_state.last_result = result
+                st.session_state.variant = 0
                 st.session_state.history.append({
                     "type": selected_type,
                     "topic": topic,
                     "preview": result["content"][:100] + "..."
                 })
-                
-                progress_bar.progress(100)
-                status_text.empty()
-                progress_bar.empty()
-                
-                # Display success
-                st.success("✅ Content generated successfully!")
-                
-                # Display the content in a nice box
-                st.markdown("---")
-                st.subheader("📝 Your Generated Content")
-                
-                # Copy button
-                st.code(result["content"], language="markdown")
-                
-                # Action buttons
-                col_a, col_b, col_c = st.columns(3)
-                
-                with col_a:
-                    if st.button("📋 Copy to Clipboard", use_container_width=True):
-                        st.write("Copied! (Use Ctrl+C on the text above)")
-                
-                with col_b:
-                    if st.download_button(
-                        label="💾 Download as TXT",
-                        data=result["content"],
-                        file_name=f"{selected_type}_{topic[:20]}.txt",
-                        mime="text/plain",
-                        use_container_width=True
-                    ):
-                        pass
-                
-                with col_c:
-                    if st.button("🔄 Generate Again", use_container_width=True):
-                        st.experimental_rerun()
-                
-                # Stats
-                st.caption(f"Tokens used: {result['tokens_used']} | Cost: ${result['estimated_cost']:.4f} | Model: GPT-4")
-                
-                # Show the prompt (for learning)
-                with st.expander("🔍 See the Prompt Engineering Magic (Advanced)"):
-                    st.text_area("Full Prompt Sent to AI", result["prompt_used"], height=400)
             else:
-                progress_bar.empty()
-                status_text.empty()
                 st.error(f"❌ Generation failed: {result['error']}")
                 
         except Exception as e:
-            progress_bar.empty()
             status_text.empty()
             st.error(f"❌ An error occurred: {str(e)}")
             st.exception(e)
 
+
+def show_next_variant():
+    st.session_state.variant += 1
+
+
+# The latest result stays on screen across clicks (paging, copy, download)
+result = st.session_state.last_result
+if result is not None:
+    variants = result.get("variants", [result["content"]])
+    variant = st.session_state.variant % len(variants)
+    content = variants[variant]
+    
+    st.markdown("---")
+    st.subheader("📝 Your Generated Content")
+    if len(variants) > 1:
+        st.caption(f"Variant {variant + 1} of {len(variants)}")
+    st.code(content, language="markdown")
+    
+    # Display success
+    if "time_to_first_token" in result:
+        st.success(f"✅ Content generated successfully! "
+                   f"(first words after {result['time_to_first_token']:.2f}s)")
+    else:
+        st.success(f"✅ Content generated successfully! ({len(variants)} "
+                   f"variant{'' if len(variants) == 1 else 's'} from one call)")
+    
+    # Action buttons
+    col_a, col_b, col_c = st.columns(3)
+    
+    with col_a:
+        if st.button("📋 Copy to Clipboard", use_container_width=True):
+            st.write("Copied! (Use Ctrl+C on the text above)")
+    
+    with col_b:
+        if st.download_button(
+            label="💾 Download as TXT",
+            data=content,
+            file_name=f"{result['content_type']}_{result['topic'][:20]}.txt",
+            mime="text/plain",
+            use_container_width=True
+        ):
+            pass
+    
+    with col_c:
+        st.button("🔄 Next Variant", use_container_width=True, on_click=show_next_variant,
+                  disabled=len(variants) < 2,
+                  help="Set 'Variants to write' above 1 to get alternatives from one request")
+    
+    # Stats
+    st.caption(f"Tokens used: {result['tokens_used']} ({result['prompt_tokens']} prompt + "
+               f"{result['completion_tokens']} completion) | Cost: ${result['estimated_cost']:.4f} | "
+               f"Model: {result['model']}")
+    
+    # Show the prompt (for learning)
+    with st.expander("🔍 See the Prompt Engineering Magic (Advanced)"):
+        st.text_area("Full Prompt Sent to AI", result["prompt_used"], height=400)
+
 # History section
 if st.session_state.history:
     st.markdown("---")
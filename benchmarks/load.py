@@ -0,0 +1,109 @@
+"""
+Load test: HTTP generation service
+Opens N keep-alive connections to a running server.py and fires generate
+requests as fast as each connection gets answers, then reports throughput,
+latency percentiles and how many requests were turned away (429).
+
+    python fake_llm_server.py --latency 0.2 &
+    LLM_BACKEND_URL=http://127.0.0.1:8001/v1/chat/completions python server.py &
+    python benchmarks/load.py --connections 200 --requests 5000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+CONTENT_TYPES = ("ad_copy", "email_campaigns", "social_media", "blog_posts", "product_descriptions")
+TOPICS = ("running shoes", "coffee subscription", "accounting software", "yoga mats", "smart watch",
+          "meal kits", "project management tool", "electric bike", "noise cancelling headphones")
+
+
+async def one_connection(host, port, path, next_body, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            body = next_body()
+            if body is None:
+                break
+            data = json.dumps(body).encode("utf-8")
+            started = time.perf_counter()
+            writer.write(
+                f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+            )
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                if key.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            statuses[status] += 1
+            if status == 200:
+                latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+
+async def run(url, connections, total, batch, use_cache, seed):
+    parts = urlsplit(url)
+    rng = random.Random(seed)
+    remaining = [total]
+
+    def spec():
+        return {"content_type": rng.choice(CONTENT_TYPES), "topic": f"{rng.choice(TOPICS)} {rng.randint(1, 10**6)}",
+                "target_audience": "load testers"}
+
+    def next_body():
+        if remaining[0] <= 0:
+            return None
+        remaining[0] -= 1
+        if batch:
+            return {"requests": [spec() for _ in range(batch)], "use_cache": use_cache}
+        return {**spec(), "use_cache": use_cache}
+
+    latencies = []
+    statuses = Counter()
+    path = "/generate/batch" if batch else "/generate"
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        one_connection(parts.hostname, parts.port or 80, path, next_body, latencies, statuses)
+        for _ in range(connections)
+    ))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000 if latencies else 0.0
+
+    per_request = batch or 1
+    print(f"📊 {total} requests over {connections} connections in {elapsed:.2f}s")
+    print(f"   statuses: {dict(sorted(statuses.items()))}")
+    print(f"   throughput: {statuses[200] / elapsed:.1f} ok/s ({statuses[200] * per_request / elapsed:.1f} "
+          f"generations/s)")
+    print(f"   latency ms: p50 {percentile(50):.1f} | p90 {percentile(90):.1f} | p99 {percentile(99):.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test a running server.py")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--connections", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1000, help="HTTP requests to send in total")
+    parser.add_argument("--batch", type=int, default=0, help="Send /generate/batch with this many specs each")
+    parser.add_argument("--use-cache", action="store_true", help="Allow response cache hits")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.connections, args.requests, args.batch, args.use_cache, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Memory benchmark: in-memory example representation
+Loads a synthetic corpus the way the database does (json.loads) and
+compares the plain list-of-dicts layout with ExampleColumns, reported as
+MB per million examples.
+
+Run from the project root:  python benchmarks/memory.py --sizes 10000,100000
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.suite import make_corpus
+from columns import ExampleColumns
+
+
+def measure(build):
+    """Bytes still allocated by whatever build() returns"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory use of the example layouts")
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--generated", action="store_true",
+                        help="Give every example generated/model metadata, like app-generated ones")
+    args = parser.parse_args()
+
+    print(f"{'examples':>10}{'dicts MB/M':>14}{'columns MB/M':>15}{'saving':>9}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        corpus, _ = make_corpus(size)
+        if args.generated:
+            for type_examples in corpus.values():
+                for example in type_examples:
+                    example.update({"generated": "true", "model": "gpt-3.5-turbo"})
+        text = json.dumps(corpus)
+        del corpus
+
+        as_dicts, dict_bytes = measure(lambda: json.loads(text))
+        as_columns, column_bytes = measure(
+            lambda: {k: ExampleColumns(v) for k, v in as_dicts.items()}
+        )
+        assert all(list(as_columns[k]) == v for k, v in as_dicts.items())
+        del as_dicts, as_columns
+
+        per_million = 1_000_000 / size / (1024 * 1024)
+        print(f"{size:>10}{dict_bytes * per_million:>14.0f}{column_bytes * per_million:>15.0f}"
+              f"{1 - column_bytes / dict_bytes:>9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Benchmark suite: prompt and storage hot paths
+Synthesizes a corpus of N examples (spread over all five content types),
+then times create_prompt, find_similar_examples, add_example and a full
+generate (offline, with a backend that writes new text every call so the
+database write is never skipped as a duplicate). Each corpus size runs in its own process so peak
+memory is per size.
+
+Run from the project root:
+    python benchmarks/suite.py                          # 1k and 10k
+    python benchmarks/suite.py --sizes 1000,10000,100000,1000000
+    python benchmarks/suite.py --compare benchmarks/results/abc1234.json
+    python benchmarks/suite.py --binary --operations create_prompt   # .corpus store
+
+Results go to benchmarks/results/<commit>.json unless --output is given.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CONTENT_TYPES = ("ad_copy", "email_campaigns", "social_media", "blog_posts", "product_descriptions")
+TONES = ("warm", "professional", "energetic", "excited", "motivational", "helpful", "luxurious")
+AUDIENCES = ("athletes", "coffee lovers", "small business owners", "existing customers",
+             "busy professionals", "professionals", "tech enthusiasts", "students", "parents")
+# Rough word counts per content type, so blog posts are long and ads short
+LENGTHS = {"ad_copy": 30, "email_campaigns": 80, "social_media": 50, "blog_posts": 250,
+           "product_descriptions": 90}
+OPERATIONS = ("create_prompt", "find_similar_examples", "add_example", "generate")
+
+
+def make_vocabulary(rng, size=3000):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(size)]
+
+
+def make_corpus(size, seed=42):
+    """Deterministic synthetic examples: {content_type: [example, ...]}"""
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng)
+    corpus = {content_type: [] for content_type in CONTENT_TYPES}
+    for i in range(size):
+        content_type = CONTENT_TYPES[i % len(CONTENT_TYPES)]
+        words = rng.choices(vocabulary, k=LENGTHS[content_type])
+        corpus[content_type].append({
+            "topic": " ".join(rng.choices(vocabulary, k=2)),
+            "content": " ".join(words),
+            "tone": rng.choice(TONES),
+            "target_audience": rng.choice(AUDIENCES),
+        })
+    return corpus, vocabulary
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+
+def time_operation(fn, iterations, time_budget):
+    """
+    Call fn(i) up to `iterations` times (at least 3, stopping early once
+    time_budget seconds are used up). The first call is timed separately:
+    it often pays for lazy setup (indexes, duplicate detectors).
+    """
+    started = time.perf_counter()
+    fn(0)
+    first = time.perf_counter() - started
+
+    durations = []
+    begin = time.perf_counter()
+    for i in range(1, iterations + 1):
+        started = time.perf_counter()
+        fn(i)
+        durations.append(time.perf_counter() - started)
+        if len(durations) >= 3 and time.perf_counter() - begin > time_budget:
+            break
+    total = sum(durations)
+    durations.sort()
+    return {
+        "iterations": len(durations),
+        "first_call_ms": first * 1000,
+        "ops_per_sec": len(durations) / total if total else None,
+        "mean_ms": total / len(durations) * 1000,
+        "p50_ms": percentile(durations, 50) * 1000,
+        "p99_ms": percentile(durations, 99) * 1000,
+    }
+
+
+def run_size(size, operations, iterations, time_budget, journal, seed, binary=False):
+    """Benchmark one corpus size in this process; returns a list of result rows"""
+    from columns import write_corpus
+    from content_generator import MarketingContentGenerator
+    from database import MarketingDatabase
+    from llm_backends import LLMBackend
+    from prompt_engineer import PromptEngineer
+
+    workdir = tempfile.mkdtemp(prefix="marketing-bench-")
+    quiet = contextlib.redirect_stdout(io.StringIO())
+    try:
+        started = time.perf_counter()
+        corpus, vocabulary = make_corpus(size, seed)
+        if binary:
+            data_file = os.path.join(workdir, "marketing_data.corpus")
+            with open(data_file, 'wb') as f:
+                write_corpus(f, corpus)
+        else:
+            data_file = os.path.join(workdir, "marketing_data.json")
+            with open(data_file, 'w') as f:
+                json.dump(corpus, f)
+        del corpus
+        synth_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with quiet:
+            db = MarketingDatabase(data_file, journal=journal)
+        load_seconds = time.perf_counter() - started
+        rss_after_load = peak_rss_mb()
+
+        rng = random.Random(seed + 1)
+        queries = [
+            {
+                "content_type": rng.choice(CONTENT_TYPES),
+                "topic": " ".join(rng.choices(vocabulary, k=2)),
+                "tone": rng.choice(TONES),
+                "target_audience": rng.choice(AUDIENCES),
+                "key_points": ["quality", "value"],
+            }
+            for _ in range(iterations + 1)
+        ]
+        engineer = PromptEngineer(db, cache=False)
+
+        def new_content(i):
+            return " ".join(rng.choices(vocabulary, k=40)) + f" #{i}"
+
+        class SyntheticBackend(LLMBackend):
+            """Fresh random text per call: demo replies repeat and would all be deduplicated"""
+
+            name = "synthetic"
+            calls = 0
+
+            def complete(self, prompt, content_type, topic, tone):
+                self.calls += 1
+                return {"content": new_content(self.calls), "model": "gpt-3.5-turbo-demo"}
+
+        with quiet:
+            generator = MarketingContentGenerator(backend=SyntheticBackend(), response_cache=False, database=db)
+            generator.prompt_engineer = engineer
+
+        benchmarks = {
+            "create_prompt": lambda i: engineer.create_prompt(**queries[i]),
+            "find_similar_examples": lambda i: db.find_similar_examples(
+                queries[i]["content_type"], queries[i]["topic"], queries[i]["tone"],
+                queries[i]["target_audience"], n_results=6
+            ),
+            "add_example": lambda i: db.add_example(
+                queries[i]["content_type"], new_content(i),
+                {"topic": queries[i]["topic"], "tone": queries[i]["tone"]}
+            ),
+            "generate": lambda i: generator.generate(**queries[i], use_cache=False),
+        }
+
+        rows = []
+        for operation in operations:
+            with quiet:
+                stats = time_operation(benchmarks[operation], iterations, time_budget)
+            rows.append({
+                "size": size,
+                "operation": operation,
+                "journal": journal,
+                "binary": binary,
+                **stats,
+                "synth_seconds": synth_seconds,
+                "load_seconds": load_seconds,
+                "rss_after_load_mb": rss_after_load,
+                "peak_rss_mb": peak_rss_mb(),
+            })
+        with quiet:
+            db.close()
+        return rows
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(old_path, results):
+    with open(old_path, 'r') as f:
+        old = {(row["size"], row["operation"]): row for row in json.load(f)["results"]}
+    print(f"\nCompared with {old_path}:")
+    print(f"{'size':>9} {'operation':<24}{'p50 before':>12}{'p50 now':>10}{'change':>9}")
+    for row in results:
+        before = old.get((row["size"], row["operation"]))
+        if before is None:
+            continue
+        change = row["p50_ms"] / before["p50_ms"] - 1 if before["p50_ms"] else 0.0
+        print(f"{row['size']:>9} {row['operation']:<24}{before['p50_ms']:>12.3f}"
+              f"{row['p50_ms']:>10.3f}{change:>+9.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the prompt and storage hot paths")
+    parser.add_argument("--sizes", default="1000,10000",
+                        help="Comma-separated corpus sizes (e.g. 1000,10000,100000,1000000)")
+    parser.add_argument("--operations", default=",".join(OPERATIONS))
+    parser.add_argument("--iterations", type=int, default=200, help="Timed calls per operation")
+    parser.add_argument("--time-budget", type=float, default=10.0,
+                        help="Stop an operation early after this many seconds")
+    parser.add_argument("--journal", action="store_true", help="Use journal mode for the JSON store")
+    parser.add_argument("--binary", action="store_true", help="Store the corpus as a memory-mapped .corpus file")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Where to write results (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    operations = [op for op in args.operations.split(",") if op]
+    for operation in operations:
+        if operation not in OPERATIONS:
+            parser.error(f"Unknown operation: {operation}")
+
+    if args.worker is not None:
+        rows = run_size(args.worker, operations, args.iterations, args.time_budget, args.journal, args.seed,
+                       args.binary)
+        print(json.dumps(rows))
+        return
+
+    results = []
+    print(f"{'size':>9} {'operation':<24}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'first ms':>10}{'peak MB':>9}{'load s':>8}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        # A fresh process per size, so peak memory isn't carried over
+        command = [sys.executable, os.path.abspath(__file__), "--worker", str(size),
+                   "--operations", ",".join(operations), "--iterations", str(args.iterations),
+                   "--time-budget", str(args.time_budget), "--seed", str(args.seed)]
+        if args.journal:
+            command.append("--journal")
+        if args.binary:
+            command.append("--binary")
+        completed = subprocess.run(command, capture_output=True, text=True, cwd=ROOT)
+        if completed.returncode != 0:
+            print(completed.stderr, file=sys.stderr)
+            sys.exit(f"❌ Benchmark for size {size} failed")
+        rows = json.loads(completed.stdout.strip().splitlines()[-1])
+        for row in rows:
+            peak = f"{row['peak_rss_mb']:.0f}" if row["peak_rss_mb"] is not None else "-"
+            print(f"{row['size']:>9} {row['operation']:<24}{row['ops_per_sec']:>10.1f}"
+                  f"{row['p50_ms']:>10.3f}{row['p99_ms']:>10.3f}{row['first_call_ms']:>10.1f}{peak:>9}{row['load_seconds']:>8.2f}")
+        results.extend(rows)
+
+    commit = git_commit()
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            "meta": {
+                "commit": commit,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "args": {key: value for key, value in vars(args).items() if key != "worker"},
+            },
+            "results": results,
+        }, f, indent=2)
+    print(f"\n💾 Results written to {output}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
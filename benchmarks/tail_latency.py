@@ -0,0 +1,116 @@
+"""
+Tail latency benchmark: retries, hedging and the circuit breaker
+Starts a stand-in LLM server that injects slow replies and 500s, then
+sends the same stream of requests through a bare HTTPBackend, one with
+retries, and one with retries plus hedging, and compares latency
+percentiles and failures. Finishes by pointing a ResilientBackend at a
+dead port to show the circuit breaker failing fast.
+
+Run from the project root:  python benchmarks/tail_latency.py --requests 1000
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_llm_server import FakeLLMServer
+from llm_backends import HTTPBackend
+from resilience import CircuitOpenError, ResilientBackend
+
+
+async def run(backend, total, concurrency):
+    latencies = []
+    failures = 0
+    remaining = [total]
+
+    async def worker():
+        nonlocal failures
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            started = time.perf_counter()
+            try:
+                await backend.acomplete(f"Now create the ad copy #{remaining[0]}", "ad_copy", "shoes", "casual")
+            except Exception:
+                failures += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        backend.close()  # While its event loop is still running
+    return sorted(latencies), failures, time.perf_counter() - started
+
+
+def percentile(latencies, p):
+    return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000 if latencies else 0.0
+
+
+def breaker_demo():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]  # Nothing listens here once the socket closes
+    backend = ResilientBackend(HTTPBackend(f"http://127.0.0.1:{port}/v1/chat/completions"),
+                               retries=0, failure_threshold=5, reset_timeout=30)
+    timings = []
+    for _ in range(10):
+        started = time.perf_counter()
+        try:
+            backend.complete("hello", "ad_copy", "shoes", "casual")
+        except CircuitOpenError:
+            timings.append(("rejected", time.perf_counter() - started))
+        except OSError:
+            timings.append(("refused", time.perf_counter() - started))
+    refused = [t for kind, t in timings if kind == "refused"]
+    rejected = [t for kind, t in timings if kind == "rejected"]
+    print(f"\n🔌 Dead backend: {len(refused)} calls tried and refused, then the circuit opened and "
+          f"{len(rejected)} failed fast ({sum(rejected) / max(1, len(rejected)) * 1e6:.0f} µs each)")
+    print(f"   {backend.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tail latency with retries, hedging and a circuit breaker")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="Usual reply time of the stand-in server")
+    parser.add_argument("--tail-rate", type=float, default=0.03, help="Fraction of slow replies")
+    parser.add_argument("--tail-latency", type=float, default=1.0, help="Seconds a slow reply takes")
+    parser.add_argument("--error-rate", type=float, default=0.02, help="Fraction of replies that are 500s")
+    args = parser.parse_args()
+
+    server = FakeLLMServer(port=0, latency=args.latency, tail_rate=args.tail_rate,
+                           tail_latency=args.tail_latency, error_rate=args.error_rate, seed=7)
+    url = server.start_background()
+    print(f"🧪 {args.requests} requests, {args.concurrency} at a time: {args.latency * 1000:.0f} ms usually, "
+          f"{args.tail_rate:.0%} take {args.tail_latency:.1f}s, {args.error_rate:.0%} fail\n")
+
+    variants = [
+        ("plain", lambda: HTTPBackend(url)),
+        ("retries", lambda: ResilientBackend(HTTPBackend(url), base_backoff=0.02)),
+        ("retries + hedging", lambda: ResilientBackend(HTTPBackend(url), base_backoff=0.02, hedge=True)),
+    ]
+    print(f"{'backend':<20}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'failed':>8}{'sent':>7}  extra")
+    for name, make in variants:
+        backend = make()
+        sent_before = server.requests_served + server.errors_injected
+        latencies, failures, _ = asyncio.run(run(backend, args.requests, args.concurrency))
+        sent = server.requests_served + server.errors_injected - sent_before
+        extra = ""
+        if isinstance(backend, ResilientBackend):
+            stats = backend.stats()
+            extra = f"retries {stats['retries']}, hedges {stats['hedges']} (won {stats['hedge_wins']})"
+        print(f"{name:<20}{percentile(latencies, 50):>9.1f}{percentile(latencies, 95):>9.1f}"
+              f"{percentile(latencies, 99):>9.1f}{latencies[-1] * 1000 if latencies else 0:>9.1f}"
+              f"{failures:>8}{sent:>7}  {extra}")
+
+    breaker_demo()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+Compact Example Storage
+Keeps a content type's examples in columns instead of one dict each, so a
+million examples don't cost a million dicts repeating the same keys.
+
+The same columns can be saved as a binary corpus file and memory-mapped
+back: metadata is read at startup, content only when it is asked for.
+
+    python columns.py marketing_data.json marketing_data.corpus   # convert
+"""
+
+import json
+import mmap
+import os
+import sys
+from array import array
+
+# Metadata with only a handful of distinct values: stored once, referenced by id
+INTERNED = ("tone", "generated", "model")
+# Free text (typed in by users): packed into buffers, never interned
+TEXT_FIELDS = ("topic", "target_audience")
+
+
+class StringPool:
+    """Every distinct string stored once; columns keep small integer ids (0 = missing)"""
+
+    def __init__(self):
+        self.strings = [None]
+        self.ids = {}
+
+    def id_of(self, value):
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+
+class TextColumn:
+    """Strings packed back to back in one UTF-8 buffer, found through offsets"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offsets = array('Q', [0])
+
+    def append(self, text):
+        self.buffer += text.encode("utf-8")
+        self.offsets.append(len(self.buffer))
+
+    def __getitem__(self, index):
+        return self.buffer[self.offsets[index]:self.offsets[index + 1]].decode("utf-8")
+
+    def nbytes(self):
+        return len(self.buffer) + self.offsets.itemsize * len(self.offsets)
+
+
+class MappedTextColumn(TextColumn):
+    """
+    Strings read straight out of a memory-mapped corpus: slicing the map
+    copies nothing, and only pages of strings actually asked for are read
+    from disk. Strings appended later are kept in memory as usual.
+    """
+
+    def __init__(self, mapped, mapped_offsets):
+        super().__init__()
+        self.mapped = mapped                  # memoryview of the file section
+        self.mapped_offsets = mapped_offsets  # memoryview cast to 'Q'
+        self.mapped_count = len(mapped_offsets) - 1
+
+    def __getitem__(self, index):
+        if index < self.mapped_count:
+            return str(self.mapped[self.mapped_offsets[index]:self.mapped_offsets[index + 1]], "utf-8")
+        return super().__getitem__(index - self.mapped_count)
+
+    def nbytes(self):
+        return super().nbytes()  # The mapped part is the OS page cache's, not ours
+
+
+class _FileTextColumn(TextColumn):
+    """Write-only: strings go straight to an open file, only offsets stay in memory"""
+
+    def __init__(self, f):
+        super().__init__()
+        self.f = f
+        self.size = 0
+
+    def append(self, text):
+        data = text.encode("utf-8")
+        self.f.write(data)
+        self.size += len(data)
+        self.offsets.append(self.size)
+
+
+class ExampleColumns:
+    """
+    The examples of one content type, stored column by column.
+
+    Behaves like the list of dicts it replaces: len(), indexing and
+    iteration hand out plain example dicts (built on the fly), and append()
+    takes one. content(i) skips building the dict when only the text is
+    needed. Content, topic and audience live in text buffers; tone,
+    generated and model are interned ids; anything else (rare) is kept
+    per example in `extras`. The string pool belongs to these columns, so
+    it goes away with them when the store is rebuilt.
+    """
+
+    def __init__(self, examples=(), pool=None, content=None):
+        self.pool = StringPool() if pool is None else pool
+        self._content = TextColumn() if content is None else content
+        self._text = {key: TextColumn() for key in TEXT_FIELDS}
+        self._missing = {key: set() for key in TEXT_FIELDS}  # positions whose example lacked the field
+        self._interned = {key: array('I') for key in INTERNED}
+        self.extras = {}             # position -> {key: value} for other metadata
+        self._length = 0
+        for example in examples:
+            self.append(example)
+
+    def __len__(self):
+        return self._length
+
+    def append(self, example):
+        position = self._length
+        extra = {}
+        for key, value in example.items():
+            if key == "content" and isinstance(value, str):
+                continue
+            if key in self._text and isinstance(value, str):
+                continue
+            if key in self._interned and isinstance(value, str):
+                continue
+            extra[key] = value
+
+        content = example.get("content")
+        self._content.append(content if isinstance(content, str) else "")
+        for key, column in self._text.items():
+            value = example.get(key)
+            if isinstance(value, str):
+                column.append(value)
+            else:
+                column.append("")
+                self._missing[key].add(position)
+        for key, column in self._interned.items():
+            value = example.get(key)
+            column.append(self.pool.id_of(value) if isinstance(value, str) else 0)
+
+        if extra:
+            self.extras[position] = extra
+        self._length += 1
+
+    def extend(self, examples):
+        for example in examples:
+            self.append(example)
+
+    def _index(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("example index out of range")
+        return index
+
+    def content(self, index):
+        """The text of one example, without building the whole dict"""
+        index = self._index(index)
+        extra = self.extras.get(index)
+        if extra is not None and "content" in extra:
+            return extra["content"]
+        return self._content[index]
+
+    def __getitem__(self, index):
+        index = self._index(index)
+        extra = self.extras.get(index, {})
+        example = {}
+        if "content" not in extra:
+            example["content"] = self._content[index]
+        for key, column in self._text.items():
+            if index not in self._missing[key]:
+                example[key] = column[index]
+        strings = self.pool.strings
+        for key, column in self._interned.items():
+            string_id = column[index]
+            if string_id:
+                example[key] = strings[string_id]
+        example.update(extra)
+        return example
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self[index]
+
+    def nbytes(self):
+        """Approximate memory held by this type's examples (string pool not included)"""
+        return (
+            self._content.nbytes() + sum(column.nbytes() for column in self._text.values())
+            + sum(column.itemsize * len(column) for column in self._interned.values())
+            + 200 * len(self.extras)  # Rough cost of a small dict
+        )
+
+
+# Binary corpus layout: MAGIC, then one 8-byte aligned section per column
+# (content, content offsets, each text field and its offsets, interned ids)
+# for each content type, then a JSON footer saying where everything is, then
+# the footer's length as 8 little-endian bytes.
+MAGIC = b"MKTCORP2"
+
+
+def _write_section(f, data):
+    f.write(b"\0" * (-f.tell() % 8))
+    start = f.tell()
+    f.write(data)
+    return [start, f.tell()]
+
+
+def write_corpus(f, examples, counts=None):
+    """
+    Write {content_type: examples} to a binary file opened for writing.
+    Content is streamed to the file as it goes. counts limits how many
+    examples of each type are written.
+    """
+    pool = StringPool()  # The file gets its own string ids
+    footer = {"byteorder": sys.byteorder, "types": {}}
+    f.write(MAGIC)
+    for content_type, type_examples in examples.items():
+        count = len(type_examples) if counts is None else counts[content_type]
+        sections = {"count": count}
+        f.write(b"\0" * (-f.tell() % 8))
+        start = f.tell()
+        content = _FileTextColumn(f)
+        columns = ExampleColumns((type_examples[i] for i in range(count)), pool, content)
+        sections["content"] = [start, f.tell()]
+        sections["content_offsets"] = _write_section(f, content.offsets.tobytes())
+        sections["text"] = {
+            key: {
+                "buffer": _write_section(f, column.buffer),
+                "offsets": _write_section(f, column.offsets.tobytes()),
+                "missing": sorted(columns._missing[key]),
+            }
+            for key, column in columns._text.items()
+        }
+        sections["interned"] = {
+            key: _write_section(f, column.tobytes()) for key, column in columns._interned.items()
+        }
+        sections["extras"] = columns.extras
+        footer["types"][content_type] = sections
+    footer["strings"] = pool.strings[1:]
+    data = json.dumps(footer).encode("utf-8")
+    f.write(data)
+    f.write(len(data).to_bytes(8, "little"))
+
+
+def read_corpus(path):
+    """
+    Map a binary corpus file and return {content_type: ExampleColumns}.
+    Only the footer, topics, audiences and interned ids are read now; content stays
+    in the file until someone asks for it. A truncated or corrupt file
+    raises ValueError rather than handing out wrong examples.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < len(MAGIC) + 8:
+            raise ValueError(f"{path} is not an example corpus")
+        mapped = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    if mapped[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not an example corpus")
+    footer_length = int.from_bytes(mapped[-8:], "little")
+    footer_start = len(mapped) - 8 - footer_length
+    if footer_start < len(MAGIC):
+        raise ValueError(f"{path} is truncated or corrupt")
+    try:
+        footer = json.loads(str(mapped[footer_start:-8], "utf-8"))
+    except ValueError:  # Also covers UnicodeDecodeError
+        raise ValueError(f"{path} is truncated or corrupt") from None
+    if footer["byteorder"] != sys.byteorder:
+        raise ValueError(f"{path} was written on a {footer['byteorder']}-endian machine")
+
+    pool = StringPool()
+    for string in footer["strings"]:
+        pool.id_of(string)
+
+    def section(bounds):
+        start, end = bounds
+        if not len(MAGIC) <= start <= end <= footer_start:
+            raise ValueError(f"{path} is truncated or corrupt")
+        return mapped[start:end]
+
+    def copied(bounds, typecode, length):
+        values = array(typecode)
+        values.frombytes(section(bounds))
+        if len(values) != length:
+            raise ValueError(f"{path} is truncated or corrupt")
+        return values
+
+    def offsets(bounds, text, count):
+        values = section(bounds).cast('Q')
+        if len(values) != count + 1 or values[0] != 0 or values[-1] != len(text):
+            raise ValueError(f"{path} is truncated or corrupt")
+        return values
+
+    examples = {}
+    for content_type, sections in footer["types"].items():
+        count = sections["count"]
+        content = section(sections["content"])
+        columns = ExampleColumns(pool=pool, content=MappedTextColumn(
+            content, offsets(sections["content_offsets"], content, count)
+        ))
+        for key, text in sections["text"].items():
+            column = columns._text[key]
+            column.buffer = bytearray(section(text["buffer"]))
+            column.offsets = array('Q')
+            column.offsets.frombytes(offsets(text["offsets"], column.buffer, count).cast('B'))
+            columns._missing[key] = set(text["missing"])
+        columns._interned = {
+            key: copied(bounds, 'I', count) for key, bounds in sections["interned"].items()
+        }
+        columns.extras = {int(position): extra for position, extra in sections["extras"].items()}
+        columns._length = count
+        examples[content_type] = columns
+    return examples
+
+
+# Convert between the JSON and binary formats
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python columns.py <from .json|.corpus> <to .json|.corpus>")
+    source, target = sys.argv[1:]
+    if source.endswith(".corpus"):
+        examples = read_corpus(source)
+    else:
+        with open(source, 'r') as f:
+            examples = json.load(f)
+    if target.endswith(".corpus"):
+        with open(target, 'wb') as f:
+            write_corpus(f, examples)
+    else:
+        with open(target, 'w') as f:
+            json.dump({k: list(v) for k, v in examples.items()}, f, indent=2)
+    print(f"✅ Wrote {sum(len(v) for v in examples.values())} examples to {target}")
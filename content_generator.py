@@ -1,17 +1,46 @@
 """
 Content Generator - DEMO VERSION
 Works without OpenAI API - uses sample content instead!
+Set LLM_BACKEND_URL to talk to an OpenAI-style server instead.
 """
 
+import asyncio
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 from database import MarketingDatabase
 from prompt_engineer import PromptEngineer
-import random
+from llm_backends import DemoBackend, HTTPBackend
+from response_cache import ResponseCache
+from resilience import ResilientBackend
+from scheduler import RateLimitScheduler
+from single_flight import SingleFlight
+from telemetry import UsageTracker, estimate_cost, tracer
+from tokens import count_tokens
 
 # Load secret API key from .env file (not used in demo, but kept for compatibility)
 load_dotenv()
 
+
+class ContentStream:
+    """
+    What generate_stream() / agenerate_stream() return. Iterate it (with
+    `async for` for the async one) to get the text while it is written;
+    once that's done, .result holds the dict generate() would have returned.
+    """
+
+    def __init__(self):
+        self.result = None
+        self.chunks = None
+
+    def __iter__(self):
+        return self.chunks
+
+    def __aiter__(self):
+        return self.chunks
+
+
 class MarketingContentGenerator:
     """
     DEMO VERSION: Shows how the system works without calling OpenAI
@@ -308,108 +337,633 @@ Join 50,000+ happy coffee drinkers. First bag is on us!
         }
     }
     
-    def __init__(self):
+    def __init__(self, backend=None, response_cache=True, database=None, usage_tracker=None,
+                 scheduler=None):
         """
         Setup everything when we create this object.
         DEMO VERSION: Doesn't need OpenAI API key!
+
+        backend: any LLMBackend. Defaults to the demo lookup, or to an
+        HTTPBackend when LLM_BACKEND_URL is set in the environment - wrapped
+        in a ResilientBackend (retries and a circuit breaker; LLM_RETRIES
+        sets how many, LLM_HEDGE=1 adds hedged requests).
+        response_cache: True for the default on-disk cache, a ResponseCache
+        to use a custom one, or False to always call the model.
+        database: a MarketingDatabase or SQLiteMarketingDatabase. By default
+        the JSON one, or SQLite when MARKETING_STORAGE=sqlite.
+        Prompts use the classic layout unless PROMPT_LAYOUT=prefix_stable.
+        usage_tracker: where token and cost accounting goes (a fresh
+        UsageTracker by default). Set METRICS_PORT to serve it over HTTP.
+        scheduler: a RateLimitScheduler that model calls wait on, so we stay
+        under the provider's limits. By default there is one only when
+        LLM_REQUESTS_PER_MINUTE and/or LLM_TOKENS_PER_MINUTE are set.
+        Single requests go in the "interactive" lane, batches in "bulk".
         """
         print("🚀 Initializing Marketing Content Generator [DEMO MODE]...")
         
         # Step 1: Connect to our memory box (database)
         print("📦 Loading database...")
-        self.db = MarketingDatabase()
+        if database is None:
+            if os.getenv("MARKETING_STORAGE") == "sqlite":
+                from sqlite_database import SQLiteMarketingDatabase
+                database = SQLiteMarketingDatabase()
+            else:
+                database = MarketingDatabase()
+        self.db = database
         
         # Step 2: Connect to our recipe creator (prompt engineer)
         print("📝 Loading prompt engineer...")
-        self.prompt_engineer = PromptEngineer(self.db)
+        self.prompt_engineer = PromptEngineer(self.db, layout=os.getenv("PROMPT_LAYOUT", "classic"))
         
-        # DEMO: No OpenAI connection needed!
-        print("🎭 DEMO MODE: Using sample content (no API calls)")
+        # Step 3: Pick who writes the content
+        if backend is None:
+            backend_url = os.getenv("LLM_BACKEND_URL")
+            if backend_url:
+                backend = ResilientBackend(
+                    HTTPBackend(
+                        backend_url,
+                        model=os.getenv("LLM_MODEL", "gpt-3.5-turbo"),
+                        api_key=os.getenv("OPENAI_API_KEY")
+                    ),
+                    retries=int(os.getenv("LLM_RETRIES", "2")),
+                    hedge=os.getenv("LLM_HEDGE") == "1"
+                )
+            else:
+                backend = DemoBackend(self.DEMO_CONTENT)
+        self.backend = backend
+        # With a ResilientBackend, every retry and hedge waits for its own
+        # scheduler turn (see _complete), so the calls go to the one inside
+        self.resilience = backend if isinstance(backend, ResilientBackend) else None
+        
+        # Step 4: Remember answers so duplicate requests are free
+        if response_cache is True:
+            response_cache = ResponseCache()
+        self.response_cache = response_cache or None
+        # Identical requests that arrive together share one model call
+        self.single_flight = SingleFlight()
+        
+        # Step 5: Stay under the provider's rate limits
+        if scheduler is None:
+            requests_per_minute = os.getenv("LLM_REQUESTS_PER_MINUTE")
+            tokens_per_minute = os.getenv("LLM_TOKENS_PER_MINUTE")
+            if requests_per_minute or tokens_per_minute:
+                scheduler = RateLimitScheduler(
+                    requests_per_minute=int(requests_per_minute) if requests_per_minute else None,
+                    tokens_per_minute=int(tokens_per_minute) if tokens_per_minute else None
+                )
+        self.scheduler = scheduler
+        
+        # Step 6: Keep count of tokens and spend
+        self.usage = usage_tracker or UsageTracker()
+        metrics_port = os.getenv("METRICS_PORT")
+        if metrics_port:
+            self.usage.serve(int(metrics_port))
+        
+        if self.backend.name == "demo":
+            # DEMO: No OpenAI connection needed!
+            print("🎭 DEMO MODE: Using sample content (no API calls)")
+        else:
+            print(f"🔌 Using {self.backend.name} backend")
         print("✅ All systems ready!")
         print("-" * 50)
     
     def generate(self, content_type, topic, tone="professional", 
-                 target_audience="general", key_points=None, brand_voice=None):
+                 target_audience="general", key_points=None, brand_voice=None,
+                 use_cache=True, n_variants=1):
         """
         Main function to generate content.
         DEMO VERSION: Returns pre-written sample content.
+        use_cache=False skips the response cache for this call.
+        n_variants > 1 writes that many alternatives from the one prompt in a
+        single backend call; they come back as result["variants"] (the first
+        is also result["content"], and the only one saved as an example).
         """
-        
-        # Default key points if none provided
-        if key_points is None:
-            key_points = ["quality", "value"]
+        spec = self._normalize_request({
+            "content_type": content_type,
+            "topic": topic,
+            "tone": tone,
+            "target_audience": target_audience,
+            "key_points": key_points,
+            "brand_voice": brand_voice
+        })
         
         print(f"🎯 Generating {content_type} about: {topic}")
         print(f"   Tone: {tone} | Audience: {target_audience}")
         
         try:
-            # Step 1: Create the prompt (for display purposes)
-            prompt = self.prompt_engineer.create_prompt(
-                content_type=content_type,
-                topic=topic,
-                tone=tone,
-                target_audience=target_audience,
-                key_points=key_points,
-                brand_voice=brand_voice
-            )
-            
-            # DEMO: Simulate API call delay
-            print("   Sending to OpenAI... [DEMO: Using sample content]")
-            
-            # Get demo content based on type and tone
-            content_by_type = self.DEMO_CONTENT.get(content_type, {})
-            
-            # Try to match tone, fallback to random if not found
-            if tone in content_by_type:
-                generated_content = content_by_type[tone]
-            else:
-                # Get any available tone for this content type
-                available_tones = list(content_by_type.keys())
-                if available_tones:
-                    generated_content = content_by_type[random.choice(available_tones)]
-                else:
-                    generated_content = f"[Demo content for {content_type} with {tone} tone]\n\nThis is sample marketing content. In the real version, OpenAI would generate this based on your topic: {topic}"
-            
-            # Simulate token count (for demo purposes)
-            tokens_used = len(generated_content.split()) * 1.3  # Rough estimate
-            cost = tokens_used * 0.000002  # GPT-3.5-turbo rate
-            
-            # Step 2: Save to database for future learning
-            self.db.add_example(
-                content_type=content_type,
-                content=generated_content,
-                metadata={
-                    "topic": topic,
-                    "tone": tone,
-                    "target_audience": target_audience,
-                    "generated": "true",
-                    "model": "gpt-3.5-turbo-demo"
-                }
-            )
+            with tracer.span("generate"):
+                # Step 1: Create the prompt
+                prompt, cache_key, response = self._prepare(spec, use_cache, n_variants)
+                if response is not None:
+                    print("   ⚡ Served from response cache")
+                    return self._cached_result(spec, prompt, response)
+                
+                print(f"   Sending to {self.backend.name} backend...")
+                response, shared = self._complete(prompt, spec, cache_key, n_variants=n_variants)
+                if shared:
+                    print("   🔗 Shared an identical request's model call")
+                    return self._cached_result(spec, prompt, response, coalesced=True)
+                self._cache_store(cache_key, response)
+                result, example = self._build_result(spec, prompt, response)
+                
+                # Step 2: Save to database for future learning
+                with tracer.span("db_write"):
+                    result["saved_to_db"] = self.db.add_example(*example)
             
-            print(f"   ✅ Generated! [DEMO] (Tokens: {int(tokens_used)}, Cost: ${cost:.4f})")
-            
-            return {
-                "success": True,
-                "content": generated_content,
-                "content_type": content_type,
-                "topic": topic,
-                "tone": tone,
-                "prompt_used": prompt,
-                "tokens_used": int(tokens_used),
-                "estimated_cost": cost,
-                "saved_to_db": True,
-                "demo_mode": True
-            }
+            print(f"   ✅ Generated! (Tokens: {result['prompt_tokens']} in + {result['completion_tokens']} out, "
+                  f"Cost: ${result['estimated_cost']:.4f})")
+            return result
             
         except Exception as e:
             print(f"   ❌ Error: {str(e)}")
-            return {
-                "success": False,
-                "error": str(e),
-                "content_type": content_type,
-                "topic": topic
+            return self._error_result(spec, e)
+
+    def generate_stream(self, content_type, topic, tone="professional",
+                        target_audience="general", key_points=None, brand_voice=None,
+                        use_cache=True):
+        """
+        Like generate(), but the text comes out piece by piece as the model
+        writes it, so the first words show up right away. Returns a
+        ContentStream; result["time_to_first_token"] is that wait in seconds.
+        """
+        spec = self._normalize_request({
+            "content_type": content_type,
+            "topic": topic,
+            "tone": tone,
+            "target_audience": target_audience,
+            "key_points": key_points,
+            "brand_voice": brand_voice
+        })
+        print(f"🎯 Streaming {content_type} about: {topic}")
+        stream = ContentStream()
+        stream.chunks = self._stream(stream, spec, use_cache)
+        return stream
+
+    def _stream(self, stream, spec, use_cache):
+        started = time.perf_counter_ns()
+        try:
+            prompt, cache_key, response = self._prepare(spec, use_cache)
+            if response is not None:
+                stream.result = self._cached_result(spec, prompt, response)
+                stream.result["time_to_first_token"] = (time.perf_counter_ns() - started) / 1e9
+                yield response["content"]
+                return
+
+            response = {}
+            pieces = []
+            first = None
+            for piece in self._stream_model(prompt, spec, response):
+                if first is None:
+                    first = time.perf_counter_ns()
+                    if tracer.enabled:
+                        tracer.record("time_to_first_token", started, first)
+                pieces.append(piece)
+                yield piece
+            result, example = self._stream_result(spec, prompt, cache_key, response, pieces,
+                                                  started, first)
+            with tracer.span("db_write"):
+                result["saved_to_db"] = self.db.add_example(*example)
+            stream.result = result
+        except Exception as e:
+            print(f"   ❌ Error: {str(e)}")
+            stream.result = self._error_result(spec, e)
+
+    def generate_batch(self, requests, max_workers=8, save_to_db=True, use_cache=True):
+        """
+        Generate content for many requests at once.
+
+        `requests` is an iterable of dicts with the same keys as generate().
+        Prompts are built in bulk, model calls run on a bounded thread pool,
+        and results are yielded as soon as each one finishes (completion
+        order - use "request_index" to match them up). All new examples are
+        saved to the database in a single write at the end.
+        Requests found in the response cache are yielded first.
+        """
+        specs = [self._normalize_request(request) for request in requests]
+        print(f"📦 Batch: generating {len(specs)} pieces of content "
+              f"({max_workers} at a time)")
+        prompts, lookups = self._prepare_batch(specs, use_cache)
+
+        new_examples = []
+        flow = object()  # This batch takes turns with other batches
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {}
+            for index, (spec, (cache_key, response)) in enumerate(zip(specs, lookups)):
+                if response is not None:
+                    yield self._cached_result(spec, prompts[index], response, index)
+                    continue
+                future = pool.submit(self._complete, prompts[index], spec, cache_key, "bulk", flow)
+                futures[future] = (index, cache_key)
+            for future in as_completed(futures):
+                index, cache_key = futures[future]
+                try:
+                    response, shared = future.result()
+                except Exception as e:
+                    yield self._error_result(specs[index], e, index)
+                    continue
+                if shared:
+                    yield self._cached_result(specs[index], prompts[index], response, index, coalesced=True)
+                    continue
+                self._cache_store(cache_key, response)
+                yield self._batch_result(specs[index], prompts[index], response, index,
+                                         save_to_db, new_examples)
+        finally:
+            # Also runs if the caller stops reading early
+            pool.shutdown(wait=True, cancel_futures=True)
+            if new_examples:
+                with tracer.span("db_write"):
+                    self.db.add_examples(new_examples)
+                print(f"   ✅ Batch saved {len(new_examples)} new examples")
+
+    async def agenerate(self, content_type, topic, tone="professional",
+                        target_audience="general", key_points=None, brand_voice=None,
+                        timeout=None, use_cache=True, n_variants=1):
+        """
+        asyncio version of generate().
+        The model call is awaited (with an optional timeout in seconds), so
+        one event loop can keep many requests in flight. Prompt building and
+        the response cache touch the disk and the store's lock, so they run
+        on a worker thread like the database write.
+        """
+        spec = self._normalize_request({
+            "content_type": content_type,
+            "topic": topic,
+            "tone": tone,
+            "target_audience": target_audience,
+            "key_points": key_points,
+            "brand_voice": brand_voice
+        })
+        try:
+            with tracer.span("generate"):
+                prompt, cache_key, response = await asyncio.to_thread(
+                    self._prepare, spec, use_cache, n_variants
+                )
+                if response is not None:
+                    return self._cached_result(spec, prompt, response)
+                response, shared = await asyncio.wait_for(
+                    self._acomplete(prompt, spec, cache_key, n_variants=n_variants), timeout
+                )
+                if shared:
+                    return self._cached_result(spec, prompt, response, coalesced=True)
+                await asyncio.to_thread(self._cache_store, cache_key, response)
+                result, example = self._build_result(spec, prompt, response)
+                with tracer.span("db_write"):
+                    result["saved_to_db"] = await asyncio.to_thread(self.db.add_example, *example)
+                return result
+        except asyncio.TimeoutError:
+            return self._error_result(spec, f"Timed out after {timeout}s")
+        except Exception as e:
+            return self._error_result(spec, e)
+
+    def agenerate_stream(self, content_type, topic, tone="professional",
+                         target_audience="general", key_points=None, brand_voice=None,
+                         use_cache=True):
+        """asyncio version of generate_stream() - use `async for` on the result"""
+        spec = self._normalize_request({
+            "content_type": content_type,
+            "topic": topic,
+            "tone": tone,
+            "target_audience": target_audience,
+            "key_points": key_points,
+            "brand_voice": brand_voice
+        })
+        stream = ContentStream()
+        stream.chunks = self._astream(stream, spec, use_cache)
+        return stream
+
+    async def _astream(self, stream, spec, use_cache):
+        started = time.perf_counter_ns()
+        try:
+            prompt, cache_key, response = await asyncio.to_thread(self._prepare, spec, use_cache)
+            if response is not None:
+                stream.result = self._cached_result(spec, prompt, response)
+                stream.result["time_to_first_token"] = (time.perf_counter_ns() - started) / 1e9
+                yield response["content"]
+                return
+
+            response = {}
+            pieces = []
+            first = None
+            async for piece in self._astream_model(prompt, spec, response):
+                if first is None:
+                    first = time.perf_counter_ns()
+                    if tracer.enabled:
+                        tracer.record("time_to_first_token", started, first)
+                pieces.append(piece)
+                yield piece
+            result, example = await asyncio.to_thread(self._stream_result, spec, prompt, cache_key,
+                                                      response, pieces, started, first)
+            with tracer.span("db_write"):
+                result["saved_to_db"] = await asyncio.to_thread(self.db.add_example, *example)
+            stream.result = result
+        except Exception as e:
+            stream.result = self._error_result(spec, e)
+
+    async def agenerate_batch(self, requests, concurrency=100, timeout=None, save_to_db=True,
+                              use_cache=True):
+        """
+        asyncio version of generate_batch().
+
+        At most `concurrency` model calls are in flight at once, each one
+        limited to `timeout` seconds. Results are yielded in completion
+        order. If the caller stops early, unfinished calls are cancelled.
+        """
+        specs = [self._normalize_request(request) for request in requests]
+        prompts, lookups = await asyncio.to_thread(self._prepare_batch, specs, use_cache)
+        semaphore = asyncio.Semaphore(concurrency)
+        flow = object()  # This batch takes turns with other batches
+
+        async def run_one(index, cache_key):
+            spec = specs[index]
+            async with semaphore:
+                try:
+                    response, shared = await asyncio.wait_for(
+                        self._acomplete(prompts[index], spec, cache_key, "bulk", flow), timeout
+                    )
+                    if not shared:
+                        await asyncio.to_thread(self._cache_store, cache_key, response)
+                    return index, response, shared, None
+                except asyncio.TimeoutError:
+                    return index, None, False, f"Timed out after {timeout}s"
+                except Exception as e:
+                    return index, None, False, e
+
+        new_examples = []
+        tasks = []
+        try:
+            for index, (spec, (cache_key, response)) in enumerate(zip(specs, lookups)):
+                if response is not None:
+                    yield self._cached_result(spec, prompts[index], response, index)
+                else:
+                    tasks.append(asyncio.create_task(run_one(index, cache_key)))
+            for next_done in asyncio.as_completed(tasks):
+                index, response, shared, error = await next_done
+                if error is not None:
+                    yield self._error_result(specs[index], error, index)
+                    continue
+                if shared:
+                    yield self._cached_result(specs[index], prompts[index], response, index, coalesced=True)
+                    continue
+                yield self._batch_result(specs[index], prompts[index], response, index,
+                                         save_to_db, new_examples)
+        finally:
+            for task in tasks:
+                task.cancel()
+            if new_examples:
+                with tracer.span("db_write"):
+                    await asyncio.to_thread(self.db.add_examples, new_examples)
+                print(f"   ✅ Batch saved {len(new_examples)} new examples")
+
+    @staticmethod
+    def _normalize_request(request):
+        """Fill in the same defaults generate() uses"""
+        key_points = request.get("key_points")
+        if key_points is None:
+            key_points = ["quality", "value"]
+        return {
+            "content_type": request["content_type"],
+            "topic": request["topic"],
+            "tone": request.get("tone", "professional"),
+            "target_audience": request.get("target_audience", "general"),
+            "key_points": key_points,
+            "brand_voice": request.get("brand_voice"),
+        }
+
+    def _complete(self, prompt, spec, request_key=None, lane="interactive", flow=None, n_variants=1):
+        """
+        Call the model, unless an identical request is already waiting on it:
+        then share that call. Returns (response, shared).
+        """
+        backend = self._model_backend()
+
+        def call():
+            if n_variants > 1:
+                return backend.complete_variants(prompt, spec["content_type"], spec["topic"], spec["tone"],
+                                                 n_variants)
+            return backend.complete(prompt, spec["content_type"], spec["topic"], spec["tone"])
+
+        def turn(send):
+            return self.scheduler.call(send, self._scheduled_tokens(prompt, n_variants), lane, flow)
+
+        gate = None if self.scheduler is None else turn
+
+        def model_call():
+            if self.resilience is not None:
+                return self.resilience.run(call, self._hedge_loser(prompt, spec), gate)
+            return call() if gate is None else gate(call)
+
+        with tracer.span("model_call"):
+            return self.single_flight.do(request_key or self._request_key(spec, n_variants), model_call)
+
+    async def _acomplete(self, prompt, spec, request_key=None, lane="interactive", flow=None, n_variants=1):
+        backend = self._model_backend()
+
+        def call():
+            if n_variants > 1:
+                return backend.acomplete_variants(prompt, spec["content_type"], spec["topic"], spec["tone"],
+                                                  n_variants)
+            return backend.acomplete(prompt, spec["content_type"], spec["topic"], spec["tone"])
+
+        def turn(send):
+            return self.scheduler.acall(send, self._scheduled_tokens(prompt, n_variants), lane, flow)
+
+        gate = None if self.scheduler is None else turn
+
+        def model_call():
+            if self.resilience is not None:
+                return self.resilience.arun(call, self._hedge_loser(prompt, spec), gate)
+            return call() if gate is None else gate(call)
+
+        with tracer.span("model_call"):
+            return await self.single_flight.ado(request_key or self._request_key(spec, n_variants), model_call)
+
+    def _model_backend(self):
+        """Who each single request goes to: the backend, or the one a ResilientBackend wraps"""
+        return self.backend if self.resilience is None else self.resilience.backend
+
+    def _hedge_loser(self, prompt, spec):
+        """Records the spend of a hedged copy whose answer lost the race"""
+        def discarded(response):
+            prompt_tokens, completion_tokens = self._usage(prompt, response)
+            model = response.get("model", "unknown")
+            self.usage.record_discarded(spec["content_type"], model, prompt_tokens, completion_tokens,
+                                        estimate_cost(model, prompt_tokens, completion_tokens))
+        return discarded
+
+    def _scheduled_tokens(self, prompt, n_variants):
+        """Tokens to reserve besides one completion: the prompt, plus the extra variants' completions"""
+        return count_tokens(prompt) + (n_variants - 1) * round(self.scheduler.completion_tokens)
+
+    def _stream_model(self, prompt, spec, response):
+        """The backend's stream, waiting for the scheduler first (every retry again) if there is one"""
+        backend = self._model_backend()
+
+        def stream():
+            return backend.stream(prompt, spec["content_type"], spec["topic"], spec["tone"], response)
+
+        def scheduled():
+            return self.scheduler.stream(stream, count_tokens(prompt), response)
+
+        attempt = stream if self.scheduler is None else scheduled
+        if self.resilience is None:
+            return attempt()
+        return self.resilience.run_stream(attempt)
+
+    def _astream_model(self, prompt, spec, response):
+        backend = self._model_backend()
+
+        def stream():
+            return backend.astream(prompt, spec["content_type"], spec["topic"], spec["tone"], response)
+
+        def scheduled():
+            return self.scheduler.astream(stream, count_tokens(prompt), response)
+
+        attempt = stream if self.scheduler is None else scheduled
+        if self.resilience is None:
+            return attempt()
+        return self.resilience.arun_stream(attempt)
+
+    def _request_key(self, spec, n_variants=1):
+        """
+        Identifies a request for the response cache and for sharing calls.
+        It covers the prompt inputs rather than the finished prompt: every
+        generation adds an example that shows up in the next prompt's few-shot
+        section, so the finished prompt never repeats for a duplicate request.
+        """
+        params = self.backend.cache_params()
+        if n_variants > 1:
+            params = {**params, "variants": n_variants}
+        return ResponseCache.key(self.prompt_engineer.prompt_fingerprint(spec), params)
+
+    def _prepare(self, spec, use_cache, n_variants=1):
+        """
+        Everything before the model call: (prompt, cache key, cached response
+        or None). It reads the store and the response cache, so the async
+        paths run it with asyncio.to_thread.
+        """
+        with tracer.span("build_prompt"):
+            prompt = self.prompt_engineer.create_prompt(**spec)
+        return (prompt, *self._cache_lookup(spec, use_cache, n_variants))
+
+    def _prepare_batch(self, specs, use_cache):
+        """_prepare() for a whole batch: (prompts, [(cache key, cached response or None)])"""
+        with tracer.span("build_prompt"):
+            prompts = self.prompt_engineer.create_prompts(specs)
+        return prompts, [self._cache_lookup(spec, use_cache) for spec in specs]
+
+    def _cache_lookup(self, spec, use_cache, n_variants=1):
+        """Returns (cache key, cached response or None); key is None when caching is off"""
+        if self.response_cache is None or not use_cache:
+            return None, None
+        with tracer.span("cache_lookup"):
+            cache_key = self._request_key(spec, n_variants)
+            return cache_key, self.response_cache.get(cache_key)
+
+    def _cache_store(self, cache_key, response):
+        if cache_key is not None:
+            self.response_cache.put(cache_key, response)
+
+    def _stream_result(self, spec, prompt, cache_key, response, pieces, started, first):
+        """Assemble a finished stream into the usual (result, example to save)"""
+        if not pieces or first is None:
+            raise RuntimeError("The model returned no content")
+        response["content"] = "".join(pieces)
+        response.setdefault("model", "unknown")
+        self._cache_store(cache_key, response)
+        result, example = self._build_result(spec, prompt, response)
+        result["time_to_first_token"] = (first - started) / 1e9
+        return result, example
+
+    def _cached_result(self, spec, prompt, response, index=None, coalesced=False):
+        """
+        A cache hit costs nothing and is already in the database. So is a
+        coalesced request (it shared an identical request's model call).
+        """
+        result, _ = self._build_result(spec, prompt, response, cached=not coalesced, coalesced=coalesced)
+        result["saved_to_db"] = False
+        if index is not None:
+            result["request_index"] = index
+        return result
+
+    @staticmethod
+    def _usage(prompt, response):
+        """
+        (prompt tokens, completion tokens) for a response: what the backend
+        reported, or a local estimate when it didn't say (e.g. demo mode).
+        """
+        usage = response.get("usage")
+        if usage:
+            return usage["prompt_tokens"], usage["completion_tokens"]
+        completions = response.get("variants", [response["content"]])
+        return count_tokens(prompt), sum(count_tokens(text) for text in completions)
+
+    def _build_result(self, spec, prompt, response, cached=False, coalesced=False):
+        """
+        Turn a backend response into (result dict, example to save) and
+        record its usage. Cached and coalesced responses spend no tokens.
+        """
+        generated_content = response["content"]
+        model = response["model"]
+        if cached or coalesced:
+            prompt_tokens = completion_tokens = 0
+            cost = 0.0
+        else:
+            prompt_tokens, completion_tokens = self._usage(prompt, response)
+            cost = estimate_cost(model, prompt_tokens, completion_tokens)
+        self.usage.record(spec["content_type"], model, prompt_tokens, completion_tokens, cost, cached,
+                          coalesced)
+        example = (
+            spec["content_type"],
+            generated_content,
+            {
+                "topic": spec["topic"],
+                "tone": spec["tone"],
+                "target_audience": spec["target_audience"],
+                "generated": "true",
+                "model": model
             }
+        )
+        result = {
+            "success": True,
+            "content": generated_content,
+            "content_type": spec["content_type"],
+            "topic": spec["topic"],
+            "tone": spec["tone"],
+            "prompt_used": prompt,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "tokens_used": prompt_tokens + completion_tokens,
+            "estimated_cost": cost,
+            "saved_to_db": True,
+            "cached": cached,
+            "coalesced": coalesced,
+            "demo_mode": self.backend.name == "demo"
+        }
+        if "variants" in response:
+            result["variants"] = response["variants"]
+        return result, example
+
+    def _batch_result(self, spec, prompt, response, index, save_to_db, new_examples):
+        result, example = self._build_result(spec, prompt, response)
+        if save_to_db:
+            new_examples.append(example)
+        result["saved_to_db"] = save_to_db
+        result["request_index"] = index
+        return result
+
+    def _error_result(self, spec, error, index=None):
+        self.usage.record_error(spec["content_type"])
+        result = {
+            "success": False,
+            "error": str(error),
+            "content_type": spec["content_type"],
+            "topic": spec["topic"]
+        }
+        if index is not None:
+            result["request_index"] = index
+        return result
 
 
 # Test the generator
@@ -438,11 +992,19 @@ if __name__ == "__main__":
         print("-" * 40)
         print(result["content"])
         print("-" * 40)
-        print(f"Tokens used: {result['tokens_used']}")
+        print(f"Tokens used: {result['tokens_used']} "
+              f"({result['prompt_tokens']} prompt + {result['completion_tokens']} completion)")
         print(f"Estimated cost: ${result['estimated_cost']:.4f}")
         print("[DEMO MODE: No actual API call made]")
     else:
         print(f"❌ Error: {result['error']}")
     
+    if tracer.enabled:  # MARKETING_TRACE=1
+        print("\n⏱️ Stage timings:")
+        for stage, stats in tracer.summary().items():
+            print(f"  {stage}: p50 {stats['p50_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms ({stats['count']}x)")
+        tracer.dump_chrome_trace("trace.json")
+        print("  Chrome trace written to trace.json")
+    
     print("\n✅ Test complete! [DEMO MODE]")
     print("\n💡 To use real OpenAI: Add payment method at platform.openai.com")
\ No newline at end of file
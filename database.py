@@ -5,52 +5,45 @@ Uses JSON files instead of ChromaDB (no big downloads!)
 
 import json
 import os
+import threading
+import time
 from datetime import datetime
 
-class MarketingDatabase:
-    """
-    Simple file-based database that works immediately!
-    No downloads, no waiting, no problems.
-    """
-    
-    def __init__(self):
-        print("📦 Opening the memory box...")
-        self.data_file = "marketing_data.json"
-        self.examples = self._load_examples()
-        print("✅ Memory box ready!")
-    
-    def _load_examples(self):
-        """Load examples from file or create default ones"""
-        if os.path.exists(self.data_file):
-            with open(self.data_file, 'r') as f:
-                return json.load(f)
-        
-        # Default examples - these are our "memory"
-        examples = {
-            "ad_copy": [
-                {
-                    "topic": "running shoes",
-                    "content": "🏃‍♂️ Run Faster, Feel Lighter. Our cloud-foam technology makes every step feel like flying. 30-day comfort guarantee or your money back!",
-                    "tone": "energetic",
-                    "target_audience": "athletes"
-                },
-                {
-                    "topic": "coffee subscription",
-                    "content": "☕ Fresh beans delivered before you wake up. Ethically sourced from local farmers. Roasted to order. Your perfect morning starts here. First bag free!",
-                    "tone": "warm",
-                    "target_audience": "coffee lovers"
-                },
-                {
-                    "topic": "accounting software",
-                    "content": "Cut your bookkeeping time by 70%. Automated invoicing, expense tracking, and tax reports. Trusted by 50,000+ small businesses. Start free trial today.",
-                    "tone": "professional",
-                    "target_audience": "small business owners"
-                }
-            ],
-            "email_campaigns": [
-                {
-                    "topic": "product launch",
-                    "content": """Subject: It's here (and selling out fast!)
+from columns import ExampleColumns, read_corpus, write_corpus
+from dedup import DuplicateDetector
+from file_lock import FileLock
+from journal import ExampleJournal
+from retrieval import BM25Index
+from telemetry import tracer
+
+
+def default_examples():
+    """The starter examples a new database begins with - our "memory"."""
+    return {
+        "ad_copy": [
+            {
+                "topic": "running shoes",
+                "content": "🏃‍♂️ Run Faster, Feel Lighter. Our cloud-foam technology makes every step feel like flying. 30-day comfort guarantee or your money back!",
+                "tone": "energetic",
+                "target_audience": "athletes"
+            },
+            {
+                "topic": "coffee subscription",
+                "content": "☕ Fresh beans delivered before you wake up. Ethically sourced from local farmers. Roasted to order. Your perfect morning starts here. First bag free!",
+                "tone": "warm",
+                "target_audience": "coffee lovers"
+            },
+            {
+                "topic": "accounting software",
+                "content": "Cut your bookkeeping time by 70%. Automated invoicing, expense tracking, and tax reports. Trusted by 50,000+ small businesses. Start free trial today.",
+                "tone": "professional",
+                "target_audience": "small business owners"
+            }
+        ],
+        "email_campaigns": [
+            {
+                "topic": "product launch",
+                "content": """Subject: It's here (and selling out fast!)
 
 Hey [Name],
 
@@ -66,14 +59,14 @@ Cheers,
 The Team
 
 P.S. Only 100 units available at this price.""",
-                    "tone": "excited",
-                    "target_audience": "existing customers"
-                }
-            ],
-            "social_media": [
-                {
-                    "topic": "fitness app",
-                    "content": """Transform your commute into a workout 🚴‍♀️
+                "tone": "excited",
+                "target_audience": "existing customers"
+            }
+        ],
+        "social_media": [
+            {
+                "topic": "fitness app",
+                "content": """Transform your commute into a workout 🚴‍♀️
 
 5-minute exercises you can do anywhere:
 • On the bus
@@ -85,14 +78,14 @@ No equipment needed. No excuses.
 What's your biggest barrier to working out? 👇
 
 #Fitness #QuickWorkout #HealthyLife #NoExcuses""",
-                    "tone": "motivational",
-                    "target_audience": "busy professionals"
-                }
-            ],
-            "blog_posts": [
-                {
-                    "topic": "productivity tips",
-                    "content": """# 5 Productivity Hacks That Actually Work
+                "tone": "motivational",
+                "target_audience": "busy professionals"
+            }
+        ],
+        "blog_posts": [
+            {
+                "topic": "productivity tips",
+                "content": """# 5 Productivity Hacks That Actually Work
 
 ## Introduction
 We all have the same 24 hours. Why do some people get 10x more done? It's not about working harder—it's about working smarter.
@@ -110,14 +103,14 @@ Steve Jobs wore the same outfit daily. Reduce trivial choices.
 Pick ONE hack to implement this week. Master it before adding others.
 
 What's your favorite productivity tip? Share below!""",
-                    "tone": "helpful",
-                    "target_audience": "professionals"
-                }
-            ],
-            "product_descriptions": [
-                {
-                    "topic": "wireless headphones",
-                    "content": """Experience silence like never before. 
+                "tone": "helpful",
+                "target_audience": "professionals"
+            }
+        ],
+        "product_descriptions": [
+            {
+                "topic": "wireless headphones",
+                "content": """Experience silence like never before. 
 
 Active noise cancellation blocks 95% of ambient sound—perfect for focus at work or peace on your commute.
 
@@ -128,46 +121,544 @@ Memory foam ear cups mold to your ears for all-day comfort.
 ⭐⭐⭐⭐⭐ "Best headphones under $200" - TechReview
 
 Perfect for: Commuters, remote workers, audiophiles who value comfort.""",
-                    "tone": "luxurious",
-                    "target_audience": "tech enthusiasts"
-                }
-            ]
-        }
+                "tone": "luxurious",
+                "target_audience": "tech enthusiasts"
+            }
+        ]
+    }
+
+
+class MarketingDatabase:
+    """
+    Simple file-based database that works immediately!
+    No downloads, no waiting, no problems.
+    """
+    
+    def __init__(self, data_file="marketing_data.json", journal=False, compact_every=500,
+                 retrieval="bm25", dedup=True, dedup_threshold=0.85, reload_interval=1.0):
+        """
+        journal=True turns on append-only storage: new examples go to a
+        small log file instead of rewriting the whole JSON file, and the
+        log is folded back into the JSON snapshot in the background every
+        `compact_every` inserts.
+
+        retrieval picks how similar examples are found: "bm25" (keyword
+        index, default) or "embedding" (hashing embeddings, needs numpy).
+
+        dedup=True skips new examples that are exact or near copies
+        (similarity >= dedup_threshold) of one already stored.
+
+        Several processes can share one data file: writes happen under a
+        lock file, and each process picks up examples the others added
+        (reads check for them at most every `reload_interval` seconds).
+
+        A data_file ending in .corpus is kept in the binary format from
+        columns.py instead of JSON: it is memory-mapped, so opening it only
+        reads metadata and content is read when a prompt needs it.
+        (Rewriting a mapped file needs POSIX; Windows won't replace it.)
+        """
+        print("📦 Opening the memory box...")
+        self.data_file = data_file
+        self.binary = data_file.endswith(".corpus")
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        self._compactor = None
+        self._listeners = []
+        self.dedup = dedup
+        self.dedup_threshold = dedup_threshold
+        self._detectors = {}  # Built lazily - only needed once we insert
+
+        # Cross-process coordination: the lock file serializes writers, the
+        # generation file ("epoch generation") tells readers something changed
+        self.reload_interval = reload_interval
+        self._write_lock = FileLock(self.data_file + ".lock")
+        self._generation_file = self.data_file + ".gen"
+        self._snapshot_stat = None
+        self._last_refresh = time.monotonic()
+
+        self.journal = None
+        leftover = False
+        if journal:
+            base = os.path.splitext(self.data_file)[0]
+            self.journal = ExampleJournal(base + ".journal.jsonl")
+            self._compacting_file = base + ".journal.compacting.jsonl"
+            self._compact_lock = FileLock(base + ".journal.compact.lock")
+
+        with self._lock, self._write_lock:
+            self.examples = self._load_examples()
+            if self.journal is not None:
+                leftover = self._replay_journal()
+            # Kept column by column in memory (see columns.py), not as dicts
+            self._columnize(self.examples)
+            self._epoch, self._generation = self._read_generation()
+
+        if retrieval not in ("bm25", "embedding"):
+            raise ValueError(f"Unknown retrieval mode: {retrieval}")
+        self.retrieval = retrieval
+        self.indexes = {}
+        self.embedding_store = None
+        self._build_indexes()
+        if leftover:
+            # A compaction was interrupted - finish it now
+            self.compact(wait=True)
+        print("✅ Memory box ready!")
+    
+    def _build_indexes(self, rebuild=False):
+        """
+        Start retrieval over. Each content type is indexed on its first
+        search, so opening the database doesn't read every example.
+        rebuild=True re-embeds the shared embedding files right away
+        (examples were removed, so their rows no longer line up).
+        """
+        self.indexes = {}
+        if self.retrieval != "embedding":
+            return
+        if self.embedding_store is None:
+            from embeddings import EmbeddingStore
+            base = os.path.splitext(self.data_file)[0]
+            self.embedding_store = EmbeddingStore(base + ".embeddings")
+        if rebuild:
+            for content_type, type_examples in self.examples.items():
+                self.embedding_store.sync(
+                    content_type, [self._index_fields(example) for example in type_examples], rebuild=True
+                )
+                self.indexes[content_type] = self.embedding_store
+
+    def _index_for(self, content_type):
+        """The search index for a content type, built the first time it is needed"""
+        index = self.indexes.get(content_type)
+        if index is not None:
+            return index
+        with self._lock:  # Inserts wait, so none are missed while building
+            index = self.indexes.get(content_type)
+            if index is None:
+                fields = (self._index_fields(example) for example in self.examples.get(content_type, ()))
+                if self.embedding_store is not None:
+                    self.embedding_store.sync(content_type, list(fields))
+                    index = self.embedding_store
+                else:
+                    index = BM25Index()
+                    index.build(enumerate(fields))
+                self.indexes[content_type] = index
+        return index
+
+    def _load_examples(self):
+        """Load examples from file or create default ones"""
+        if os.path.exists(self.data_file):
+            return self._read_snapshot()
         
+        examples = default_examples()
         self._save_examples(examples)
         return examples
     
+    def _read_snapshot(self):
+        if self.binary:
+            self._snapshot_stat = self._stat_snapshot()
+            return read_corpus(self.data_file)
+        with open(self.data_file, 'r') as f:
+            self._snapshot_stat = self._stat_snapshot(f.fileno())
+            return json.load(f)
+
+    def _stat_snapshot(self, fd=None):
+        """Identifies one version of the snapshot file (it is only ever replaced whole)"""
+        try:
+            st = os.fstat(fd) if fd is not None else os.stat(self.data_file)
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    @staticmethod
+    def _columnize(examples):
+        """Turn any plain lists of example dicts into ExampleColumns (in place)"""
+        for content_type, type_examples in examples.items():
+            if not isinstance(type_examples, ExampleColumns):
+                examples[content_type] = ExampleColumns(type_examples)
+        return examples
+
+    def _type_examples(self, content_type):
+        type_examples = self.examples.get(content_type)
+        if type_examples is None:
+            type_examples = self.examples[content_type] = ExampleColumns()
+        return type_examples
+
+    def _write_temp(self, examples, counts=None):
+        """
+        Write examples to a temp file of our own and return its path.
+        One example per line: still easy to read, but written one at a time
+        with the fast (C) encoder, and columns never have to become one big
+        list of dicts. counts limits how many examples of each type are written.
+        Binary (.corpus) data files get the binary format instead.
+        """
+        tmp_file = f"{self.data_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if self.binary:
+            with open(tmp_file, 'wb') as f:
+                write_corpus(f, examples, counts)
+                f.flush()
+                os.fsync(f.fileno())
+            return tmp_file
+        with open(tmp_file, 'w') as f:
+            f.write("{")
+            for n, (content_type, type_examples) in enumerate(examples.items()):
+                count = len(type_examples) if counts is None else counts[content_type]
+                f.write(("," if n else "") + "\n  " + json.dumps(content_type) + ": [")
+                for i in range(count):
+                    f.write(("," if i else "") + "\n    " + json.dumps(type_examples[i]))
+                f.write("\n  ]" if count else "]")
+            f.write("\n}" if examples else "}")
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp_file
+
     def _save_examples(self, examples):
-        """Save examples to file"""
-        with open(self.data_file, 'w') as f:
-            json.dump(examples, f, indent=2)
+        """
+        Save examples to file.
+        Writes to a temp file first and swaps it in, so a crash mid-write
+        never leaves a half-written database behind. Call with the write
+        lock held.
+        """
+        with tracer.span("db.save_examples"):
+            os.replace(self._write_temp(examples), self.data_file)
+            self._snapshot_stat = self._stat_snapshot()
+
+    def _read_generation(self):
+        try:
+            with open(self._generation_file, 'r') as f:
+                epoch, generation = f.read().split()
+            return int(epoch), int(generation)
+        except (OSError, ValueError):
+            return 0, 0
+
+    def _bump_generation(self, new_epoch=False):
+        """
+        Tell other processes the examples changed. The epoch only moves when
+        existing examples were removed (positions changed), so readers know
+        they can't just append what is new. Call with the write lock held.
+        """
+        epoch = self._epoch + 1 if new_epoch else self._epoch
+        generation = self._generation + 1
+        tmp_file = f"{self._generation_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w') as f:
+            f.write(f"{epoch} {generation}\n")
+        os.replace(tmp_file, self._generation_file)
+        self._epoch, self._generation = epoch, generation
+
+    def _replay_journal(self):
+        """
+        Bring the snapshot up to date with the journal after startup.
+        Returns True if an interrupted compaction needs finishing.
+        """
+        leftover = os.path.exists(self._compacting_file)
+        applied = ExampleJournal.replay(self._compacting_file, self.examples)
+        applied += ExampleJournal.replay(self.journal.path, self.examples)
+        if applied:
+            print(f"🔁 Replayed {applied} journal entries")
+        return leftover
+
+    def _sync(self):
+        """
+        Pick up examples other processes wrote since we last looked.
+        Call with the write lock held. Returns the content types that changed.
+
+        Usually only new examples were appended, so they are indexed on top
+        of what we have. With the journal on, the snapshot isn't even
+        re-read unless another process compacted it in the meantime.
+        """
+        state = self._read_generation()
+        if state == (self._epoch, self._generation):
+            return set()
+
+        before = {content_type: len(v) for content_type, v in self.examples.items()}
+        if self.journal is not None and self._stat_snapshot() == self._snapshot_stat:
+            fresh = self.examples
+        else:
+            fresh = self._read_snapshot()
+        if self.journal is not None:
+            ExampleJournal.replay(self._compacting_file, fresh)
+            ExampleJournal.replay(self.journal.path, fresh)
+            self.journal.recount()
+            if fresh is self.examples:
+                self._columnize(fresh)  # Replay adds new content types as lists
+
+        if state[0] != self._epoch:
+            # Examples were removed elsewhere - positions moved, start over
+            self.examples = self._columnize(fresh)
+            self._detectors = {}
+            self._build_indexes()
+            changed = set(fresh)
+        else:
+            changed = set()
+            for content_type, type_examples in fresh.items():
+                ours = self._type_examples(content_type)
+                for position in range(before.get(content_type, 0), len(type_examples)):
+                    example = type_examples[position]
+                    if ours is not type_examples:
+                        ours.append(example)
+                    self._index_example(content_type, position, example)
+                    detector = self._detectors.get(content_type)
+                    if detector is not None:
+                        detector.add(position, example.get("content", ""))
+                    changed.add(content_type)
+        self._epoch, self._generation = state
+        return changed
+
+    def refresh(self, force=False):
+        """
+        Load examples other processes added. Cheap when nothing changed
+        (one tiny file read); rate-limited by reload_interval unless force.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_refresh < self.reload_interval:
+            return
+        self._last_refresh = now
+        if self._read_generation() == (self._epoch, self._generation):
+            return
+        with self._lock, self._write_lock:
+            changed = self._sync()
+        self._notify(changed)
+
+    def compact(self, wait=False):
+        """
+        Fold the journal into the JSON snapshot on a background thread.
+        wait=True blocks until everything journaled so far is folded in.
+        """
+        if self.journal is None:
+            return
+        with self._lock:
+            running = self._compactor
+            if running is not None and running.is_alive():
+                if not wait:
+                    return
+            else:
+                running = None
+        if running is not None:
+            running.join()  # It may have rotated before our latest inserts
+        with self._lock:
+            if self._compactor is None or not self._compactor.is_alive():
+                self._compactor = threading.Thread(target=self._run_compaction, daemon=True)
+                self._compactor.start()
+            compactor = self._compactor
+        if wait:
+            compactor.join()
+
+    def _run_compaction(self):
+        """
+        Only one process compacts at a time. The journal is rotated under
+        the write lock (cheap), the snapshot is written without it, and the
+        finished file is swapped in under it again.
+        """
+        with self._compact_lock:
+            with self._lock, self._write_lock:
+                changed = self._sync()
+                if not os.path.exists(self._compacting_file) and not self.journal.recount():
+                    snapshot = None  # Nothing journaled since the last compaction
+                else:
+                    epoch = self._epoch
+                    if not os.path.exists(self._compacting_file):
+                        self.journal.rotate(self._compacting_file)
+                    # Columns only ever grow, so remembering the lengths is enough;
+                    # replaced columns (duplicate removal) stay intact for us
+                    snapshot = dict(self.examples)
+                    counts = {k: len(v) for k, v in snapshot.items()}
+
+            if snapshot is not None:
+                tmp_file = self._write_temp(snapshot, counts)
+
+                with self._lock, self._write_lock:
+                    if self._read_generation()[0] != epoch:
+                        # Duplicates were removed meanwhile - this snapshot is stale
+                        os.remove(tmp_file)
+                    else:
+                        os.replace(tmp_file, self.data_file)
+                        self._snapshot_stat = self._stat_snapshot()
+                        os.remove(self._compacting_file)
+        self._notify(changed)
+
+    def close(self):
+        """Wait for any background compaction and close the journal"""
+        if self._compactor is not None:
+            self._compactor.join()
+        if self.journal is not None:
+            self.journal.close()
     
+    @staticmethod
+    def _index_fields(example):
+        """The parts of an example that retrieval looks at"""
+        return {
+            "topic": example.get("topic", ""),
+            "target_audience": example.get("target_audience", ""),
+            "tone": example.get("tone", ""),
+            "content": example.get("content", ""),
+        }
+
+    def _index_example(self, content_type, position, example):
+        """Add one example to the search index for its content type"""
+        index = self.indexes.get(content_type)
+        if index is None:
+            return  # Not searched yet - it gets indexed with the rest on first search
+        if self.embedding_store is not None:
+            self.embedding_store.add(content_type, self._index_fields(example), position)
+        else:
+            index.add(position, self._index_fields(example))
+
     def find_similar_examples(self, content_type, topic, tone=None, target_audience=None, n_results=3):
-        """Find examples by type - returns matching content"""
+        """Find the examples that best match the topic, tone and audience"""
+        query = {"topic": topic, "tone": tone, "target_audience": target_audience}
+        return self.find_similar_examples_batch(content_type, [query], n_results)[0]
+
+    def find_similar_examples_batch(self, content_type, queries, n_results=3):
+        """
+        Same as find_similar_examples for many requests at once.
+        Each query is a dict with topic, tone and target_audience.
+        With embedding retrieval the whole batch is one matrix multiply.
+        """
+        self.refresh()
         type_examples = self.examples.get(content_type, [])
         if not type_examples:
-            return []
-        
-        # Return first n examples of this type
-        return [ex["content"] for ex in type_examples[:n_results]]
+            return [[] for _ in queries]
+
+        index = self._index_for(content_type)
+        with tracer.span("db.search"):
+            if self.embedding_store is not None:
+                hits_list = self.embedding_store.search_batch(content_type, queries, n_results)
+            else:
+                hits_list = [
+                    index.search(" ".join(part for part in query.values() if part), n_results)
+                    for query in queries
+                ]
+        return [self._contents_for_hits(type_examples, hits, n_results) for hits in hits_list]
+
+    @staticmethod
+    def _contents_for_hits(type_examples, hits, n_results):
+        # Rows past the end belong to examples another process added since
+        # our last refresh
+        positions = [position for position, _ in hits if position < len(type_examples)]
+
+        # Not enough matches - top up with the first examples of this type
+        if len(positions) < n_results:
+            seen = set(positions)
+            for position in range(len(type_examples)):
+                if len(positions) >= n_results:
+                    break
+                if position not in seen:
+                    positions.append(position)
+
+        return [type_examples.content(position) for position in positions]
     
+    def first_examples(self, content_type, n_results=3):
+        """The oldest examples of a content type - the same ones every time, whatever the request"""
+        self.refresh()
+        type_examples = self.examples.get(content_type, [])
+        return [type_examples.content(position) for position in range(min(n_results, len(type_examples)))]
+
     def add_example(self, content_type, content, metadata):
-        """Add new example to our memory"""
-        if content_type not in self.examples:
-            self.examples[content_type] = []
-        
-        self.examples[content_type].append({
-            "content": content,
-            **metadata
-        })
-        self._save_examples(self.examples)
+        """Add new example to our memory (returns False if it was a duplicate)"""
+        if not self.add_examples([(content_type, content, metadata)]):
+            print(f"♻️ Skipped duplicate example for {content_type}")
+            return False
         print(f"✅ Added new example to {content_type}")
         return True
+
+    def add_examples(self, items):
+        """
+        Add many (content_type, content, metadata) examples with one write.
+        Used by batch generation so a campaign costs one save, not thousands.
+        Returns how many were actually added (duplicates are skipped).
+        """
+        with self._lock, self._write_lock:
+            changed = self._sync()
+            added = []
+            for content_type, content, metadata in items:
+                type_examples = self._type_examples(content_type)
+                position = len(type_examples)
+                if self.dedup and self._detector(content_type).add_if_new(position, content):
+                    continue
+                example = {
+                    "content": content,
+                    **metadata
+                }
+                type_examples.append(example)
+                self._index_example(content_type, position, example)
+                added.append((content_type, position, example))
+
+            if added:
+                if self.journal is not None:
+                    with tracer.span("db.journal_append"):
+                        self.journal.append_many(added)
+                else:
+                    self._save_examples(self.examples)
+                self._bump_generation()
+
+        if self.journal is not None and self.journal.entries >= self.compact_every:
+            self.compact()
+        self._notify(changed | {content_type for content_type, _, _ in added})
+        return len(added)
+
+    def _detector(self, content_type):
+        detector = self._detectors.get(content_type)
+        if detector is None:
+            detector = self._detectors[content_type] = DuplicateDetector(self.dedup_threshold)
+            type_examples = self.examples.get(content_type, ())
+            for position in range(len(type_examples)):
+                detector.add(position, type_examples.content(position))
+        return detector
+
+    def remove_duplicates(self, dry_run=False):
+        """
+        One-shot cleanup: drop every example that duplicates an earlier one.
+        Returns {content_type: number removed}.
+        """
+        with self._lock, self._write_lock:
+            changed = self._sync()
+            removed = {}
+            cleaned = {}
+            detectors = {}
+            for content_type, type_examples in self.examples.items():
+                detector = DuplicateDetector(self.dedup_threshold)
+                kept = ExampleColumns()
+                for example in type_examples:
+                    if detector.add_if_new(len(kept), example.get("content", "")) is None:
+                        kept.append(example)
+                cleaned[content_type] = kept
+                detectors[content_type] = detector
+                if len(kept) < len(type_examples):
+                    removed[content_type] = len(type_examples) - len(kept)
+
+            if dry_run or not removed:
+                self._notify(changed)
+                return removed
+            self.examples = cleaned
+            self._detectors = detectors
+            self._save_examples(self.examples)
+            if self.journal is not None:
+                # Everything journaled is in the new snapshot already
+                for journal_file in (self._compacting_file, self.journal.path):
+                    if os.path.exists(journal_file):
+                        os.remove(journal_file)
+                self.journal.entries = 0
+            self._bump_generation(new_epoch=True)
+            self._build_indexes(rebuild=True)
+
+        self._notify(changed | set(removed))
+        return removed
+
+    def _notify(self, content_types):
+        for content_type in content_types:
+            for callback in self._listeners:
+                callback(content_type)
+
+    def add_listener(self, callback):
+        """Call callback(content_type) whenever that type's examples change"""
+        self._listeners.append(callback)
     
     def get_stats(self):
         """Show how many examples in each category"""
+        self.refresh()
         return {k: len(v) for k, v in self.examples.items()}
 
+    def memory_usage(self):
+        """Approximate bytes held by the in-memory examples, per content type"""
+        return {k: v.nbytes() for k, v in self.examples.items()}
+
 
 # Test the database
 if __name__ == "__main__":
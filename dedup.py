@@ -0,0 +1,148 @@
+"""
+Duplicate Detection for Stored Examples
+Keeps the memory box from filling up with the same ad copy over and over.
+
+One-shot cleanup of an existing corpus:
+    python dedup.py                    # clean marketing_data.json
+    python dedup.py --dry-run          # only report what would be removed
+"""
+
+import argparse
+import hashlib
+import operator
+import os
+import re
+
+WHITESPACE = re.compile(r"\s+")
+MASK_64 = (1 << 64) - 1
+SHINGLE_SIZE = 5
+
+
+def normalize(content):
+    """Case and spacing differences don't make a new example"""
+    return WHITESPACE.sub(" ", content).strip().lower()
+
+
+def content_hash(content):
+    return hashlib.sha1(normalize(content).encode("utf-8")).hexdigest()
+
+
+class DuplicateDetector:
+    """
+    Exact + near-duplicate detection for one content type.
+
+    Exact duplicates are caught by hashing the normalized text. Near
+    duplicates use MinHash over character 5-grams (word shingles are too
+    coarse for short ad copy), computed with one-permutation hashing (one
+    hash per shingle, split into `num_perm` bins), and an LSH table of
+    `bands` bands so only likely matches are compared. 8 bands of 8 rows
+    catch ~92% of pairs at 0.85 similarity while rarely pairing up
+    templated copy that is only ~60% alike.
+    """
+
+    def __init__(self, threshold=0.85, num_perm=64, bands=8):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._exact = {}        # content hash -> position
+        self._signatures = {}   # position -> minhash signature
+        self._buckets = {}      # (band, band values) -> [positions]
+
+    def signature(self, content):
+        text = normalize(content)
+        if len(text) > SHINGLE_SIZE:
+            shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+        else:
+            shingles = {text}
+
+        # hash() is fine here: signatures only live as long as the process
+        k = self.num_perm
+        bins = [None] * k
+        for shingle in shingles:
+            h = hash(shingle) & MASK_64
+            slot, value = h % k, h // k
+            if bins[slot] is None or value < bins[slot]:
+                bins[slot] = value
+
+        # Densify: empty bins borrow from the next filled bin
+        for i in range(k):
+            if bins[i] is None:
+                for step in range(1, k):
+                    borrowed = bins[(i + step) % k]
+                    if borrowed is not None:
+                        bins[i] = borrowed + step
+                        break
+        return bins
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, tuple(signature[start:start + self.rows])
+
+    def similarity(self, first, second):
+        """Estimated Jaccard similarity of two signatures"""
+        return sum(map(operator.eq, first, second)) / self.num_perm
+
+    def find(self, content, signature=None):
+        """
+        Return ("exact" or "near", position of the original) for a duplicate,
+        or None if the content is new.
+        """
+        position = self._exact.get(content_hash(content))
+        if position is not None:
+            return "exact", position
+
+        signature = signature or self.signature(content)
+        checked = set()
+        for key in self._band_keys(signature):
+            for candidate in self._buckets.get(key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                if self.similarity(signature, self._signatures[candidate]) >= self.threshold:
+                    return "near", candidate
+        return None
+
+    def add(self, position, content, signature=None):
+        self._exact.setdefault(content_hash(content), position)
+        signature = signature or self.signature(content)
+        self._signatures[position] = signature
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, []).append(position)
+
+    def add_if_new(self, position, content):
+        """add() unless it's a duplicate; returns what find() returned"""
+        signature = self.signature(content)
+        duplicate = self.find(content, signature)
+        if duplicate is None:
+            self.add(position, content, signature)
+        return duplicate
+
+
+if __name__ == "__main__":
+    from database import MarketingDatabase
+
+    parser = argparse.ArgumentParser(description="Remove duplicate examples from the database")
+    parser.add_argument("--data-file", default="marketing_data.json")
+    parser.add_argument("--threshold", type=float, default=0.85,
+                        help="Similarity above which two examples count as near duplicates")
+    parser.add_argument("--dry-run", action="store_true", help="Report duplicates without removing them")
+    parser.add_argument("--journal", action="store_true",
+                        help="The store runs in journal mode (its writers use journal=True)")
+    args = parser.parse_args()
+
+    # Opened without journal=True, a journal-mode store would be cleaned from
+    # its snapshot alone and the journal replayed on top of it afterwards
+    base = os.path.splitext(args.data_file)[0]
+    journals = [base + ".journal.jsonl", base + ".journal.compacting.jsonl"]
+    if not args.journal and any(os.path.exists(path) for path in journals):
+        parser.error(f"{args.data_file} has a journal - run with --journal")
+
+    db = MarketingDatabase(args.data_file, journal=args.journal, dedup=True, dedup_threshold=args.threshold)
+    removed = db.remove_duplicates(dry_run=args.dry_run)
+    verb = "Would remove" if args.dry_run else "Removed"
+    for content_type, count in removed.items():
+        print(f"  {content_type}: {verb.lower()} {count} duplicates")
+    print(f"🧹 {verb} {sum(removed.values())} duplicate examples in total")
+    db.close()
@@ -0,0 +1,185 @@
+"""
+Embedding Store for Semantic Few-Shot Selection
+Local hashing embeddings + NumPy instead of ChromaDB (still no big downloads!)
+"""
+
+import json
+import os
+import zlib
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional - only this backend needs it
+    np = None
+
+from retrieval import FIELD_WEIGHTS, tokenize
+
+
+class HashingEmbedder:
+    """
+    Turns text into a fixed-size vector without any model files.
+
+    Words and character trigrams are hashed into `dim` buckets with a
+    random-looking sign (the "hashing trick"), so similar wording lands on
+    similar vectors. crc32 is used instead of hash() so vectors are the
+    same in every process and can be stored on disk.
+    """
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self._bucket = lru_cache(maxsize=1 << 18)(self._hash_feature)
+
+    def _hash_feature(self, feature):
+        """Map a feature to (bucket, sign) - cached, vocabularies repeat a lot"""
+        h = zlib.crc32(feature.encode("utf-8"))
+        return h % self.dim, 1.0 if h & 0x80000000 else -1.0
+
+    def _features(self, text):
+        for word in tokenize(text):
+            yield word
+            padded = f"<{word}>"
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3]
+
+    def embed(self, fields):
+        """Embed one {field_name: text} dict into a unit-length float32 vector"""
+        buckets = []
+        weights = []
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS.get(field, 1.0)
+            for feature in self._features(text):
+                bucket, sign = self._bucket(feature)
+                buckets.append(bucket)
+                weights.append(sign * weight)
+        vector = np.bincount(buckets, weights=weights, minlength=self.dim).astype(np.float32)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+    def embed_batch(self, fields_list):
+        """Embed many field dicts into one (n, dim) matrix"""
+        matrix = np.zeros((len(fields_list), self.dim), dtype=np.float32)
+        for row, fields in enumerate(fields_list):
+            matrix[row] = self.embed(fields)
+        return matrix
+
+
+def fingerprint(fields):
+    """crc32 of what an example's embedding is made from"""
+    return zlib.crc32(json.dumps(fields, sort_keys=True).encode("utf-8"))
+
+
+class EmbeddingStore:
+    """
+    One contiguous float32 matrix per content type, memory-mapped from disk.
+
+    Row i holds the embedding of example i. New rows are appended to the
+    file and the map is refreshed lazily on the next search. A checksum
+    file beside it holds the fingerprint of each row's example, so rows
+    left over from a different corpus are never mistaken for current ones.
+    """
+
+    def __init__(self, directory, embedder=None):
+        if np is None:
+            raise ImportError("Embedding retrieval needs numpy: pip install numpy")
+        self.directory = directory
+        self.embedder = embedder or HashingEmbedder()
+        self.row_bytes = self.embedder.dim * 4
+        self._matrices = {}
+        self._stale = set()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, content_type):
+        return os.path.join(self.directory, f"{content_type}.{self.embedder.dim}.f32")
+
+    def _checksum_path(self, content_type):
+        return os.path.join(self.directory, f"{content_type}.{self.embedder.dim}.crc")
+
+    def _row_count(self, content_type):
+        path = self._path(content_type)
+        if not os.path.exists(path):
+            return 0
+        return os.path.getsize(path) // self.row_bytes
+
+    def _checksums(self, content_type):
+        path = self._checksum_path(content_type)
+        if not os.path.exists(path):
+            return np.zeros(0, dtype=np.uint32)
+        return np.fromfile(path, dtype=np.uint32)
+
+    def sync(self, content_type, fields_list, rebuild=False):
+        """
+        Make the file for a content type match its examples.
+        Rows are kept up to the first one whose checksum doesn't match its
+        example (or that is missing, or torn); everything from there on is
+        embedded again. rebuild=True re-embeds everything.
+        """
+        checksums = np.array([fingerprint(fields) for fields in fields_list], dtype=np.uint32)
+        stored = self._checksums(content_type)
+        rows = 0 if rebuild else min(self._row_count(content_type), len(stored), len(fields_list))
+        changed = np.flatnonzero(stored[:rows] != checksums[:rows])
+        if changed.size:
+            rows = int(changed[0])
+        for path, row_bytes in ((self._path(content_type), self.row_bytes),
+                                (self._checksum_path(content_type), 4)):
+            if os.path.exists(path) and os.path.getsize(path) != rows * row_bytes:
+                with open(path, 'r+b') as f:
+                    f.truncate(rows * row_bytes)
+        if rows < len(fields_list):
+            self._append_rows(content_type, self.embedder.embed_batch(fields_list[rows:]), checksums[rows:])
+        self._stale.add(content_type)
+
+    def _append_rows(self, content_type, matrix, checksums):
+        with open(self._path(content_type), 'ab') as f:
+            f.write(np.ascontiguousarray(matrix, dtype=np.float32).tobytes())
+        with open(self._checksum_path(content_type), 'ab') as f:
+            f.write(np.asarray(checksums, dtype=np.uint32).tobytes())
+        self._stale.add(content_type)
+
+    def add(self, content_type, fields, position=None):
+        """
+        Embed and store one new example.
+        With a position, nothing is written if that row already exists
+        (another process sharing the directory embedded it first).
+        """
+        if position is not None and position < self._row_count(content_type):
+            self._stale.add(content_type)
+            return
+        self._append_rows(content_type, self.embedder.embed(fields)[None, :], [fingerprint(fields)])
+
+    def _matrix(self, content_type):
+        if content_type in self._stale or content_type not in self._matrices:
+            self._stale.discard(content_type)
+            rows = self._row_count(content_type)
+            if rows == 0:
+                self._matrices[content_type] = None
+            else:
+                self._matrices[content_type] = np.memmap(
+                    self._path(content_type), dtype=np.float32, mode='r',
+                    shape=(rows, self.embedder.dim)
+                )
+        return self._matrices[content_type]
+
+    def search_batch(self, content_type, queries, k=3):
+        """
+        Cosine top-k for many queries with a single matrix multiply.
+        Returns one list of (row, score) pairs per query, best first.
+        """
+        matrix = self._matrix(content_type)
+        if matrix is None or not queries:
+            return [[] for _ in queries]
+
+        scores = self.embedder.embed_batch(queries) @ matrix.T
+        k = min(k, matrix.shape[0])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        return [
+            list(zip(rows.tolist(), row_scores.tolist()))
+            for rows, row_scores in zip(top, top_scores)
+        ]
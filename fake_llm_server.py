@@ -0,0 +1,233 @@
+"""
+Local Stand-in LLM Server
+A tiny OpenAI-style HTTP server for testing without an API key.
+Run it with:  python fake_llm_server.py --port 8001 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+
+from tokens import count_tokens
+
+
+class FakeLLMServer:
+    """
+    Answers POST /v1/chat/completions after an artificial delay.
+    Connections are kept alive, like a real provider. With "stream": true
+    the reply is sent word by word as server-sent events, token_delay
+    seconds apart. With requests_per_minute set, requests over that limit
+    (in any 60 seconds) get 429 with Retry-After, like a real provider.
+
+    Faults can be injected to see how clients cope: error_rate of requests
+    fail straight away with 500, and tail_rate of them take tail_latency
+    seconds instead of latency (seed makes both repeatable).
+    """
+
+    def __init__(self, host="127.0.0.1", port=8001, latency=0.2, model="stand-in-llm", token_delay=0.02,
+                 requests_per_minute=None, error_rate=0.0, tail_rate=0.0, tail_latency=2.0, seed=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.token_delay = token_delay
+        self.model = model
+        self.requests_served = 0
+        self.requests_per_minute = requests_per_minute
+        self.rate_limited = 0
+        self._recent = deque()  # Arrival times within the last minute
+        self.error_rate = error_rate
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.errors_injected = 0
+        self.slow_injected = 0
+        self._random = random.Random(seed)
+
+    @staticmethod
+    def _reply_for(prompt):
+        """Make up a short reply that mentions what was asked for"""
+        task = "your content"
+        for line in prompt.splitlines():
+            if line.startswith("Now create the "):
+                task = line[len("Now create the "):]
+        return (f"✨ {task}\n\n"
+                "This reply came from the local stand-in LLM server. "
+                "Point HTTPBackend at a real provider for real copy.")
+
+    def _retry_after(self):
+        """Seconds until another request fits under requests_per_minute (0: it fits now)"""
+        if not self.requests_per_minute:
+            return 0
+        now = time.monotonic()
+        while self._recent and self._recent[0] <= now - 60:
+            self._recent.popleft()
+        if len(self._recent) >= self.requests_per_minute:
+            self.rate_limited += 1
+            return self._recent[0] + 60 - now
+        self._recent.append(now)
+        return 0
+
+    def _delay(self):
+        """Seconds before this reply starts: usually latency, now and then the tail"""
+        if self.tail_rate and self._random.random() < self.tail_rate:
+            self.slow_injected += 1
+            return self.tail_latency
+        return self.latency
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, value = line.decode("latin-1").split(":", 1)
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                extra_headers = ""
+                retry_after = self._retry_after() if method == "POST" else 0
+                if retry_after:
+                    status, payload = 429, {"error": {"message": "Rate limit reached, slow down"}}
+                    extra_headers = f"Retry-After: {retry_after:.1f}\r\n"
+                elif method == "POST" and self.error_rate and self._random.random() < self.error_rate:
+                    self.errors_injected += 1
+                    status, payload = 500, {"error": {"message": "Injected failure"}}
+                elif method == "POST" and path == "/v1/chat/completions":
+                    request = json.loads(body)
+                    if request.get("stream"):
+                        await self._stream(request, writer)
+                        if headers.get("connection", "").lower() == "close":
+                            break
+                        continue
+                    status, payload = await self._complete(request)
+                else:
+                    status, payload = 404, {"error": {"message": f"No route for {method} {path}"}}
+
+                data = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: keep-alive\r\n{extra_headers}\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _usage(self, request, reply):
+        prompt_tokens = sum(count_tokens(message["content"]) for message in request["messages"])
+        completion_tokens = count_tokens(reply)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    async def _complete(self, request):
+        await asyncio.sleep(self._delay())
+        self.requests_served += 1
+        reply = self._reply_for(request["messages"][-1]["content"])
+        # "n": that many choices, told apart by a variant number
+        replies = [reply] + [f"{reply}\n\n(variant {i + 1})" for i in range(1, request.get("n", 1))]
+        return 200, {
+            "id": f"standin-{self.requests_served}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", self.model),
+            "choices": [{
+                "index": i,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            } for i, text in enumerate(replies)],
+            "usage": self._usage(request, "".join(replies)),
+        }
+
+    async def _stream(self, request, writer):
+        """Send the reply as chat.completion.chunk events (chunked transfer encoding)"""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\n"
+            b"Connection: keep-alive\r\n\r\n"
+        )
+        await asyncio.sleep(self._delay())
+        self.requests_served += 1
+        reply = self._reply_for(request["messages"][-1]["content"])
+        base = {
+            "id": f"standin-{self.requests_served}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", self.model),
+        }
+
+        async def send(data):
+            event = f"data: {data}\n\n".encode("utf-8")
+            writer.write(f"{len(event):x}\r\n".encode("latin-1") + event + b"\r\n")
+            await writer.drain()
+
+        for i, piece in enumerate(re.findall(r"\s*\S+", reply)):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            await send(json.dumps({**base, "choices": [
+                {"index": 0, "delta": {"content": piece}, "finish_reason": None}
+            ]}))
+        await send(json.dumps({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}))
+        if request.get("stream_options", {}).get("include_usage"):
+            await send(json.dumps({**base, "choices": [], "usage": self._usage(request, reply)}))
+        await send("[DONE]")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def serve_forever(self):
+        server = await asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+        print(f"🧪 Stand-in LLM listening on http://{self.host}:{self.port}/v1/chat/completions")
+        async with server:
+            await server.serve_forever()
+
+    def start_background(self):
+        """Run the server on its own thread (handy for tests and demos)"""
+        ready = threading.Event()
+
+        async def main():
+            server = await asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+            self.port = server.sockets[0].getsockname()[1]
+            ready.set()
+            async with server:
+                await server.serve_forever()
+
+        threading.Thread(target=lambda: asyncio.run(main()), daemon=True).start()
+        ready.wait()
+        return f"http://{self.host}:{self.port}/v1/chat/completions"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for an OpenAI-style LLM API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds to wait before replying")
+    parser.add_argument("--token-delay", type=float, default=0.02,
+                        help="Seconds between words when streaming")
+    parser.add_argument("--rpm", type=int, help="Answer 429 above this many requests per minute")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail with 500")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="Fraction of requests that are slow")
+    parser.add_argument("--tail-latency", type=float, default=2.0, help="Seconds a slow request takes")
+    parser.add_argument("--seed", type=int, help="Make the injected faults repeatable")
+    args = parser.parse_args()
+    asyncio.run(FakeLLMServer(args.host, args.port, args.latency, token_delay=args.token_delay,
+                              requests_per_minute=args.rpm, error_rate=args.error_rate,
+                              tail_rate=args.tail_rate, tail_latency=args.tail_latency,
+                              seed=args.seed).serve_forever())
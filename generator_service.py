@@ -0,0 +1,86 @@
+"""
+Shared Generator Service
+One MarketingContentGenerator per process, warmed up in the background,
+so the Streamlit page can render before the heavy lifting is done.
+Set MARKETING_API_PORT to also serve that generator over HTTP (server.py).
+"""
+
+import os
+import threading
+import time
+
+
+class GeneratorService:
+    """
+    Builds the generator once on a background thread and hands the same
+    instance to every caller (every Streamlit session in this process).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self._generator = None
+        self._error = None
+        self.timings = {}
+
+    def start_warmup(self):
+        """Kick off loading in the background (safe to call on every rerun)"""
+        with self._lock:
+            if self._thread is None:
+                self.timings["warmup_started"] = time.time()
+                self._thread = threading.Thread(target=self._warm, name="generator-warmup", daemon=True)
+                self._thread.start()
+
+    def _warm(self):
+        started = time.perf_counter()
+        try:
+            # Imported here so the page doesn't wait for dotenv, the database, ...
+            from content_generator import MarketingContentGenerator
+            imported = time.perf_counter()
+            self._generator = MarketingContentGenerator()
+            finished = time.perf_counter()
+            self.timings["import_seconds"] = imported - started
+            self.timings["init_seconds"] = finished - imported
+            self.timings["cold_start_seconds"] = finished - started
+            print(f"🔥 Generator warmed up in {finished - started:.2f}s")
+        except Exception as e:
+            self._error = e
+            print(f"❌ Generator warm-up failed: {e}")
+        finally:
+            self._ready.set()
+
+        api_port = os.getenv("MARKETING_API_PORT")
+        if api_port and self._generator is not None:
+            from server import GenerationServer
+            try:
+                GenerationServer(self._generator, port=int(api_port)).start_background()
+            except OSError as e:  # The page still works without it
+                print(f"⚠️ Generation API not started: {e}")
+
+    @property
+    def is_ready(self):
+        return self._ready.is_set() and self._error is None
+
+    def get_generator(self, timeout=None):
+        """
+        Return the shared generator, waiting for warm-up if needed.
+        The wait is recorded in timings["last_wait_seconds"] (0 when warm).
+        """
+        self.start_warmup()
+        started = time.perf_counter()
+        if not self._ready.wait(timeout):
+            raise TimeoutError("Generator is still warming up")
+        self.timings["last_wait_seconds"] = time.perf_counter() - started
+        if self._error is not None:
+            with self._lock:
+                # Let the next caller try again instead of failing forever
+                error, self._error = self._error, None
+                self._thread = None
+                self._ready.clear()
+            raise error
+        return self._generator
+
+
+# The one instance for this process
+service = GeneratorService()
@@ -0,0 +1,103 @@
+"""
+Append-only Journal for the Marketing Database
+Each new example is one JSON line at the end of a log file,
+so saving costs the same no matter how big the memory box gets.
+"""
+
+import json
+import os
+
+
+class ExampleJournal:
+    """
+    A write-ahead log of examples.
+
+    Every line records which content type the example belongs to and the
+    position it takes in that list. Positions make replay idempotent: an
+    entry that is already part of the snapshot is simply skipped.
+    """
+
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self.entries = 0
+        self.recount()
+
+    def recount(self):
+        """
+        Count the lines already in the log (used to decide when to compact).
+        Needed again whenever another process may have appended to it.
+        """
+        if not os.path.exists(self.path):
+            self.entries = 0
+            return 0
+        with open(self.path, 'rb') as f:
+            self.entries = sum(1 for line in f if line.strip())
+        return self.entries
+
+    def append(self, content_type, position, example):
+        """Write one example to the end of the log"""
+        self.append_many([(content_type, position, example)])
+
+    def append_many(self, entries):
+        """Write several examples with a single flush"""
+        lines = [
+            json.dumps({"type": content_type, "pos": position, "example": example})
+            for content_type, position, example in entries
+        ]
+        if not lines:
+            return
+        # Opened per write: another process may have rotated the file since
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self.entries += len(lines)
+
+    def rotate(self, rotated_path):
+        """
+        Move the current log aside so a snapshot can be written from it.
+        New appends go to a fresh, empty log.
+        """
+        if os.path.exists(self.path):
+            os.replace(self.path, rotated_path)
+        self.entries = 0
+
+    def close(self):
+        """Nothing stays open between writes; kept so callers can close()"""
+
+    @staticmethod
+    def replay(path, examples):
+        """
+        Apply the entries of a log file to the examples dict.
+        A half-written last line (crash mid-append) is cut off and ignored.
+        Returns how many entries were applied.
+        """
+        if not os.path.exists(path):
+            return 0
+
+        applied = 0
+        good_offset = 0
+        with open(path, 'rb') as f:
+            for raw in f:
+                try:
+                    record = json.loads(raw)
+                    content_type = record["type"]
+                    position = record["pos"]
+                    example = record["example"]
+                except (ValueError, KeyError, TypeError):
+                    break
+                good_offset += len(raw)
+
+                type_examples = examples.setdefault(content_type, [])
+                if position < len(type_examples):
+                    continue  # Already in the snapshot
+                type_examples.append(example)
+                applied += 1
+
+        if good_offset < os.path.getsize(path):
+            print(f"⚠️ Dropping torn entry at the end of {path}")
+            with open(path, 'r+b') as f:
+                f.truncate(good_offset)
+        return applied
@@ -0,0 +1,478 @@
+"""
+LLM Backends
+The part of the system that actually turns a prompt into text.
+Swap backends without touching the generator: demo table, local HTTP server, ...
+"""
+
+import asyncio
+import http.client
+import json
+import random
+import re
+import ssl
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+# Word-sized pieces that join back into the original text exactly
+PIECES = re.compile(r"\S+\s*|\s+")
+
+
+class BackendError(RuntimeError):
+    """
+    The model server answered with an error status. retry_after is the
+    server's Retry-After in seconds (e.g. with 429 Too Many Requests), or None.
+    """
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def merge_variants(responses):
+    """Fold several complete() responses into one, with "variants" listing every reply"""
+    merged = {
+        "content": responses[0]["content"],
+        "variants": [response["content"] for response in responses],
+        "model": responses[0]["model"],
+    }
+    usages = [response.get("usage") for response in responses]
+    if all(usages):
+        merged["usage"] = {
+            "prompt_tokens": sum(usage["prompt_tokens"] for usage in usages),
+            "completion_tokens": sum(usage["completion_tokens"] for usage in usages),
+        }
+    return merged
+
+
+class LLMBackend:
+    """
+    Interface every backend follows.
+
+    complete() returns a dict with at least "content" and "model", plus
+    "usage" ({"prompt_tokens", "completion_tokens"}) when the backend knows
+    what the request used.
+    acomplete() is the asyncio version; by default it runs complete() in a
+    worker thread so any backend can be used from async code.
+
+    stream() / astream() yield the reply in pieces as it is produced and
+    fill the `response` dict passed in with "model" (and "usage") by the
+    time they finish. By default the whole reply arrives as one piece.
+
+    complete_variants() / acomplete_variants() write n alternative replies
+    to one prompt: a response whose "content" is the first and "variants"
+    holds them all (usage is the total). By default that's n calls side by side.
+
+    stats() returns counters worth showing on a dashboard (none by default).
+    """
+
+    name = "base"
+
+    def complete(self, prompt, content_type, topic, tone):
+        raise NotImplementedError
+
+    async def acomplete(self, prompt, content_type, topic, tone):
+        return await asyncio.to_thread(self.complete, prompt, content_type, topic, tone)
+
+    def stream(self, prompt, content_type, topic, tone, response):
+        result = self.complete(prompt, content_type, topic, tone)
+        response.update((key, value) for key, value in result.items() if key != "content")
+        yield result["content"]
+
+    async def astream(self, prompt, content_type, topic, tone, response):
+        result = await self.acomplete(prompt, content_type, topic, tone)
+        response.update((key, value) for key, value in result.items() if key != "content")
+        yield result["content"]
+
+    def complete_variants(self, prompt, content_type, topic, tone, n):
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            return merge_variants(list(pool.map(
+                lambda _: self.complete(prompt, content_type, topic, tone), range(n)
+            )))
+
+    async def acomplete_variants(self, prompt, content_type, topic, tone, n):
+        return merge_variants(await asyncio.gather(
+            *(self.acomplete(prompt, content_type, topic, tone) for _ in range(n))
+        ))
+
+    def cache_params(self):
+        """Everything besides the prompt that changes the answer (for response caching)"""
+        return {"backend": self.name}
+
+    def stats(self):
+        return {}
+
+    def close(self):
+        pass
+
+
+class DemoBackend(LLMBackend):
+    """
+    Looks up pre-written sample content - no API calls at all.
+    This is the original DEMO MODE behaviour.
+    """
+
+    name = "demo"
+    model = "gpt-3.5-turbo-demo"
+
+    def __init__(self, demo_content):
+        self.demo_content = demo_content
+
+    def complete(self, prompt, content_type, topic, tone):
+        content_by_type = self.demo_content.get(content_type, {})
+
+        # Try to match tone, fallback to random if not found
+        if tone in content_by_type:
+            content = content_by_type[tone]
+        elif content_by_type:
+            # Get any available tone for this content type
+            content = content_by_type[random.choice(list(content_by_type.keys()))]
+        else:
+            content = f"[Demo content for {content_type} with {tone} tone]\n\nThis is sample marketing content. In the real version, OpenAI would generate this based on your topic: {topic}"
+        return {"content": content, "model": self.model}
+
+    async def acomplete(self, prompt, content_type, topic, tone):
+        # A dictionary lookup - no need for a thread
+        return self.complete(prompt, content_type, topic, tone)
+
+    def complete_variants(self, prompt, content_type, topic, tone, n):
+        """The sample for the tone first, then the other tones' samples (as many as there are)"""
+        first = self.complete(prompt, content_type, topic, tone)["content"]
+        others = [content for content in self.demo_content.get(content_type, {}).values() if content != first]
+        return {"content": first, "variants": [first, *others][:n], "model": self.model}
+
+    async def acomplete_variants(self, prompt, content_type, topic, tone, n):
+        return self.complete_variants(prompt, content_type, topic, tone, n)
+
+    def stream(self, prompt, content_type, topic, tone, response):
+        """Hand the sample out word by word, like a real model would"""
+        response["model"] = self.model
+        yield from PIECES.findall(self.complete(prompt, content_type, topic, tone)["content"])
+
+    async def astream(self, prompt, content_type, topic, tone, response):
+        for piece in self.stream(prompt, content_type, topic, tone, response):
+            yield piece
+
+    def cache_params(self):
+        return {"backend": self.name, "model": self.model}
+
+
+class HTTPBackend(LLMBackend):
+    """
+    Talks to an OpenAI-style /v1/chat/completions endpoint over HTTP, or
+    HTTPS (certificate checked) for an https:// URL.
+
+    The async path keeps a pool of keep-alive connections per event loop,
+    so hundreds of requests can be in flight without a thread each.
+    timeout applies to every wait on the server (connecting, the response
+    head, the body, each streamed chunk) on both paths.
+    Variants are one request with the API's "n" parameter (a server that
+    ignores it gives back fewer variants than asked for).
+    """
+
+    name = "http"
+
+    def __init__(self, url="http://127.0.0.1:8001/v1/chat/completions",
+                 model="gpt-3.5-turbo", api_key=None, temperature=0.7, timeout=60):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"LLM backend URL must be http:// or https://, got {url!r}")
+        self.host = parts.hostname
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.port = parts.port or (443 if self.ssl else 80)
+        self.path = parts.path or "/"
+        self.model = model
+        self.api_key = api_key
+        self.temperature = temperature
+        self.timeout = timeout
+        self._idle = []  # (loop, reader, writer) connections ready for reuse
+
+    def cache_params(self):
+        return {
+            "backend": self.name,
+            "endpoint": f"{self.host}:{self.port}{self.path}",
+            "model": self.model,
+            "temperature": self.temperature,
+        }
+
+    def _body(self, prompt, stream=False, n=1):
+        payload = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature,
+        }
+        if n > 1:
+            payload["n"] = n
+        if stream:
+            payload["stream"] = True
+            payload["stream_options"] = {"include_usage": True}
+        return json.dumps(payload).encode("utf-8")
+
+    def _headers(self, body):
+        headers = {
+            "Host": f"{self.host}:{self.port}",
+            "Content-Type": "application/json",
+            "Content-Length": str(len(body)),
+            "Connection": "keep-alive",
+        }
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    @staticmethod
+    def _parse(status, payload, retry_after=None):
+        if status != 200:
+            try:
+                retry_after = float(retry_after) if retry_after is not None else None
+            except ValueError:
+                retry_after = None  # An HTTP date - not worth parsing
+            raise BackendError(f"LLM server returned HTTP {status}: {payload[:200]!r}", status, retry_after)
+        try:
+            data = json.loads(payload)
+            choices = sorted(data["choices"], key=lambda choice: choice.get("index", 0))
+            response = {
+                "content": choices[0]["message"]["content"],
+                "model": data.get("model", "unknown"),
+            }
+            if len(choices) > 1:
+                response["variants"] = [choice["message"]["content"] for choice in choices]
+        except (ValueError, LookupError, TypeError, AttributeError):
+            # It answered, just not with a completion (e.g. "choices": [])
+            raise BackendError(f"LLM server sent no usable completion: {payload[:200]!r}", status) from None
+        usage = data.get("usage")
+        if usage:
+            response["usage"] = {
+                "prompt_tokens": usage.get("prompt_tokens", 0),
+                "completion_tokens": usage.get("completion_tokens", 0),
+            }
+        return response
+
+    @staticmethod
+    def _parse_event(line, response):
+        """
+        Read one server-sent event line of a streamed reply.
+        Returns the text it adds ("" if none), or None once the stream is done.
+        """
+        line = line.strip()
+        if not line.startswith(b"data:"):
+            return ""
+        data = line[5:].strip()
+        if data == b"[DONE]":
+            return None
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            raise BackendError(f"LLM server sent a malformed stream chunk: {data[:200]!r}") from None
+        response["model"] = chunk.get("model", response.get("model", "unknown"))
+        usage = chunk.get("usage")
+        if usage:
+            response["usage"] = {
+                "prompt_tokens": usage.get("prompt_tokens", 0),
+                "completion_tokens": usage.get("completion_tokens", 0),
+            }
+        return "".join(
+            choice.get("delta", {}).get("content") or "" for choice in chunk.get("choices", ())
+        )
+
+    def complete(self, prompt, content_type, topic, tone):
+        return self._post(self._body(prompt))
+
+    def complete_variants(self, prompt, content_type, topic, tone, n):
+        return self._post(self._body(prompt, n=n))
+
+    def _connection(self):
+        if self.ssl is not None:
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self.ssl)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _post(self, body):
+        conn = self._connection()
+        try:
+            conn.request("POST", self.path, body=body, headers=self._headers(body))
+            response = conn.getresponse()
+            return self._parse(response.status, response.read(), response.getheader("retry-after"))
+        finally:
+            conn.close()
+
+    def stream(self, prompt, content_type, topic, tone, response):
+        body = self._body(prompt, stream=True)
+        conn = self._connection()
+        try:
+            conn.request("POST", self.path, body=body, headers=self._headers(body))
+            http_response = conn.getresponse()
+            if http_response.status != 200:
+                self._parse(http_response.status, http_response.read(),
+                            http_response.getheader("retry-after"))  # Raises
+            for line in http_response:
+                text = self._parse_event(line, response)
+                if text is None:
+                    break
+                if text:
+                    yield text
+        finally:
+            conn.close()
+
+    def _request(self, body):
+        head = f"POST {self.path} HTTP/1.1\r\n" + "".join(
+            f"{key}: {value}\r\n" for key, value in self._headers(body).items()
+        ) + "\r\n"
+        return head.encode("latin-1") + body
+
+    async def _within_timeout(self, awaitable):
+        """Await something that waits on the server, giving up after self.timeout"""
+        try:
+            return await asyncio.wait_for(awaitable, self.timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"LLM server did not answer within {self.timeout}s") from None
+
+    async def _send(self, request):
+        """
+        Send a request on a pooled connection and read the response head.
+        Returns (reader, writer, status, headers); the body is left unread.
+        """
+        return await self._within_timeout(self._send_now(request))
+
+    async def _send_now(self, request):
+        reused, reader, writer = await self._acquire()
+        try:
+            writer.write(request)
+            await writer.drain()
+            status, headers = await self._read_head(reader)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            writer.close()
+            if not reused:
+                raise
+            # The server closed an idle connection - try once on a fresh one
+            reader, writer = await self._open()
+            try:
+                writer.write(request)
+                await writer.drain()
+                status, headers = await self._read_head(reader)
+            except BaseException:
+                writer.close()
+                raise
+        except BaseException:
+            # Includes cancellation: a half-read connection can't be reused
+            writer.close()
+            raise
+        return reader, writer, status, headers
+
+    def _release(self, reader, writer, headers):
+        """Put a fully read connection back in the pool"""
+        if headers.get("connection", "").lower() == "close":
+            writer.close()
+        else:
+            self._idle.append((asyncio.get_running_loop(), reader, writer))
+
+    async def acomplete(self, prompt, content_type, topic, tone):
+        return await self._apost(self._body(prompt))
+
+    async def acomplete_variants(self, prompt, content_type, topic, tone, n):
+        return await self._apost(self._body(prompt, n=n))
+
+    async def _apost(self, body):
+        reader, writer, status, headers = await self._send(self._request(body))
+        try:
+            payload = await self._within_timeout(self._read_body(reader, headers))
+        except BaseException:
+            writer.close()
+            raise
+        self._release(reader, writer, headers)
+        return self._parse(status, payload, headers.get("retry-after"))
+
+    async def astream(self, prompt, content_type, topic, tone, response):
+        request = self._request(self._body(prompt, stream=True))
+        reader, writer, status, headers = await self._send(request)
+        try:
+            if status != 200:
+                self._parse(status, await self._within_timeout(self._read_body(reader, headers)),
+                            headers.get("retry-after"))  # Raises
+            buffer = b""
+            done = False
+            chunks = self._iter_body(reader, headers)
+            while True:
+                try:
+                    data = await self._within_timeout(chunks.__anext__())
+                except StopAsyncIteration:
+                    break
+                buffer += data
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    if done:
+                        continue  # Read to the end so the connection can be reused
+                    text = self._parse_event(line, response)
+                    if text is None:
+                        done = True
+                    elif text:
+                        yield text
+        except BaseException:
+            # Includes the caller stopping early
+            writer.close()
+            raise
+        self._release(reader, writer, headers)
+
+    async def _acquire(self):
+        loop = asyncio.get_running_loop()
+        while self._idle:
+            idle_loop, reader, writer = self._idle.pop()
+            if idle_loop is loop and not writer.is_closing():
+                return True, reader, writer
+            self._discard(idle_loop, writer)
+        reader, writer = await self._open()
+        return False, reader, writer
+
+    def _open(self):
+        return asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+
+    @staticmethod
+    def _discard(loop, writer):
+        """Close a pooled connection on the event loop it belongs to"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if loop is running:
+            writer.close()
+            return
+        try:
+            loop.call_soon_threadsafe(writer.close)
+        except RuntimeError:
+            pass  # That loop is closed; its transport closes the socket when collected
+
+    @staticmethod
+    async def _read_head(reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by server")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, value = line.decode("latin-1").split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+        return status, headers
+
+    @staticmethod
+    async def _iter_body(reader, headers):
+        """Yield the body as it arrives (Content-Length or chunked encoding)"""
+        if headers.get("transfer-encoding", "").lower() != "chunked":
+            yield await reader.readexactly(int(headers.get("content-length", 0)))
+            return
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass  # Trailers
+                return
+            yield await reader.readexactly(size)
+            await reader.readexactly(2)  # CRLF after each chunk
+
+    async def _read_body(self, reader, headers):
+        return b"".join([data async for data in self._iter_body(reader, headers)])
+
+    def close(self):
+        for loop, _, writer in self._idle:
+            self._discard(loop, writer)
+        self._idle = []
@@ -0,0 +1,145 @@
+"""
+Shared-Prefix Report
+How much of each prompt starts with text an earlier prompt already sent?
+Providers that cache prompt prefixes (OpenAI, Anthropic, vLLM, ...) bill or
+compute that part cheaper, so this is the input we could be saving. The
+report builds every request in a log with each prompt layout and compares.
+
+    python prefix_report.py requests.jsonl
+    python prefix_report.py --demo 1000
+
+The log is JSON lines, each a generate request ({"content_type": ...,
+"topic": ..., ...}) or a batch ({"requests": [...]}), like the bodies sent
+to server.py. Nothing is generated and the database isn't changed.
+"""
+
+import argparse
+import json
+import random
+from bisect import bisect_left
+
+from prompt_engineer import LAYOUTS, PromptEngineer
+from tokens import count_tokens
+
+
+def read_requests(path):
+    requests = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                requests.extend(item["requests"] if "requests" in item else [item])
+    return requests
+
+
+def demo_requests(n, seed=7):
+    """Made-up traffic: a few topics and audiences per content type, mixed tones"""
+    rng = random.Random(seed)
+    content_types = ("ad_copy", "email_campaigns", "social_media", "blog_posts", "product_descriptions")
+    topics = ("running shoes", "coffee subscription", "accounting software", "yoga mats", "smart watch",
+              "meal kits", "electric bike", "noise cancelling headphones")
+    audiences = ("busy professionals", "students", "new parents", "small business owners", "retirees")
+    tones = ("professional", "friendly", "playful", "urgent", "inspirational")
+    return [{
+        "content_type": rng.choice(content_types),
+        "topic": rng.choice(topics),
+        "tone": rng.choice(tones),
+        "target_audience": rng.choice(audiences),
+        "key_points": rng.sample(["quality", "value", "free shipping", "30-day trial", "eco-friendly"], 2),
+    } for _ in range(n)]
+
+
+def _normalize(request):
+    """The defaults generate() fills in"""
+    return {
+        "content_type": request["content_type"],
+        "topic": request["topic"],
+        "tone": request.get("tone", "professional"),
+        "target_audience": request.get("target_audience", "general"),
+        "key_points": request.get("key_points") or ["quality", "value"],
+        "brand_voice": request.get("brand_voice"),
+    }
+
+
+def _common_prefix(a, b):
+    """Length of the common start of two strings (binary search on C-speed slice compares)"""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def shared_prefixes(prompts):
+    """
+    For each prompt (in order), the characters it shares with the longest
+    matching start of any earlier prompt. In sorted order that best match
+    is always a neighbour, so each prompt is compared twice, not n times.
+    """
+    seen = []
+    shared = []
+    for prompt in prompts:
+        at = bisect_left(seen, prompt)
+        best = 0
+        for neighbour in seen[max(0, at - 1):at + 1]:
+            best = max(best, _common_prefix(prompt, neighbour))
+        shared.append(best)
+        seen.insert(at, prompt)
+    return shared
+
+
+def cacheable(tokens, min_tokens, block_tokens):
+    """Tokens a provider would actually serve from cache for a shared prefix this long"""
+    if tokens < min_tokens:
+        return 0
+    return tokens // block_tokens * block_tokens
+
+
+def report(requests, database, min_tokens=1024, block_tokens=128, cached_discount=0.5):
+    specs = [_normalize(request) for request in requests]
+    print(f"📊 Shared prompt prefixes over {len(specs)} requests")
+    print(f"{'layout':<16}{'avg tokens':>11}{'shared':>9}{'cacheable':>11}{'input saved':>13}")
+    rows = {}
+    for layout in LAYOUTS:
+        engineer = PromptEngineer(database, cache=False, layout=layout)
+        prompts = engineer.create_prompts(specs)
+        total = sum(count_tokens(prompt) for prompt in prompts)
+        shared = [count_tokens(prompt[:length]) for prompt, length in zip(prompts, shared_prefixes(prompts))]
+        hits = sum(cacheable(tokens, min_tokens, block_tokens) for tokens in shared)
+        rows[layout] = {
+            "prompt_tokens": total,
+            "shared_tokens": sum(shared),
+            "cacheable_tokens": hits,
+            "saved_tokens": hits * cached_discount,
+        }
+        print(f"{layout:<16}{total / max(1, len(prompts)):>11.1f}{sum(shared) / max(1, total):>9.1%}"
+              f"{hits / max(1, total):>11.1%}{hits * cached_discount / max(1, total):>13.1%}")
+    print(f"   cacheable: whole {block_tokens}-token blocks once {min_tokens} tokens match; "
+          f"cached input billed at {1 - cached_discount:.0%}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared-prefix ratio of the prompts for a request log")
+    parser.add_argument("log", nargs="?", help="JSON lines of generate requests")
+    parser.add_argument("--demo", type=int, help="Use this many made-up requests instead of a log")
+    parser.add_argument("--data", default="marketing_data.json", help="Example database (.json or .corpus)")
+    parser.add_argument("--min-tokens", type=int, default=1024,
+                        help="Shortest prefix the provider caches (OpenAI and Anthropic: 1024; vLLM: 0)")
+    parser.add_argument("--block-tokens", type=int, default=128,
+                        help="Cache granularity (OpenAI: 128; vLLM: 16)")
+    parser.add_argument("--cached-discount", type=float, default=0.5,
+                        help="Fraction of the price saved on cached input tokens")
+    args = parser.parse_args()
+    if not args.log and not args.demo:
+        parser.error("give a request log or --demo N")
+
+    from database import MarketingDatabase
+
+    db = MarketingDatabase(args.data)
+    report(read_requests(args.log) if args.log else demo_requests(args.demo), db,
+           args.min_tokens, args.block_tokens, args.cached_discount)
+    db.close()
@@ -0,0 +1,107 @@
+"""
+Prompt Cache
+Remembers finished prompts so repeat requests skip the rebuild.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def _deep_size(value):
+    """Bytes held by a key or prompt: tuples are counted along with what they hold"""
+    size = sys.getsizeof(value)
+    if isinstance(value, tuple):
+        size += sum(_deep_size(item) for item in value)
+    return size
+
+
+class PromptCache:
+    """
+    LRU cache with a time-to-live and a memory budget (keys and prompts
+    both count towards it).
+
+    Entries are grouped by content type. When the database gains an example
+    of some type, only that type's prompts are dropped (their few-shot
+    examples may have changed); everything else stays cached.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, ttl=3600):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (prompt, content_type, expires_at, size)
+        self._keys_by_type = {}
+        self._generations = {}          # content_type -> bumps on every invalidate
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[2] < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def generation(self, content_type):
+        """Read before building a prompt and pass to put() (see below)"""
+        return self._generations.get(content_type, 0)
+
+    def put(self, key, prompt, content_type, generation):
+        """
+        Store a prompt. If the content type was invalidated while the prompt
+        was being built, it may contain outdated examples - skip it.
+        """
+        size = _deep_size(key) + _deep_size(prompt)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if self._generations.get(content_type, 0) != generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (prompt, content_type, time.monotonic() + self.ttl, size)
+            self._keys_by_type.setdefault(content_type, set()).add(key)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, content_type):
+        """Forget every prompt built for this content type"""
+        with self._lock:
+            self._generations[content_type] = self._generations.get(content_type, 0) + 1
+            for key in list(self._keys_by_type.get(content_type, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def _remove(self, key):
+        _, content_type, _, size = self._entries.pop(key)
+        self._bytes -= size
+        keys = self._keys_by_type.get(content_type)
+        if keys is not None:
+            keys.discard(key)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
@@ -3,22 +3,137 @@ Prompt Engineering Engine
 This creates perfect instructions for the AI using advanced techniques.
 """
 
+import json
 from datetime import datetime
 
+from prompt_cache import PromptCache
+from telemetry import tracer
+from tokens import pack_examples
+
+BANNER = "=" * 60
+
+# How many retrieval candidates per example slot the packer gets to choose from
+CANDIDATES_PER_EXAMPLE = 3
+
+# "classic": the request's details up top, examples picked to match it.
+# "prefix_stable": identity, rules, a fixed set of examples and the format
+# first, the request's details last - so prompts of a content type all start
+# with the same text and providers can cache that prefix.
+LAYOUTS = ("classic", "prefix_stable")
+
+IDENTITY = (
+    "You are an elite marketing copywriter with 20 years of experience.\n"
+    "You've written for Fortune 500 companies and won multiple advertising awards.\n"
+    "Your copy converts readers into customers. You write in a "
+)
+
+ADDITIONAL_INSTRUCTIONS = (
+    "\n\nADDITIONAL INSTRUCTIONS:\n"
+    "• Be original - do not copy the examples word for word\n"
+    "• Focus on benefits, not just features\n"
+    "• Make it sound human, not robotic\n"
+    "• Ensure every word earns its place\n"
+    "• The content should feel "
+)
+
+
+class PromptTemplate:
+    """
+    A style guide compiled into ready-made text chunks.
+
+    Everything that never changes for a content type (rules list, banners,
+    output format) is rendered once here. Building a prompt then only fills
+    the request-specific slots and joins the pieces a single time.
+    """
+
+    def __init__(self, style):
+        self.name = style['name']
+        self.identity_open = IDENTITY
+        self.task_open = f" tone.\n\nTASK: Create {self.name} about "
+        self.rules_block = "\nSTRICT RULES YOU MUST FOLLOW:\n" + "".join(
+            f"{i}. {rule}\n" for i, rule in enumerate(style['rules'], 1)
+        )
+        self.examples_open = f"\n{BANNER}\nEXAMPLES OF EXCELLENT WORK (Study these patterns):\n{BANNER}\n"
+        self.examples_close = f"\n{BANNER}\nNOTICE THE PATTERNS ABOVE. NOW CREATE SOMETHING ORIGINAL.\n{BANNER}\n"
+        self.format_block = "\nOUTPUT FORMAT (Follow this exactly):\n" + style['format'] + ADDITIONAL_INSTRUCTIONS
+        self.final_open = f"\n\nNow create the {self.name} for: "
+        self.final_close = "\n\nYOUR RESPONSE:"
+
+        # Prefix-stable layout: the same words, with every request-specific
+        # slot moved into the brief at the end
+        self.stable_head = (
+            f"{IDENTITY}tone set in the brief.\n\n"
+            f"TASK: Create {self.name} for the brief at the end of these instructions.\n"
+        )
+        self.stable_format = (
+            self.format_block + "the way the TONE in the brief asks.\n\n--- THE BRIEF ---\nTOPIC: "
+        )
+
+    def render(self, topic, tone, target_audience, key_points, brand_voice, examples):
+        parts = [
+            self.identity_open, tone, self.task_open, topic,
+            "\n\nTARGET AUDIENCE: ", target_audience,
+            "\nTONE: ", tone,
+            "\nKEY POINTS TO EMPHASIZE: ", ", ".join(key_points), "\n",
+        ]
+        if brand_voice:
+            parts += ["\nBRAND VOICE GUIDELINES: ", brand_voice, "\n"]
+        parts.append(self.rules_block)
+        self._add_examples(parts, examples)
+        parts += [self.format_block, tone, self.final_open, topic, self.final_close]
+        return "".join(parts)
+
+    def render_prefix_stable(self, topic, tone, target_audience, key_points, brand_voice, examples):
+        """Same content as render(), but nothing request-specific comes before the brief"""
+        parts = [self.stable_head, self.rules_block]
+        self._add_examples(parts, examples)
+        parts += [
+            self.stable_format, topic,
+            "\nTARGET AUDIENCE: ", target_audience,
+            "\nTONE: ", tone,
+            "\nKEY POINTS TO EMPHASIZE: ", ", ".join(key_points),
+        ]
+        if brand_voice:
+            parts += ["\nBRAND VOICE GUIDELINES: ", brand_voice]
+        parts += [self.final_open, topic, self.final_close]
+        return "".join(parts)
+
+    def _add_examples(self, parts, examples):
+        if examples:
+            parts.append(self.examples_open)
+            for idx, example in enumerate(examples, 1):
+                parts += [f"\n--- EXAMPLE {idx} ---\n", example, "\n"]
+            parts.append(self.examples_close)
+
+
 class PromptEngineer:
     """
     This class is like a master chef writing recipes.
     It knows exactly how to instruct the AI to get the best results.
     """
     
-    def __init__(self, database):
+    def __init__(self, database, cache=True, cache_max_bytes=32 * 1024 * 1024, cache_ttl=3600,
+                 layout="classic"):
         """
         Connect to our memory box so we can include examples.
+        Finished prompts are cached (cache=False turns that off); the
+        database tells us when a content type gets new examples.
+        layout is one of LAYOUTS. With "prefix_stable" every prompt of a
+        content type shares the same few-shot examples (the first ones
+        stored), so the long start of the prompt is identical.
         """
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown prompt layout: {layout} (choose from {', '.join(LAYOUTS)})")
+        self.layout = layout
         self.db = database
+        self.cache = PromptCache(cache_max_bytes, cache_ttl) if cache else None
+        if self.cache is not None:
+            self.db.add_listener(self.cache.invalidate)
         
         # Define style rules for each content type
         # These are industry best practices for marketing
+        # example_token_budget caps how many (estimated) tokens the few-shot
+        # examples may take up; None means no limit
         self.style_guides = {
             "ad_copy": {
                 "name": "Advertisement Copy",
@@ -38,7 +153,8 @@ BODY (2-3 sentences):
 
 CTA BUTTON TEXT:
 [Action verb] [Benefit]""",
-                "examples_needed": 2
+                "examples_needed": 2,
+                "example_token_budget": 200
             },
             
             "email_campaigns": {
@@ -72,7 +188,8 @@ Best,
 [Your Name]
 
 P.S. [Urgency or bonus]""",
-                "examples_needed": 2
+                "examples_needed": 2,
+                "example_token_budget": 400
             },
             
             "social_media": {
@@ -92,7 +209,8 @@ P.S. [Urgency or bonus]""",
 [Engagement question]
 
 [Hashtags]""",
-                "examples_needed": 2
+                "examples_needed": 2,
+                "example_token_budget": 300
             },
             
             "blog_posts": {
@@ -123,7 +241,8 @@ P.S. [Urgency or bonus]""",
 [Call to action]
 
 [Engagement question]""",
-                "examples_needed": 2
+                "examples_needed": 2,
+                "example_token_budget": 800
             },
             
             "product_descriptions": {
@@ -147,9 +266,24 @@ P.S. [Urgency or bonus]""",
 Perfect for: [Specific persona]
 
 [Low-risk CTA]""",
-                "examples_needed": 2
+                "examples_needed": 2,
+                "example_token_budget": 400
             }
         }
+        self.compile_templates()
+
+    def compile_templates(self):
+        """
+        Pre-render the static parts of every style guide.
+        Call again if you edit self.style_guides after creating the engineer.
+        """
+        self.templates = {
+            content_type: PromptTemplate(style)
+            for content_type, style in self.style_guides.items()
+        }
+        if self.cache is not None:
+            for content_type in self.style_guides:
+                self.cache.invalidate(content_type)
     
     def create_prompt(self, content_type, topic, tone, target_audience, key_points, brand_voice=None):
         """
@@ -158,77 +292,105 @@ Perfect for: [Specific persona]
         Few-Shot Prompting means showing examples so the AI learns the pattern.
         Like showing a child 2-3 examples of a cat before asking them to draw one.
         """
-        
-        # Step 1: Get the style guide for this content type
-        style = self.style_guides.get(content_type, {})
-        if not style:
-            return f"Write {content_type} about {topic}"  # Fallback
-        
-        # Step 2: Fetch similar examples from our database
-        similar_examples = self.db.find_similar_examples(
-            content_type=content_type,
-            topic=topic,
-            tone=tone,
-            target_audience=target_audience,
-            n_results=style.get("examples_needed", 2)
-        )
-        
-        # Step 3: Build the prompt piece by piece
-        
-        # === IDENTITY SECTION ===
-        prompt = f"""You are an elite marketing copywriter with 20 years of experience.
-You've written for Fortune 500 companies and won multiple advertising awards.
-Your copy converts readers into customers. You write in a {tone} tone.
+        return self.create_prompts([{
+            "content_type": content_type,
+            "topic": topic,
+            "tone": tone,
+            "target_audience": target_audience,
+            "key_points": key_points,
+            "brand_voice": brand_voice
+        }])[0]
 
-TASK: Create {style['name']} about {topic}
+    def create_prompts(self, requests):
+        """
+        Build prompts for many requests at once.
+        Cached prompts are reused; examples for the rest are fetched with one
+        batched lookup per content type.
+        Each request is a dict with the same keys as create_prompt.
+        """
+        prompts = [None] * len(requests)
+        keys = [self._cache_key(request) for request in requests]
+        by_type = {}
+        for i, key in enumerate(keys):
+            if self.cache is not None:
+                prompts[i] = self.cache.get(key)
+            if prompts[i] is None:
+                by_type.setdefault(key[0], []).append(i)
 
-TARGET AUDIENCE: {target_audience}
-TONE: {tone}
-KEY POINTS TO EMPHASIZE: {', '.join(key_points)}
-"""
-        
-        # Add brand voice if provided
-        if brand_voice:
-            prompt += f"\nBRAND VOICE GUIDELINES: {brand_voice}\n"
-        
-        # === STYLE RULES SECTION ===
-        prompt += f"\nSTRICT RULES YOU MUST FOLLOW:\n"
-        for i, rule in enumerate(style['rules'], 1):
-            prompt += f"{i}. {rule}\n"
-        
-        # === FEW-SHOT EXAMPLES SECTION ===
-        if similar_examples:
-            prompt += f"\n{'='*60}\n"
-            prompt += "EXAMPLES OF EXCELLENT WORK (Study these patterns):\n"
-            prompt += f"{'='*60}\n"
-            
-            for idx, example in enumerate(similar_examples, 1):
-                prompt += f"\n--- EXAMPLE {idx} ---\n"
-                prompt += f"{example}\n"
-            
-            prompt += f"\n{'='*60}\n"
-            prompt += "NOTICE THE PATTERNS ABOVE. NOW CREATE SOMETHING ORIGINAL.\n"
-            prompt += f"{'='*60}\n"
-        
-        # === OUTPUT FORMAT SECTION ===
-        prompt += f"\nOUTPUT FORMAT (Follow this exactly):\n"
-        prompt += style['format']
-        
-        # === FINAL INSTRUCTIONS ===
-        prompt += f"""
+        for content_type, indexes in by_type.items():
+            generation = self.cache.generation(content_type) if self.cache is not None else 0
 
-ADDITIONAL INSTRUCTIONS:
-• Be original - do not copy the examples word for word
-• Focus on benefits, not just features
-• Make it sound human, not robotic
-• Ensure every word earns its place
-• The content should feel {tone}
+            # Step 1: Get the style guide for this content type
+            style = self.style_guides.get(content_type, {})
+            if not style:
+                for i in indexes:
+                    prompts[i] = f"Write {content_type} about {keys[i][1]}"  # Fallback
+            else:
+                # Step 2: Fetch similar examples from our database - a few
+                # more than needed, so long ones can give way to shorter ones
+                # (prefix-stable prompts all get the same ones)
+                examples_needed = style.get("examples_needed", 2)
+                n_candidates = examples_needed * CANDIDATES_PER_EXAMPLE
+                with tracer.span("retrieval"):
+                    if self.layout == "prefix_stable":
+                        stable = self.db.first_examples(content_type, n_candidates)
+                        candidates_per_request = [stable] * len(indexes)
+                    else:
+                        candidates_per_request = self.db.find_similar_examples_batch(
+                            content_type,
+                            [{"topic": keys[i][1], "tone": keys[i][2], "target_audience": keys[i][3]}
+                             for i in indexes],
+                            n_results=n_candidates
+                        )
+                
+                # Step 3: Build the prompt piece by piece
+                template = self.templates[content_type]
+                render = template.render_prefix_stable if self.layout == "prefix_stable" else template.render
+                with tracer.span("render"):
+                    for i, candidates in zip(indexes, candidates_per_request):
+                        _, topic, tone, target_audience, key_points, brand_voice = keys[i]
+                        similar_examples = pack_examples(
+                            candidates, examples_needed, style.get("example_token_budget")
+                        )
+                        prompts[i] = render(
+                            topic, tone, target_audience, key_points, brand_voice, similar_examples
+                        )
 
-Now create the {style['name']} for: {topic}
+            if self.cache is not None:
+                for i in indexes:
+                    self.cache.put(keys[i], prompts[i], content_type, generation)
+        return prompts
 
-YOUR RESPONSE:"""
-        
-        return prompt
+    def prompt_fingerprint(self, request):
+        """
+        A string that changes whenever the prompt for this request would change,
+        apart from the few-shot examples (normalized request + its style guide,
+        and the layout unless it's the classic one).
+        """
+        key = self._cache_key(request)
+        parts = [key, self.style_guides.get(key[0])]
+        if self.layout != "classic":
+            parts.append(self.layout)
+        return json.dumps(parts, sort_keys=True)
+
+    @staticmethod
+    def _cache_key(request):
+        """
+        Normalize a request so trivially different spellings share a prompt.
+        The prompt is built from these normalized values, so a cached prompt
+        is exactly what a fresh build would produce.
+        """
+        def clean(value):
+            return value.strip() if isinstance(value, str) else value
+
+        return (
+            request["content_type"],
+            clean(request["topic"]),
+            clean(request["tone"]),
+            clean(request["target_audience"]),
+            tuple(clean(point) for point in request["key_points"]),
+            clean(request.get("brand_voice")) or None,
+        )
 
 
 # Test the prompt engineer
@@ -237,6 +399,7 @@ if __name__ == "__main__":
     
     # Import database
     from database import MarketingDatabase
+    from tokens import count_tokens
     
     # Create database
     db = MarketingDatabase()
@@ -258,5 +421,5 @@ if __name__ == "__main__":
     print("="*60)
     print(test_prompt[:500] + "...")  # Show first 500 characters
     print("="*60)
-    print(f"\nPrompt length: {len(test_prompt)} characters")
+    print(f"\nPrompt length: {len(test_prompt)} characters (~{count_tokens(test_prompt)} tokens)")
     print("✅ Prompt Engineer test complete!")
\ No newline at end of file
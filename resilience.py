@@ -0,0 +1,412 @@
+"""
+Resilient Backend
+Wraps any LLM backend with the usual defences against a flaky provider:
+
+- retries: transient failures (connection errors, timeouts, 5xx, 429) are
+  tried again after a jittered, exponentially growing pause
+- hedging: if a call is slower than the recent p95, an identical second
+  request is fired; whichever answers first wins, the other is cancelled
+- circuit breaker: after enough failures in a row, calls fail straight
+  away for a while instead of piling up on a dead backend
+
+    backend = ResilientBackend(HTTPBackend(url), hedge=True)
+
+Its methods wrap the backend's. To make every single request sent wait
+for something - a rate-limit scheduler's turn, say - call run() / arun()
+with a gate, or run_stream() / arun_stream() with a function that opens one
+(already scheduled) stream: each retry and hedge then waits on its own.
+"""
+
+import asyncio
+import http.client
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from llm_backends import BackendError, LLMBackend
+
+
+class CircuitOpenError(BackendError):
+    """The backend failed too often lately; not even trying"""
+
+
+def is_transient(error):
+    """Worth trying again: the request may well work a moment later"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, BackendError):
+        return error.status == 429 or (error.status or 0) >= 500
+    return isinstance(error, (OSError, TimeoutError, asyncio.TimeoutError, EOFError, http.client.HTTPException))
+
+
+class CircuitBreaker:
+    """
+    closed: calls go through. After `failure_threshold` failures in a row
+    it opens: calls are refused for `reset_timeout` seconds. Then it is
+    half open: one trial call goes through; success closes it again,
+    failure opens it for another round.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._trial_running:
+                    return False
+                self._trial_running = True
+            return True
+
+    def success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_running = False
+
+    def release(self):
+        """The call was abandoned before it told us anything: just free the trial slot"""
+        with self._lock:
+            self._trial_running = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class ResilientBackend(LLMBackend):
+    """
+    retries: extra attempts after a transient failure (so retries + 1 in
+    all), pausing a random 0..min(max_backoff, base_backoff * 2**n) seconds
+    - or at least the server's Retry-After.
+    hedge: send a second copy of a call that hasn't answered after
+    hedge_after seconds (default: the hedge_percentile of recent call
+    times, once there are enough of them). Streams are retried before
+    their first piece but never hedged.
+    """
+
+    def __init__(self, backend, retries=2, base_backoff=0.2, max_backoff=5.0, hedge=False,
+                 hedge_after=None, hedge_percentile=95, failure_threshold=5, reset_timeout=30.0):
+        self.backend = backend
+        self.name = backend.name
+        self.retries = retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.hedge_percentile = hedge_percentile
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._latencies = deque(maxlen=500)  # Seconds per successful call
+        self._pool = None
+        self._lock = threading.Lock()
+        self.counts = {"calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "failures": 0, "rejected": 0}
+
+    def cache_params(self):
+        return self.backend.cache_params()
+
+    def _count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    def hedge_delay(self):
+        """Seconds to wait before hedging, or None while there's too little history"""
+        if self.hedge_after is not None:
+            return self.hedge_after
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < 20:
+            return None
+        return samples[min(len(samples) - 1, int(self.hedge_percentile / 100 * len(samples)))]
+
+    def _backoff(self, attempt, error):
+        delay = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+        return max(delay, getattr(error, "retry_after", None) or 0)
+
+    def _admit(self):
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError(f"{self.name} backend is failing, not calling it for now "
+                                   f"(circuit open)", status=503)
+
+    def _settle(self, error=None):
+        """Tell the breaker how a call went"""
+        if error is None:
+            self.breaker.success()
+        elif is_transient(error) and getattr(error, "status", None) != 429:
+            self.breaker.failure()
+            self._count("failures")
+        elif isinstance(error, BackendError) and error.status is not None:
+            self.breaker.success()  # It answered - a 400 or 429 isn't an outage
+        else:
+            self.breaker.release()  # Went wrong on our side; says nothing about the backend
+
+    def _retry(self, attempt, error):
+        """True (after counting it) if the failed attempt should be retried"""
+        if attempt >= self.retries or not is_transient(error):
+            return False
+        self._count("retries")
+        return True
+
+    # Plain calls
+
+    def complete(self, prompt, content_type, topic, tone):
+        return self.run(lambda: self.backend.complete(prompt, content_type, topic, tone))
+
+    def complete_variants(self, prompt, content_type, topic, tone, n):
+        return self.run(lambda: self.backend.complete_variants(prompt, content_type, topic, tone, n))
+
+    def run(self, call, discarded=None, gate=None):
+        """
+        call() with retries, hedging and the circuit breaker; call makes
+        one request. gate(send), if given, is what each request waits on
+        before it goes out (a scheduler turn, say): it calls send() and
+        returns its result. Hedge timing starts once a request is sent.
+        discarded(response) is told about a hedged copy that lost the race
+        but still answered (it was paid for).
+        """
+        self._count("calls")
+        for attempt in range(self.retries + 1):
+            self._admit()
+            try:
+                response = self._hedged(call, discarded, gate)
+            except Exception as e:
+                self._settle(e)
+                if not self._retry(attempt, e):
+                    raise
+                time.sleep(self._backoff(attempt, e))
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self._settle()
+            return response
+
+    def _sender(self, call, gate, sent):
+        """call behind the gate; sets `sent` as the request goes out and times it"""
+        def send():
+            sent.set()
+            started = time.perf_counter()
+            response = call()
+            with self._lock:
+                self._latencies.append(time.perf_counter() - started)
+            return response
+
+        if gate is None:
+            return send
+        return lambda: gate(send)
+
+    def _hedged(self, call, discarded=None, gate=None):
+        """call(), plus a second copy if the first is slow. A losing thread can't be stopped - it's ignored"""
+        delay = self.hedge_delay() if self.hedge else None
+        if delay is None:
+            return self._sender(call, gate, threading.Event())()
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+        sent = threading.Event()
+        first = self._pool.submit(self._sender(call, gate, sent))
+        first.add_done_callback(lambda _: sent.set())
+        sent.wait()
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeout:
+            pass
+        self._count("hedges")
+        second = self._pool.submit(self._sender(call, gate, threading.Event()))
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self._count("hedge_wins")
+                    if discarded is not None:
+                        loser = first if future is second else second
+                        loser.add_done_callback(lambda f: self._report_loser(f, discarded))
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    @staticmethod
+    def _report_loser(future, discarded):
+        if future.exception() is None:
+            discarded(future.result())
+
+    async def acomplete(self, prompt, content_type, topic, tone):
+        return await self.arun(lambda: self.backend.acomplete(prompt, content_type, topic, tone))
+
+    async def acomplete_variants(self, prompt, content_type, topic, tone, n):
+        return await self.arun(lambda: self.backend.acomplete_variants(prompt, content_type, topic, tone, n))
+
+    async def arun(self, coroutine_fn, discarded=None, gate=None):
+        """
+        asyncio version of run(); gate(send) returns a coroutine. A hedged
+        copy that loses is cancelled, so discarded only hears of it if it
+        had already answered; what a cancelled request cost isn't known.
+        """
+        self._count("calls")
+        for attempt in range(self.retries + 1):
+            self._admit()
+            try:
+                response = await self._ahedged(coroutine_fn, discarded, gate)
+            except asyncio.CancelledError:
+                self.breaker.release()  # Our caller gave up; says nothing about the backend
+                raise
+            except Exception as e:
+                self._settle(e)
+                if not self._retry(attempt, e):
+                    raise
+                await asyncio.sleep(self._backoff(attempt, e))
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self._settle()
+            return response
+
+    def _asender(self, coroutine_fn, gate, sent):
+        async def send():
+            sent.set()
+            started = time.perf_counter()
+            response = await coroutine_fn()
+            with self._lock:
+                self._latencies.append(time.perf_counter() - started)
+            return response
+
+        if gate is None:
+            return send
+        return lambda: gate(send)
+
+    async def _ahedged(self, coroutine_fn, discarded=None, gate=None):
+        delay = self.hedge_delay() if self.hedge else None
+        if delay is None:
+            return await self._asender(coroutine_fn, gate, asyncio.Event())()
+        sent = asyncio.Event()
+        first = asyncio.ensure_future(self._asender(coroutine_fn, gate, sent)())
+        first.add_done_callback(lambda _: sent.set())
+        tasks = {first}
+        winner = None
+        try:
+            await sent.wait()
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return first.result()
+            self._count("hedges")
+            second = asyncio.ensure_future(self._asender(coroutine_fn, gate, asyncio.Event())())
+            tasks.add(second)
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self._count("hedge_wins")
+                        winner = task
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()  # The loser (or both, if we were cancelled)
+                elif (task is not winner and winner is not None and discarded is not None
+                      and not task.cancelled() and task.exception() is None):
+                    discarded(task.result())  # Both answered at once
+
+    # Streams: retried until the first piece arrives, never hedged
+
+    def stream(self, prompt, content_type, topic, tone, response):
+        return self.run_stream(lambda: self.backend.stream(prompt, content_type, topic, tone, response))
+
+    def run_stream(self, stream_fn):
+        """Yield from stream_fn() (a fresh stream per attempt) with retries and the circuit breaker"""
+        self._count("calls")
+        for attempt_number in range(self.retries + 1):
+            self._admit()
+            yielded = False
+            try:
+                for piece in stream_fn():
+                    yielded = True
+                    yield piece
+            except Exception as e:
+                self._settle(e)
+                if yielded or not self._retry(attempt_number, e):
+                    raise
+                time.sleep(self._backoff(attempt_number, e))
+                continue
+            except BaseException:
+                # The caller stopped reading: the backend was fine if it had started answering
+                if yielded:
+                    self.breaker.success()
+                else:
+                    self.breaker.release()
+                raise
+            self._settle()
+            return
+
+    def astream(self, prompt, content_type, topic, tone, response):
+        return self.arun_stream(lambda: self.backend.astream(prompt, content_type, topic, tone, response))
+
+    async def arun_stream(self, stream_fn):
+        """asyncio version of run_stream()"""
+        self._count("calls")
+        for attempt_number in range(self.retries + 1):
+            self._admit()
+            yielded = False
+            try:
+                async for piece in stream_fn():
+                    yielded = True
+                    yield piece
+            except Exception as e:
+                self._settle(e)
+                if yielded or not self._retry(attempt_number, e):
+                    raise
+                await asyncio.sleep(self._backoff(attempt_number, e))
+                continue
+            except BaseException:
+                if yielded:
+                    self.breaker.success()
+                else:
+                    self.breaker.release()
+                raise
+            self._settle()
+            return
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        delay = self.hedge_delay() if self.hedge else None
+        return {
+            **counts,
+            "circuit": self.breaker.state,
+            "times_opened": self.breaker.times_opened,
+            "hedge_after_seconds": delay,
+        }
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+        self.backend.close()
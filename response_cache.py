@@ -0,0 +1,133 @@
+"""
+Response Cache
+Identical requests get the answer we already paid for, straight from disk.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    Content-addressed cache of model responses.
+
+    The key is a SHA-256 of the prompt (or a fingerprint of it) plus
+    everything that changes the model's answer (backend, model,
+    temperature, ...). Each entry is one small JSON file named after its
+    key, so the cache survives restarts.
+    Responses are also kept in memory; the least recently used ones are
+    dropped (from memory and disk) once max_entries or max_bytes is hit.
+    """
+
+    def __init__(self, directory=".response_cache", max_entries=10000, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._index = OrderedDict()   # key -> size on disk, oldest first
+        self._memory = {}             # key -> response dict (filled lazily)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the LRU order from file modification times"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            entries.append((stat.st_mtime, name[:-5], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._bytes += size
+
+    @staticmethod
+    def key(prompt, params):
+        """Hash the prompt together with the parameters that shape the answer"""
+        payload = json.dumps({"prompt": prompt, "params": params}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            response = self._memory.get(key)
+        if response is None:
+            try:
+                with open(self._path(key), 'r', encoding='utf-8') as f:
+                    response = json.load(f)
+            except (OSError, ValueError):
+                with self._lock:
+                    self._forget(key)
+                    self.misses += 1
+                return None
+            with self._lock:
+                # Don't bring back an entry that was evicted while we read it
+                if key in self._index:
+                    self._memory[key] = response
+                self.hits += 1
+            return response
+        try:
+            os.utime(self._path(key))  # Keep LRU order across restarts
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return response
+
+    def put(self, key, response):
+        data = json.dumps(response).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if key in self._index:
+                self._bytes -= self._index.pop(key)
+            self._index[key] = len(data)
+            self._memory[key] = response
+            self._bytes += len(data)
+            while len(self._index) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._index))
+                self._forget(oldest)
+                self.evictions += 1
+
+    def _forget(self, key):
+        self._bytes -= self._index.pop(key, 0)
+        self._memory.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._index):
+                self._forget(key)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._index),
+            "bytes": self._bytes,
+        }
@@ -0,0 +1,130 @@
+"""
+Retrieval Index for Few-Shot Examples
+A tiny BM25 search engine that lives in memory - no downloads needed.
+"""
+
+import heapq
+import math
+import re
+from bisect import insort
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in",
+    "is", "it", "of", "on", "or", "our", "that", "the", "this", "to",
+    "we", "with", "you", "your",
+}
+
+# How much each field counts towards a match
+FIELD_WEIGHTS = {
+    "topic": 3.0,
+    "target_audience": 2.0,
+    "tone": 2.0,
+    "content": 1.0,
+}
+
+
+def tokenize(text):
+    """Split text into lowercase search terms"""
+    if not text:
+        return []
+    return [
+        token for token in TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 1 and token not in STOPWORDS
+    ]
+
+
+class BM25Index:
+    """
+    Inverted index with BM25 scoring.
+
+    Each term keeps a "champion list": only its highest-impact documents,
+    sorted best first. A query only walks those short lists, so search time
+    stays flat no matter how many examples are stored.
+    """
+
+    def __init__(self, k1=1.2, b=0.75, champion_size=256):
+        self.k1 = k1
+        self.b = b
+        self.champion_size = champion_size
+        self.doc_count = 0
+        self.total_length = 0.0
+        self.doc_freq = {}      # term -> number of documents containing it
+        self.champions = {}     # term -> [(-impact, doc_id), ...] best first
+
+    @staticmethod
+    def _term_freqs(fields):
+        term_freqs = {}
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS.get(field, 1.0)
+            for token in tokenize(text):
+                term_freqs[token] = term_freqs.get(token, 0.0) + weight
+        return term_freqs
+
+    def build(self, documents):
+        """
+        Index many (doc_id, fields) pairs at once.
+        Much faster than calling add() in a loop: every posting list is
+        sorted a single time at the end.
+        """
+        parsed = [(doc_id, self._term_freqs(fields)) for doc_id, fields in documents]
+        if not parsed:
+            return
+
+        lengths = [sum(term_freqs.values()) for _, term_freqs in parsed]
+        self.doc_count += len(parsed)
+        self.total_length += sum(lengths)
+        avg_length = self.total_length / self.doc_count
+
+        postings = {}
+        for (doc_id, term_freqs), length in zip(parsed, lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+            for term, tf in term_freqs.items():
+                postings.setdefault(term, []).append(
+                    (-tf * (self.k1 + 1) / (tf + norm), doc_id)
+                )
+
+        for term, new_postings in postings.items():
+            self.doc_freq[term] = self.doc_freq.get(term, 0) + len(new_postings)
+            merged = self.champions.get(term, []) + new_postings
+            merged.sort()
+            self.champions[term] = merged[:self.champion_size]
+
+    def add(self, doc_id, fields):
+        """Index one document given as {field_name: text}"""
+        term_freqs = self._term_freqs(fields)
+
+        length = sum(term_freqs.values())
+        self.doc_count += 1
+        self.total_length += length
+        avg_length = self.total_length / self.doc_count
+        norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+
+        for term, tf in term_freqs.items():
+            self.doc_freq[term] = self.doc_freq.get(term, 0) + 1
+            impact = tf * (self.k1 + 1) / (tf + norm)
+            postings = self.champions.setdefault(term, [])
+            if len(postings) < self.champion_size:
+                insort(postings, (-impact, doc_id))
+            elif -impact < postings[-1][0]:
+                insort(postings, (-impact, doc_id))
+                postings.pop()
+
+    def idf(self, term):
+        df = self.doc_freq.get(term, 0)
+        return math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+
+    def search(self, query, k=3):
+        """Return up to k (doc_id, score) pairs, best match first"""
+        scores = {}
+        for term in set(tokenize(query)):
+            postings = self.champions.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for neg_impact, doc_id in postings:
+                scores[doc_id] = scores.get(doc_id, 0.0) - idf * neg_impact
+
+        # Ties go to the older example, like the original first-n behaviour
+        return heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))
@@ -0,0 +1,308 @@
+"""
+Rate-Limit Scheduler
+Sits in front of the model backend and keeps us under the provider's
+requests-per-minute and tokens-per-minute limits, instead of finding them
+with a storm of 429s.
+
+    scheduler = RateLimitScheduler(requests_per_minute=500, tokens_per_minute=90000)
+    response = scheduler.call(lambda: backend.complete(...), count_tokens(prompt), lane="bulk")
+
+Waiting requests are kept in lanes: everything in "interactive" (app
+clicks) goes before anything in "bulk" (batch jobs). Inside a lane, flows
+(one per batch, say) take turns, so one huge batch can't starve a small one.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+
+LANES = ("interactive", "bulk")
+
+
+class TokenBucket:
+    """
+    Refills at `per_minute` units a minute, holding at most `capacity`.
+    Taking more than the capacity is allowed once the bucket is full (it
+    goes into debt), so an oversized request waits instead of hanging forever.
+    """
+
+    def __init__(self, per_minute, capacity):
+        self.rate = per_minute / 60
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` can be taken"""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount):
+        self.level -= amount
+
+    def give_back(self, amount):
+        """Return (or, with a negative amount, charge) the difference to an estimate"""
+        self.level = min(self.capacity, self.level + amount)
+
+    def empty_until(self, when):
+        """Start refilling from nothing at `when` (monotonic time)"""
+        self.level = min(self.level, 0)
+        self.updated = max(self.updated, when)
+
+
+class _Ticket:
+    """One request waiting for its turn (woken by an Event or an asyncio future)"""
+
+    __slots__ = ("lane", "flow", "tokens", "granted", "event", "loop", "future")
+
+    def __init__(self, lane, flow, tokens):
+        self.lane = lane
+        self.flow = flow if flow is not None else self  # No flow: a turn of its own
+        self.tokens = tokens
+        self.granted = False
+        self.event = None
+        self.loop = None
+        self.future = None
+
+    def wake(self):
+        if self.event is not None:
+            self.event.set()
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._resolve)
+        except RuntimeError:
+            pass  # Its event loop is gone
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class RateLimitScheduler:
+    """
+    Grants model calls when both buckets allow them, in lane and flow order.
+
+    Token costs are estimated up front (prompt tokens plus the average
+    completion seen so far) and corrected once the provider reports actual
+    usage. A 429 with Retry-After pauses every lane for that long. Either
+    limit can be None. burst_seconds is how much unused capacity may pile
+    up (providers often enforce limits over a few seconds, not a whole minute).
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, completion_tokens=300,
+                 lanes=LANES, burst_seconds=10):
+        def bucket(per_minute):
+            if not per_minute:
+                return None
+            return TokenBucket(per_minute, max(1, per_minute * burst_seconds / 60))
+
+        self.requests = bucket(requests_per_minute)
+        self.tokens = bucket(tokens_per_minute)
+        self.lanes = {lane: OrderedDict() for lane in lanes}  # lane -> {flow: deque of tickets}
+        self.completion_tokens = completion_tokens  # Running estimate per call
+        self._lock = threading.Lock()
+        self._timer = None
+        self._timer_due = 0.0
+        self._paused_until = 0.0
+        self.granted = 0
+        self.rate_limited = 0  # 429s that got through anyway
+
+    def _enqueue(self, ticket):
+        if ticket.lane not in self.lanes:
+            raise ValueError(f"Unknown lane: {ticket.lane}")
+        flows = self.lanes[ticket.lane]
+        queue = flows.get(ticket.flow)
+        if queue is None:
+            queue = flows[ticket.flow] = deque()
+        queue.append(ticket)
+        self._dispatch()
+
+    def _remove(self, ticket):
+        flows = self.lanes[ticket.lane]
+        queue = flows.get(ticket.flow)
+        if queue is not None and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del flows[ticket.flow]
+
+    def _dispatch(self):
+        """Grant everything that may go now (call with the lock held)"""
+        while True:
+            for flows in self.lanes.values():
+                if flows:
+                    flow, queue = next(iter(flows.items()))
+                    break
+            else:
+                return
+            ticket = queue[0]
+
+            now = time.monotonic()
+            wait = self._paused_until - now
+            if self.requests is not None:
+                wait = max(wait, self.requests.wait_time(1, now))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.wait_time(ticket.tokens, now))
+            if wait > 0:
+                self._wake_after(now, wait)
+                return
+
+            queue.popleft()
+            if queue:
+                flows.move_to_end(flow)  # Next flow's turn
+            else:
+                del flows[flow]
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(ticket.tokens)
+            ticket.granted = True
+            self.granted += 1
+            ticket.wake()
+
+    def _wake_after(self, now, wait):
+        due = now + wait
+        if self._timer is not None:
+            if self._timer_due <= due:
+                return
+            self._timer.cancel()
+        self._timer_due = due
+        self._timer = threading.Timer(wait, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            self._dispatch()
+
+    def _acquire(self, prompt_tokens, lane, flow):
+        ticket = _Ticket(lane, flow, prompt_tokens + self.completion_tokens)
+        ticket.event = threading.Event()
+        with self._lock:
+            self._enqueue(ticket)
+        ticket.event.wait()
+        return ticket
+
+    async def _aacquire(self, prompt_tokens, lane, flow):
+        ticket = _Ticket(lane, flow, prompt_tokens + self.completion_tokens)
+        ticket.loop = asyncio.get_running_loop()
+        ticket.future = ticket.loop.create_future()
+        with self._lock:
+            self._enqueue(ticket)
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            with self._lock:
+                if ticket.granted:
+                    self._refund(ticket)
+                else:
+                    self._remove(ticket)
+                self._dispatch()
+            raise
+        return ticket
+
+    def _refund(self, ticket):
+        """The granted call never happened"""
+        if self.requests is not None:
+            self.requests.give_back(1)
+        if self.tokens is not None:
+            self.tokens.give_back(ticket.tokens)
+
+    def _release(self, ticket, response=None, error=None):
+        """Settle a finished call: correct the token estimate, back off on 429"""
+        with self._lock:
+            if error is not None and getattr(error, "status", None) == 429:
+                self.rate_limited += 1
+                pause = getattr(error, "retry_after", None) or 1.0
+                self._paused_until = max(self._paused_until, time.monotonic() + pause)
+                # Resume at the steady rate, not with a burst saved up while paused
+                for bucket in (self.requests, self.tokens):
+                    if bucket is not None:
+                        bucket.empty_until(self._paused_until)
+            usage = (response or {}).get("usage")
+            if usage:
+                completion = usage.get("completion_tokens", 0)
+                if self.tokens is not None:
+                    self.tokens.give_back(ticket.tokens - usage.get("prompt_tokens", 0) - completion)
+                self.completion_tokens += (completion - self.completion_tokens) / 10
+            self._dispatch()
+
+    def call(self, fn, prompt_tokens, lane="interactive", flow=None):
+        """Wait for a turn, then return fn()'s response"""
+        ticket = self._acquire(prompt_tokens, lane, flow)
+        try:
+            response = fn()
+        except Exception as e:
+            self._release(ticket, error=e)
+            raise
+        except BaseException:
+            self._release(ticket)
+            raise
+        self._release(ticket, response)
+        return response
+
+    async def acall(self, coroutine_fn, prompt_tokens, lane="interactive", flow=None):
+        """asyncio version of call()"""
+        ticket = await self._aacquire(prompt_tokens, lane, flow)
+        try:
+            response = await coroutine_fn()
+        except Exception as e:
+            self._release(ticket, error=e)
+            raise
+        except BaseException:
+            self._release(ticket)
+            raise
+        self._release(ticket, response)
+        return response
+
+    def stream(self, stream_fn, prompt_tokens, response, lane="interactive", flow=None):
+        """Wait for a turn, then yield from stream_fn(), which fills in `response`"""
+        ticket = self._acquire(prompt_tokens, lane, flow)
+        try:
+            yield from stream_fn()
+        except Exception as e:
+            self._release(ticket, error=e)
+            raise
+        except BaseException:  # The caller stopped early
+            self._release(ticket)
+            raise
+        self._release(ticket, response)
+
+    async def astream(self, stream_fn, prompt_tokens, response, lane="interactive", flow=None):
+        """asyncio version of stream()"""
+        ticket = await self._aacquire(prompt_tokens, lane, flow)
+        try:
+            async for piece in stream_fn():
+                yield piece
+        except Exception as e:
+            self._release(ticket, error=e)
+            raise
+        except BaseException:
+            self._release(ticket)
+            raise
+        self._release(ticket, response)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            for bucket in (self.requests, self.tokens):
+                if bucket is not None:
+                    bucket.wait_time(0, now)  # Brings the level up to date
+            return {
+                "waiting": {
+                    lane: sum(len(queue) for queue in flows.values()) for lane, flows in self.lanes.items()
+                },
+                "granted": self.granted,
+                "rate_limited": self.rate_limited,
+                "paused_seconds": max(0.0, self._paused_until - now),
+                "requests_available": self.requests.level if self.requests is not None else None,
+                "tokens_available": self.tokens.level if self.tokens is not None else None,
+                "completion_tokens_estimate": self.completion_tokens,
+            }
@@ -0,0 +1,335 @@
+"""
+HTTP Generation Service
+The content generator for other programs (the Streamlit page is for people).
+Run it with:  python server.py --port 8000
+
+    POST /generate          {"content_type": "ad_copy", "topic": "...", ...}
+    POST /generate/batch    {"requests": [{...}, {...}], "concurrency": 50}
+    GET  /stats             queue, stored examples and token usage
+
+Requests wait in a bounded queue for one of `workers` slots. When the queue
+is full the answer is 429 straight away, so overload shows up as fast
+rejections instead of an ever-growing backlog. Connections are kept alive
+between requests.
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+from http import HTTPStatus
+
+MAX_BODY_BYTES = 4 * 1024 * 1024
+MAX_VARIANTS = 10
+
+# What a request may say, besides content_type and topic (see generate())
+GENERATE_FIELDS = {"tone", "target_audience", "key_points", "brand_voice", "use_cache", "timeout", "n_variants"}
+BATCH_FIELDS = {"concurrency", "timeout", "use_cache"}
+
+
+class GenerationServer:
+    """
+    Serves one MarketingContentGenerator over HTTP/1.1 with asyncio.
+    Pass a generator to share one that already exists (the app's), or
+    leave it out to build one the usual way (LLM_BACKEND_URL etc.).
+    """
+
+    def __init__(self, generator=None, host="127.0.0.1", port=8000, workers=32, queue_size=256,
+                 max_batch=1000, keepalive_timeout=15.0):
+        self.generator = generator
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_batch = max_batch
+        self.keepalive_timeout = keepalive_timeout
+        self.accepted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.in_flight = 0
+        self._queue = None  # Made on the server's own event loop
+
+    async def _start(self):
+        if self.generator is None:
+            from content_generator import MarketingContentGenerator
+            self.generator = await asyncio.to_thread(MarketingContentGenerator)
+        self._queue = asyncio.Queue(self.queue_size)
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        server = await asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+        self.port = server.sockets[0].getsockname()[1]
+        return server
+
+    async def serve_forever(self):
+        server = await self._start()
+        print(f"🌐 Generation API listening on http://{self.host}:{self.port} "
+              f"({self.workers} workers, queue of {self.queue_size})")
+        async with server:
+            await server.serve_forever()
+
+    def start_background(self):
+        """Run the server on its own thread; returns its base URL"""
+        ready = threading.Event()
+        errors = []
+
+        async def main():
+            server = await self._start()
+            ready.set()
+            async with server:
+                await server.serve_forever()
+
+        def run():
+            try:
+                asyncio.run(main())
+            except Exception as e:  # e.g. the port is taken
+                errors.append(e)
+                ready.set()
+
+        threading.Thread(target=run, name="generation-api", daemon=True).start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+        print(f"🌐 Generation API listening on http://{self.host}:{self.port}")
+        return f"http://{self.host}:{self.port}"
+
+    async def _worker(self):
+        while True:
+            job, future = await self._queue.get()
+            self.in_flight += 1
+            try:
+                result = await job()
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self.in_flight -= 1
+                self.completed += 1
+
+    async def _submit(self, job):
+        """
+        Queue job (a coroutine function) and wait for its result.
+        Raises asyncio.QueueFull when there is no room - nothing is queued then.
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((job, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise
+        self.accepted += 1
+        return await future
+
+    async def stats(self):
+        return {
+            "queue": {
+                "waiting": self._queue.qsize(),
+                "capacity": self.queue_size,
+                "workers": self.workers,
+                "in_flight": self.in_flight,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "completed": self.completed,
+            },
+            "coalescing": {
+                "model_calls": self.generator.single_flight.leaders,
+                "coalesced": self.generator.single_flight.coalesced,
+                "in_flight": self.generator.single_flight.in_flight(),
+            },
+            "rate_limits": self.generator.scheduler.stats() if self.generator.scheduler is not None else None,
+            "backend": {"name": self.generator.backend.name, **self.generator.backend.stats()},
+            "examples": await asyncio.to_thread(self.generator.db.get_stats),
+            "usage": self.generator.usage.to_dict(),
+        }
+
+    def _check_request(self, request, allowed):
+        """Error message for a malformed generate request, or None"""
+        if not isinstance(request, dict):
+            return "Each request must be a JSON object"
+        for field in ("content_type", "topic"):
+            if not isinstance(request.get(field), str) or not request[field]:
+                return f"'{field}' is required"
+        # Content types become database keys, metric labels and file names:
+        # only the ones there is a style guide for
+        content_types = self.generator.prompt_engineer.style_guides
+        if request["content_type"] not in content_types:
+            return f"'content_type' must be one of: {', '.join(sorted(content_types))}"
+        unknown = set(request) - allowed - {"content_type", "topic"}
+        if unknown:
+            return f"Unknown fields: {', '.join(sorted(unknown))}"
+        for field in ("tone", "target_audience"):
+            if field in request and not isinstance(request[field], str):
+                return f"'{field}' must be a string"
+        if request.get("brand_voice") is not None and not isinstance(request["brand_voice"], str):
+            return "'brand_voice' must be a string"
+        key_points = request.get("key_points", [])
+        if not isinstance(key_points, list) or not all(isinstance(point, str) for point in key_points):
+            return "'key_points' must be a list of strings"
+        n_variants = request.get("n_variants", 1)
+        if type(n_variants) is not int or not 1 <= n_variants <= MAX_VARIANTS:
+            return f"'n_variants' must be a whole number from 1 to {MAX_VARIANTS}"
+        return self._check_options(request)
+
+    @staticmethod
+    def _check_options(request):
+        """Error message for a bad concurrency / timeout / use_cache, or None"""
+        concurrency = request.get("concurrency", 1)
+        if type(concurrency) is not int or concurrency < 1:
+            return "'concurrency' must be a whole number of at least 1"
+        timeout = request.get("timeout")
+        if timeout is not None and (type(timeout) not in (int, float) or not 0 < timeout < float("inf")):
+            return "'timeout' must be a positive number of seconds"
+        if type(request.get("use_cache", True)) is not bool:
+            return "'use_cache' must be true or false"
+        return None
+
+    async def _route(self, method, path, body):
+        """Returns (status, payload)"""
+        if path == "/stats":
+            if method != "GET":
+                return 405, {"error": "Use GET"}
+            return 200, await self.stats()
+        if path not in ("/generate", "/generate/batch"):
+            return 404, {"error": f"No route for {method} {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST"}
+        try:
+            request = json.loads(body)
+        except ValueError:
+            return 400, {"error": "The body must be JSON"}
+
+        if path == "/generate":
+            error = self._check_request(request, GENERATE_FIELDS)
+            if error:
+                return 400, {"error": error}
+            return 200, await self._submit(lambda: self.generator.agenerate(**request))
+
+        if not isinstance(request, dict) or not isinstance(request.get("requests"), list):
+            return 400, {"error": "'requests' must be a list"}
+        requests = request.pop("requests")
+        if len(requests) > self.max_batch:
+            return 413, {"error": f"At most {self.max_batch} requests per batch"}
+        unknown = set(request) - BATCH_FIELDS
+        if unknown:
+            return 400, {"error": f"Unknown fields: {', '.join(sorted(unknown))}"}
+        error = self._check_options(request)
+        if error:
+            return 400, {"error": error}
+        for index, item in enumerate(requests):
+            error = self._check_request(item, GENERATE_FIELDS - {"use_cache", "timeout", "n_variants"})
+            if error:
+                return 400, {"error": f"Request {index}: {error}"}
+
+        async def run_batch():
+            results = [None] * len(requests)
+            async for result in self.generator.agenerate_batch(requests, **request):
+                results[result["request_index"]] = result
+            return results
+
+        return 200, {"results": await self._submit(run_batch)}
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), self.keepalive_timeout)
+                except asyncio.TimeoutError:
+                    break  # Idle keep-alive connection
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+
+                if "transfer-encoding" in headers:
+                    # Only Content-Length bodies are read; a chunked one would look empty
+                    self._respond(writer, 411, {"error": "Send the body with a Content-Length, not chunked"},
+                                  keep_alive=False)
+                    await writer.drain()
+                    await self._discard_input(reader, writer)
+                    break
+                parts = request_line.decode("latin-1").split()
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                if len(parts) != 3 or not 0 <= length <= MAX_BODY_BYTES:
+                    status = 413 if length > MAX_BODY_BYTES else 400
+                    self._respond(writer, status, {"error": "Bad request"}, keep_alive=False)
+                    await writer.drain()
+                    await self._discard_input(reader, writer)
+                    break
+                method, path, version = parts
+                try:
+                    body = await asyncio.wait_for(reader.readexactly(length), self.keepalive_timeout)
+                except asyncio.TimeoutError:
+                    break  # The body never came
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" or (version == "HTTP/1.1" and connection != "close")
+
+                try:
+                    status, payload = await self._route(method, path.split("?", 1)[0], body)
+                    self._respond(writer, status, payload, keep_alive)
+                except asyncio.QueueFull:
+                    self._respond(writer, 429, {"error": "Too many requests queued, try again shortly"},
+                                  keep_alive, extra_headers=["Retry-After: 1"])
+                except Exception as e:
+                    self._respond(writer, 500, {"error": str(e)}, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _discard_input(reader, writer, timeout=2.0):
+        """
+        Closing with an unread body would reset the connection, and the
+        client could lose our answer: stop writing, then read what is left
+        (within reason) before the socket is closed.
+        """
+        async def drain():
+            received = 0
+            while received <= MAX_BODY_BYTES:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                received += len(data)
+
+        if writer.can_write_eof():
+            writer.write_eof()
+        try:
+            await asyncio.wait_for(drain(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    @staticmethod
+    def _respond(writer, status, payload, keep_alive, extra_headers=()):
+        data = json.dumps(payload).encode("utf-8")
+        head = [
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(data)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+            *extra_headers,
+        ]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the content generator over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=32, help="Requests handled at the same time")
+    parser.add_argument("--queue-size", type=int, default=256,
+                        help="Requests allowed to wait; more than that get 429")
+    parser.add_argument("--max-batch", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(GenerationServer(host=args.host, port=args.port, workers=args.workers,
+                                 queue_size=args.queue_size, max_batch=args.max_batch).serve_forever())
@@ -0,0 +1,94 @@
+"""
+Single-Flight Calls
+When several callers ask for the same thing at the same moment, only the
+first one does the work; the others wait for it and share its answer.
+Works across threads and event loops alike.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import CancelledError, Future
+
+
+class SingleFlight:
+    """
+    At most one call in flight per key.
+
+        response, shared = flight.do(key, lambda: backend.complete(...))
+        response, shared = await flight.ado(key, lambda: backend.acomplete(...))
+
+    shared is True when the answer came from someone else's call. Errors
+    are shared too; if the caller doing the work is cancelled, a waiting
+    caller takes over instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}       # key -> Future of the call in flight
+        self.leaders = 0       # Calls actually made
+        self.coalesced = 0     # Callers served by someone else's call
+
+    def _join(self, key):
+        """(future, True) if we have to make the call, (future, False) to wait for it"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self._calls[key] = Future()
+            self.leaders += 1
+            return future, True
+
+    def _finish(self, key, future):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def do(self, key, fn):
+        """Call fn() unless an identical call is running; returns (result, shared)"""
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            try:
+                return future.result(), True
+            except CancelledError:
+                continue  # Its caller gave up - try again, maybe as the leader
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._finish(key, future)
+        future.set_result(result)
+        return result, False
+
+    async def ado(self, key, coroutine_fn):
+        """asyncio version of do(): coroutine_fn() is awaited by one caller only"""
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            try:
+                # shield: one waiter timing out mustn't cancel the call for the rest
+                return await asyncio.shield(asyncio.wrap_future(future)), True
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise  # We were cancelled ourselves
+        try:
+            result = await coroutine_fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._finish(key, future)
+        future.set_result(result)
+        return result, False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
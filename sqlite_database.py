@@ -0,0 +1,339 @@
+"""
+Marketing Content Database - SQLite Version
+Same interface as MarketingDatabase, stored in one SQLite file (WAL mode)
+so several app processes can share it safely.
+
+Move existing data over with:
+    python sqlite_database.py --migrate
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+
+from database import default_examples
+from dedup import DuplicateDetector, content_hash
+from journal import ExampleJournal
+from retrieval import tokenize
+from telemetry import tracer
+
+# Metadata that gets its own indexed column; anything else goes to "extra"
+COLUMNS = ("topic", "tone", "target_audience", "generated", "model")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS examples (
+    id INTEGER PRIMARY KEY,
+    content_type TEXT NOT NULL,
+    content TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    topic TEXT,
+    tone TEXT,
+    target_audience TEXT,
+    generated TEXT,
+    model TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_examples_type ON examples (content_type, id);
+CREATE INDEX IF NOT EXISTS idx_examples_tone ON examples (content_type, tone);
+CREATE INDEX IF NOT EXISTS idx_examples_audience ON examples (content_type, target_audience);
+CREATE INDEX IF NOT EXISTS idx_examples_generated ON examples (content_type, generated, model);
+CREATE INDEX IF NOT EXISTS idx_examples_hash ON examples (content_type, content_hash);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS examples_fts USING fts5(
+    topic, content, content='examples', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS examples_ai AFTER INSERT ON examples BEGIN
+    INSERT INTO examples_fts (rowid, topic, content) VALUES (new.id, new.topic, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS examples_ad AFTER DELETE ON examples BEGIN
+    INSERT INTO examples_fts (examples_fts, rowid, topic, content)
+    VALUES ('delete', old.id, old.topic, old.content);
+END;
+"""
+
+
+class SQLiteMarketingDatabase:
+    """
+    Drop-in alternative to MarketingDatabase backed by sqlite3.
+
+    Filters use regular indexes (content type, tone, audience,
+    generated/model); similarity search uses FTS5 with BM25 ranking over
+    topic and content, nudged towards examples with the same tone and
+    audience.
+
+    Other processes may write to the same file: before every read or
+    insert, PRAGMA data_version tells whether they committed anything, and
+    if so the dedup detectors catch up and listeners hear which content
+    types changed. A new, empty database starts with the default examples
+    (seed=False leaves it empty).
+    """
+
+    def __init__(self, db_file="marketing_data.db", dedup=True, dedup_threshold=0.85, seed=True):
+        print("📦 Opening the memory box (SQLite)...")
+        self.db_file = db_file
+        self.dedup = dedup
+        self.dedup_threshold = dedup_threshold
+        self._detectors = {}
+        self._listeners = []
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        if seed:
+            with self.conn:
+                self.conn.execute("BEGIN IMMEDIATE")  # Two processes starting at once seed it once
+                if self.conn.execute("SELECT 1 FROM examples LIMIT 1").fetchone() is None:
+                    for content_type, type_examples in default_examples().items():
+                        for example in type_examples:
+                            metadata = {key: value for key, value in example.items() if key != "content"}
+                            self._insert(content_type, example["content"], content_hash(example["content"]),
+                                         metadata)
+        self._data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        self._seen = self._type_versions()
+        print("✅ Memory box ready!")
+
+    def _type_versions(self):
+        """{content_type: (row count, highest id)} - changes whenever a type's examples do"""
+        return {content_type: (count, last_id) for content_type, count, last_id in self.conn.execute(
+            "SELECT content_type, COUNT(*), MAX(id) FROM examples GROUP BY content_type"
+        )}
+
+    def _sync(self):
+        """
+        Catch up with commits from other connections (call with self._lock
+        held). Returns the content types they changed.
+        """
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return set()
+        self._data_version = version
+        seen = self._type_versions()
+        changed = {content_type for content_type in seen.keys() | self._seen.keys()
+                   if seen.get(content_type) != self._seen.get(content_type)}
+        for content_type in changed:
+            detector = self._detectors.get(content_type)
+            if detector is None:
+                continue  # Built from the table when it's first needed
+            count, last_id = self._seen.get(content_type, (0, 0))
+            rows = self.conn.execute(
+                "SELECT id, content FROM examples WHERE content_type = ? AND id > ? ORDER BY id",
+                (content_type, last_id)
+            ).fetchall()
+            if seen.get(content_type, (0, 0))[0] == count + len(rows):
+                for row_id, content in rows:  # Only inserts - add them
+                    detector.add(row_id, content)
+            else:
+                del self._detectors[content_type]  # Something was deleted - rebuild later
+        self._seen = seen
+        return changed
+
+    def _notify(self, content_types):
+        for content_type in content_types:
+            for callback in self._listeners:
+                callback(content_type)
+
+    def _catch_up(self):
+        with self._lock:
+            changed = self._sync()
+        self._notify(changed)
+
+    def _contents_for_rows(self, content_type, rows, n_results):
+        contents = [row[0] for row in rows]
+        if len(contents) < n_results:
+            # Not enough matches - top up with the first examples of this type
+            seen = {row[1] for row in rows}
+            for content, row_id in self.conn.execute(
+                "SELECT content, id FROM examples WHERE content_type = ? ORDER BY id LIMIT ?",
+                (content_type, n_results + len(seen))
+            ):
+                if len(contents) >= n_results:
+                    break
+                if row_id not in seen:
+                    contents.append(content)
+        return contents
+
+    def find_similar_examples(self, content_type, topic, tone=None, target_audience=None, n_results=3):
+        """Find the examples that best match the topic, tone and audience"""
+        terms = tokenize(" ".join(part for part in (topic, tone, target_audience) if part))
+        rows = []
+        self._catch_up()
+        with self._lock, tracer.span("db.search"):
+            if terms:
+                match = " OR ".join(f'"{term}"' for term in dict.fromkeys(terms))
+                rows = self.conn.execute(
+                    """
+                    SELECT e.content, e.id FROM examples_fts
+                    JOIN examples e ON e.id = examples_fts.rowid
+                    WHERE examples_fts MATCH ? AND e.content_type = ?
+                    ORDER BY bm25(examples_fts, 3.0, 1.0)
+                             - 2.0 * (e.tone IS ?) - 1.0 * (e.target_audience IS ?), e.id
+                    LIMIT ?
+                    """,
+                    (match, content_type, tone, target_audience, n_results)
+                ).fetchall()
+            return self._contents_for_rows(content_type, rows, n_results)
+
+    def find_similar_examples_batch(self, content_type, queries, n_results=3):
+        """Same as find_similar_examples for many requests at once"""
+        self._catch_up()
+        return [
+            self.find_similar_examples(content_type, query.get("topic"), query.get("tone"),
+                                       query.get("target_audience"), n_results)
+            for query in queries
+        ]
+
+    def first_examples(self, content_type, n_results=3):
+        """The oldest examples of a content type - the same ones every time, whatever the request"""
+        self._catch_up()
+        with self._lock:
+            return [row[0] for row in self.conn.execute(
+                "SELECT content FROM examples WHERE content_type = ? ORDER BY id LIMIT ?",
+                (content_type, n_results)
+            )]
+
+    def add_example(self, content_type, content, metadata):
+        """Add new example to our memory (returns False if it was a duplicate)"""
+        if not self.add_examples([(content_type, content, metadata)]):
+            print(f"♻️ Skipped duplicate example for {content_type}")
+            return False
+        print(f"✅ Added new example to {content_type}")
+        return True
+
+    def add_examples(self, items):
+        """Add many (content_type, content, metadata) examples in one transaction"""
+        added_types = set()
+        added = 0
+        with self._lock, self.conn, tracer.span("db.insert"):
+            # Take the write lock first, so nothing lands between the catch-up and our inserts
+            self.conn.execute("BEGIN IMMEDIATE")
+            changed = self._sync()
+            for content_type, content, metadata in items:
+                digest = content_hash(content)
+                if self.dedup:
+                    exact = self.conn.execute(
+                        "SELECT 1 FROM examples WHERE content_type = ? AND content_hash = ? LIMIT 1",
+                        (content_type, digest)
+                    ).fetchone()
+                    if exact:
+                        continue
+                    detector = self._detector(content_type)
+                    signature = detector.signature(content)
+                    if detector.find(content, signature) is not None:
+                        continue
+                row_id = self._insert(content_type, content, digest, metadata)
+                if self.dedup:
+                    detector.add(row_id, content, signature)
+                count, _ = self._seen.get(content_type, (0, 0))
+                self._seen[content_type] = (count + 1, row_id)
+                added_types.add(content_type)
+                added += 1
+
+        self._notify(changed | added_types)
+        return added
+
+    def _insert(self, content_type, content, digest, metadata):
+        extra = {key: value for key, value in metadata.items() if key not in COLUMNS}
+        cursor = self.conn.execute(
+            """
+            INSERT INTO examples (content_type, content, content_hash, topic, tone,
+                                  target_audience, generated, model, extra)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (content_type, content, digest, *(metadata.get(column) for column in COLUMNS),
+             json.dumps(extra) if extra else None)
+        )
+        return cursor.lastrowid
+
+    def _detector(self, content_type):
+        detector = self._detectors.get(content_type)
+        if detector is None:
+            detector = self._detectors[content_type] = DuplicateDetector(self.dedup_threshold)
+            for row_id, content in self.conn.execute(
+                "SELECT id, content FROM examples WHERE content_type = ? ORDER BY id", (content_type,)
+            ):
+                detector.add(row_id, content)
+        return detector
+
+    def remove_duplicates(self, dry_run=False):
+        """One-shot cleanup: drop every example that duplicates an earlier one"""
+        removed = {}
+        with self._lock, self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            changed = self._sync()
+            doomed = []
+            for (content_type,) in self.conn.execute("SELECT DISTINCT content_type FROM examples").fetchall():
+                detector = DuplicateDetector(self.dedup_threshold)
+                for row_id, content in self.conn.execute(
+                    "SELECT id, content FROM examples WHERE content_type = ? ORDER BY id", (content_type,)
+                ):
+                    if detector.add_if_new(row_id, content) is not None:
+                        doomed.append(row_id)
+                        removed[content_type] = removed.get(content_type, 0) + 1
+            if not dry_run and doomed:
+                self.conn.executemany("DELETE FROM examples WHERE id = ?", [(row_id,) for row_id in doomed])
+                self._detectors = {}
+                self._seen = self._type_versions()
+        self._notify(changed if dry_run else changed | set(removed))
+        return removed
+
+    def add_listener(self, callback):
+        """Call callback(content_type) whenever that type's examples change"""
+        self._listeners.append(callback)
+
+    def get_stats(self):
+        """Show how many examples in each category"""
+        self._catch_up()
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT content_type, COUNT(*) FROM examples GROUP BY content_type ORDER BY MIN(id)"
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def migrate_json_to_sqlite(json_file="marketing_data.json", db_file="marketing_data.db"):
+    """
+    Copy every example from the JSON layout (plus any journal entries not
+    yet compacted) into a SQLite database. Returns the number copied.
+    """
+    with open(json_file, 'r') as f:
+        examples = json.load(f)
+    base = os.path.splitext(json_file)[0]
+    for journal_file in (base + ".journal.compacting.jsonl", base + ".journal.jsonl"):
+        ExampleJournal.replay(journal_file, examples)
+
+    db = SQLiteMarketingDatabase(db_file, dedup=False, seed=False)
+    with db.conn:
+        for content_type, type_examples in examples.items():
+            for example in type_examples:
+                metadata = {key: value for key, value in example.items() if key != "content"}
+                db._insert(content_type, example["content"], content_hash(example["content"]), metadata)
+    stats = db.get_stats()
+    db.close()
+    return sum(stats.values())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite storage for marketing examples")
+    parser.add_argument("--migrate", action="store_true", help="Copy a JSON database into SQLite")
+    parser.add_argument("--from", dest="json_file", default="marketing_data.json")
+    parser.add_argument("--to", dest="db_file", default="marketing_data.db")
+    args = parser.parse_args()
+
+    if args.migrate:
+        if os.path.exists(args.db_file):
+            parser.error(f"{args.db_file} already exists - move it away first")
+        count = migrate_json_to_sqlite(args.json_file, args.db_file)
+        print(f"🚚 Migrated {count} examples from {args.json_file} to {args.db_file}")
+    else:
+        db = SQLiteMarketingDatabase(args.db_file)
+        print("\n📊 Database Stats:")
+        for name, count in db.get_stats().items():
+            print(f"  {name}: {count} examples")
+        db.close()
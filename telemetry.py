@@ -0,0 +1,404 @@
+"""
+Usage Telemetry
+Counts what every generation cost (prompt + completion tokens, dollars),
+per content type and model, and exports it as JSON or Prometheus text.
+
+    tracker.write("metrics.prom")      # or metrics.json
+    tracker.serve(9100)                # GET /metrics or /metrics.json
+
+Also times each stage of the pipeline (off unless MARKETING_TRACE=1):
+
+    tracer.enable()
+    ...
+    tracer.summary()                   # p50/p90/p99 per stage
+    tracer.dump_chrome_trace("trace.json")   # open in chrome://tracing
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Dollars per 1K (prompt, completion) tokens; longest matching prefix wins
+MODEL_PRICES = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.005, 0.015),
+    "gpt-4o-mini": (0.00015, 0.0006),
+}
+DEFAULT_PRICE = (0.002, 0.002)
+
+# Upper bounds of the token histogram buckets
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+ROLLING_WINDOWS = {"5m": 300, "1h": 3600}
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    """What a request cost in dollars, going by MODEL_PRICES"""
+    price = DEFAULT_PRICE
+    match = ""
+    for prefix, prefix_price in MODEL_PRICES.items():
+        if model.startswith(prefix) and len(prefix) > len(match):
+            match, price = prefix, prefix_price
+    return (prompt_tokens * price[0] + completion_tokens * price[1]) / 1000
+
+
+class Histogram:
+    """Cumulative-bucket histogram, the way Prometheus expects it"""
+
+    def __init__(self, buckets=TOKEN_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """[(le, count of observations <= le)], ending with "+Inf" """
+        total = 0
+        result = []
+        for bound, count in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def to_dict(self):
+        return {"buckets": dict(self.cumulative()), "sum": self.sum, "count": self.count}
+
+
+class UsageTracker:
+    """
+    Thread-safe token and cost accounting.
+
+    Totals are kept per (content_type, model) since startup; the rolling
+    windows (last 5 minutes / hour) are built from one bucket per minute.
+    Both count every request, with cache hits and coalesced requests also
+    counted separately under "cached" and "coalesced" (they spend nothing).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.totals = {}        # (content_type, model) -> counters
+        self.errors = {}        # content_type -> count
+        self.prompt_tokens = Histogram()
+        self.completion_tokens = Histogram()
+        self._minutes = deque()  # [minute, requests, cached, coalesced, prompt tokens, completion tokens, cost]
+        self._server = None
+
+    def record(self, content_type, model, prompt_tokens, completion_tokens, cost, cached=False,
+               coalesced=False):
+        """
+        Count one finished request. A cache hit spends no tokens, and
+        neither does a coalesced one (it shared an identical request's call).
+        """
+        with self._lock:
+            counters = self._counters(content_type, model)
+            counters["requests"] += 1
+            if cached or coalesced:
+                counters["cached" if cached else "coalesced"] += 1
+                bucket = self._bucket()
+                bucket[1] += 1
+                bucket[2 if cached else 3] += 1
+                return
+            self.prompt_tokens.observe(prompt_tokens)
+            self.completion_tokens.observe(completion_tokens)
+            self._spend(counters, 1, prompt_tokens, completion_tokens, cost)
+
+    def record_discarded(self, content_type, model, prompt_tokens, completion_tokens, cost):
+        """
+        Count a model call that was paid for but whose answer was thrown
+        away (the slower copy of a hedged request). It isn't a request of its own.
+        """
+        with self._lock:
+            counters = self._counters(content_type, model)
+            counters["discarded"] += 1
+            self._spend(counters, 0, prompt_tokens, completion_tokens, cost)
+
+    def _counters(self, content_type, model):
+        counters = self.totals.get((content_type, model))
+        if counters is None:
+            counters = self.totals[(content_type, model)] = {
+                "requests": 0, "cached": 0, "coalesced": 0, "discarded": 0, "prompt_tokens": 0,
+                "completion_tokens": 0, "cost": 0.0,
+            }
+        return counters
+
+    def _spend(self, counters, requests, prompt_tokens, completion_tokens, cost):
+        """Add to the totals and this minute's bucket (call with the lock held)"""
+        counters["prompt_tokens"] += prompt_tokens
+        counters["completion_tokens"] += completion_tokens
+        counters["cost"] += cost
+
+        bucket = self._bucket()
+        bucket[1] += requests
+        bucket[4] += prompt_tokens
+        bucket[5] += completion_tokens
+        bucket[6] += cost
+
+    def _bucket(self):
+        """This minute's rolling-window bucket (call with the lock held)"""
+        minute = int(time.time() // 60)
+        if not self._minutes or self._minutes[-1][0] != minute:
+            self._minutes.append([minute, 0, 0, 0, 0, 0, 0.0])
+            while self._minutes[0][0] <= minute - max(ROLLING_WINDOWS.values()) // 60:
+                self._minutes.popleft()
+        return self._minutes[-1]
+
+    def record_error(self, content_type):
+        with self._lock:
+            self.errors[content_type] = self.errors.get(content_type, 0) + 1
+
+    def rolling(self, seconds):
+        """
+        Requests (cached and coalesced ones among them), tokens and cost of
+        the last `seconds` (minute resolution)
+        """
+        oldest = int(time.time() // 60) - seconds // 60
+        fields = ("requests", "cached", "coalesced", "prompt_tokens", "completion_tokens", "cost")
+        totals = dict.fromkeys(fields, 0)
+        totals["cost"] = 0.0
+        with self._lock:
+            for minute, *values in self._minutes:
+                if minute > oldest:
+                    for field, value in zip(fields, values):
+                        totals[field] += value
+        return totals
+
+    def to_dict(self):
+        rolling = {name: self.rolling(seconds) for name, seconds in ROLLING_WINDOWS.items()}
+        with self._lock:
+            by_key = [
+                {"content_type": content_type, "model": model, **counters}
+                for (content_type, model), counters in sorted(self.totals.items())
+            ]
+            return {
+                "uptime_seconds": time.time() - self.started,
+                "totals": by_key,
+                "errors": dict(self.errors),
+                "rolling": rolling,
+                "histograms": {
+                    "prompt_tokens": self.prompt_tokens.to_dict(),
+                    "completion_tokens": self.completion_tokens.to_dict(),
+                },
+            }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self):
+        """Prometheus text exposition format"""
+        lines = []
+
+        def counter(name, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}")
+
+        with self._lock:
+            totals = sorted(self.totals.items())
+            for field, name, help_text in (
+                ("requests", "marketing_requests_total", "Generation requests"),
+                ("cached", "marketing_cached_requests_total", "Requests served from the response cache"),
+                ("coalesced", "marketing_coalesced_requests_total",
+                 "Requests that shared an identical in-flight model call"),
+                ("discarded", "marketing_discarded_calls_total",
+                 "Model calls paid for whose answer was thrown away (hedge losers)"),
+                ("prompt_tokens", "marketing_prompt_tokens_total", "Prompt tokens sent"),
+                ("completion_tokens", "marketing_completion_tokens_total", "Completion tokens received"),
+                ("cost", "marketing_cost_dollars_total", "Estimated spend in dollars"),
+            ):
+                counter(name, help_text, [
+                    ({"content_type": content_type, "model": model}, counters[field])
+                    for (content_type, model), counters in totals
+                ])
+            counter("marketing_errors_total", "Failed generation requests", [
+                ({"content_type": content_type}, count) for content_type, count in sorted(self.errors.items())
+            ])
+            for name, help_text, histogram in (
+                ("marketing_prompt_tokens", "Prompt tokens per request", self.prompt_tokens),
+                ("marketing_completion_tokens", "Completion tokens per request", self.completion_tokens),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for bound, count in histogram.cumulative():
+                    lines.append(f'{name}_bucket{{le="{bound}"}} {count}')
+                lines.append(f"{name}_sum {histogram.sum}")
+                lines.append(f"{name}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Dump metrics to a file (Prometheus text unless it ends in .json)"""
+        text = self.to_json() if path.endswith(".json") else self.to_prometheus()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def serve(self, port=9100, host="127.0.0.1"):
+        """Serve /metrics (Prometheus) and /metrics.json from a background thread"""
+        tracker = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = tracker.to_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = tracker.to_json(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass  # Keep scrapes out of the console
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        print(f"📈 Metrics at http://{host}:{self._server.server_port}/metrics")
+        return self._server.server_port
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "start")
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer.record(self.name, self.start, time.perf_counter_ns())
+
+
+class _NullSpan:
+    """What span() hands out while tracing is off - does nothing"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """
+    Timing spans for the hot path.
+
+        with tracer.span("model_call"):
+            ...
+
+    While disabled, span() returns a shared no-op object, so instrumented
+    code costs one attribute check. While enabled, the last `max_samples`
+    durations per stage are kept for percentiles, and the last
+    `max_events` spans for a Chrome trace.
+    """
+
+    def __init__(self, enabled=False, max_samples=10000, max_events=100000):
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples = {}   # stage -> deque of durations in ns
+        self._events = deque(maxlen=max_events)
+        self._origin = time.perf_counter_ns()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name)
+
+    def record(self, name, start, end):
+        """Add a span measured elsewhere (perf_counter_ns start and end)"""
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.max_samples)
+            samples.append(end - start)
+            self._events.append((name, start, end, threading.get_ident()))
+
+    def summary(self):
+        """{stage: count, mean and p50/p90/p99/max in milliseconds}"""
+        with self._lock:
+            stages = {name: sorted(samples) for name, samples in self._samples.items()}
+        result = {}
+        for name, durations in stages.items():
+            count = len(durations)
+
+            def percentile(p):
+                return durations[min(count - 1, int(p / 100 * count))] / 1e6
+
+            result[name] = {
+                "count": count,
+                "mean_ms": sum(durations) / count / 1e6,
+                "p50_ms": percentile(50),
+                "p90_ms": percentile(90),
+                "p99_ms": percentile(99),
+                "max_ms": durations[-1] / 1e6,
+            }
+        return result
+
+    def dump_chrome_trace(self, path):
+        """Write the recorded spans in Chrome's trace event format"""
+        pid = os.getpid()
+        with self._lock:
+            events = [
+                {"name": name, "ph": "X", "pid": pid, "tid": tid,
+                 "ts": (start - self._origin) / 1000, "dur": (end - start) / 1000}
+                for name, start, end, tid in self._events
+            ]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+    def reset(self):
+        with self._lock:
+            self._samples = {}
+            self._events.clear()
+
+
+# Shared by every module, so stages can be timed without passing it around
+tracer = Tracer(enabled=os.getenv("MARKETING_TRACE") == "1")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
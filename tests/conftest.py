@@ -0,0 +1,27 @@
+"""
+Shared test setup: the modules live in the project root, not a package.
+Run the tests from the project root with:  python -m pytest -q
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from content_generator import MarketingContentGenerator  # noqa: E402
+from database import MarketingDatabase  # noqa: E402
+
+
+@pytest.fixture
+def make_generator(tmp_path):
+    """
+    Builds MarketingContentGenerators on a throwaway database (dedup off).
+    Every generator made in one test shares that database file.
+    """
+    def make(backend=None, response_cache=False, scheduler=None):
+        database = MarketingDatabase(str(tmp_path / "data.json"), dedup=False)
+        return MarketingContentGenerator(backend=backend, response_cache=response_cache, database=database,
+                                         scheduler=scheduler)
+    return make
@@ -0,0 +1,121 @@
+"""
+Batch generation (sync and async): completion order, one database write
+per batch, and what gets saved when the caller stops early.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from llm_backends import LLMBackend
+from response_cache import ResponseCache
+
+SLOW = {"content_type": "ad_copy", "topic": "slow espresso grinder", "tone": "warm"}
+FAST = {"content_type": "ad_copy", "topic": "fast running shoes", "tone": "warm"}
+
+
+class GatedBackend(LLMBackend):
+    """The slow request only replies after the fast one has"""
+
+    name = "gated"
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.fast_done = threading.Event()
+        self.calls = 0
+
+    def complete(self, prompt, content_type, topic, tone):
+        self.calls += 1
+        if topic.startswith("slow"):
+            self.fast_done.wait(5)
+            time.sleep(0.05)
+        else:
+            time.sleep(self.delay)
+            self.fast_done.set()
+        return {"content": f"Copy about {topic}", "model": "gpt-4o-mini"}
+
+
+def _collect(batch, stop_after):
+    results = []
+    try:
+        for result in batch:
+            results.append(result)
+            if len(results) == stop_after:
+                break
+    finally:
+        batch.close()
+    return results
+
+
+async def _acollect(batch, stop_after):
+    results = []
+    try:
+        async for result in batch:
+            results.append(result)
+            if len(results) == stop_after:
+                break
+    finally:
+        await batch.aclose()
+    return results
+
+
+def _run(generator, mode, requests, stop_after=None, **options):
+    if mode == "async":
+        return asyncio.run(_acollect(generator.agenerate_batch(requests, **options), stop_after))
+    return _collect(generator.generate_batch(requests, **options), stop_after)
+
+
+def _record_writes(generator):
+    """Every add_examples() call the database gets, as lists of contents"""
+    writes = []
+    add_examples = generator.db.add_examples
+
+    def recording(items):
+        items = list(items)
+        writes.append([content for _, content, _ in items])
+        return add_examples(items)
+
+    generator.db.add_examples = recording
+    return writes
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_results_come_in_completion_order_and_are_saved_in_one_write(make_generator, mode):
+    generator = make_generator(GatedBackend())
+    writes = _record_writes(generator)
+    results = _run(generator, mode, [SLOW, FAST])
+
+    assert [result["request_index"] for result in results] == [1, 0]
+    assert [result["topic"] for result in results] == [FAST["topic"], SLOW["topic"]]
+    assert all(result["success"] and result["saved_to_db"] for result in results)
+    assert writes == [["Copy about fast running shoes", "Copy about slow espresso grinder"]]
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_finished_results_are_saved_when_the_caller_stops_early(make_generator, mode):
+    generator = make_generator(GatedBackend())
+    writes = _record_writes(generator)
+    (result,) = _run(generator, mode, [SLOW, FAST], stop_after=1)
+
+    assert result["request_index"] == 1
+    # The slow reply was never handed to the caller, so it isn't saved
+    assert writes == [["Copy about fast running shoes"]]
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_cached_and_coalesced_results_are_not_saved_again(make_generator, tmp_path, mode):
+    backend = GatedBackend(delay=0.1)
+    generator = make_generator(backend, response_cache=ResponseCache(str(tmp_path / "cache")))
+    backend.fast_done.set()  # Nothing to wait for when warming the cache
+    generator.generate(**SLOW)
+    writes = _record_writes(generator)
+
+    # SLOW is a cache hit; the two FASTs share one model call
+    results = _run(generator, mode, [SLOW, FAST, FAST])
+    by_index = {result["request_index"]: result for result in results}
+    assert by_index[0]["cached"] and not by_index[0]["saved_to_db"]
+    assert sorted(by_index[index]["coalesced"] for index in (1, 2)) == [False, True]
+    assert backend.calls == 2
+    assert writes == [["Copy about fast running shoes"]]
@@ -0,0 +1,54 @@
+"""
+Column-by-column example storage gives the same answers as the plain
+list of dicts it replaced, and free-text metadata isn't interned.
+"""
+
+import json
+
+from columns import ExampleColumns
+from database import MarketingDatabase, default_examples
+from retrieval import BM25Index
+
+QUERIES = [
+    ("ad_copy", "running shoes", "energetic", "athletes"),
+    ("email_campaigns", "coffee subscription", "warm", "coffee lovers"),
+    ("social_media", "project management app", None, None),
+    ("blog_posts", "morning routine", "helpful", "professionals"),
+]
+
+
+def test_columns_round_trip_every_example():
+    for type_examples in default_examples().values():
+        columns = ExampleColumns(type_examples)
+        assert len(columns) == len(type_examples)
+        assert list(columns) == type_examples
+        assert [columns.content(i) for i in range(len(columns))] == \
+            [example["content"] for example in type_examples]
+
+
+def test_stats_and_retrieval_match_list_of_dicts(tmp_path):
+    data_file = str(tmp_path / "data.json")
+    db = MarketingDatabase(data_file, dedup=False)
+    with open(data_file, 'r') as f:
+        as_dicts = json.load(f)
+
+    assert db.get_stats() == {k: len(v) for k, v in as_dicts.items()}
+    for content_type, topic, tone, audience in QUERIES:
+        index = BM25Index()
+        index.build(enumerate(MarketingDatabase._index_fields(example) for example in as_dicts[content_type]))
+        query = " ".join(part for part in (topic, tone, audience) if part)
+        positions = [position for position, _ in index.search(query, 2)]
+        positions += [p for p in range(len(as_dicts[content_type])) if p not in positions][:2 - len(positions)]
+        expected = [as_dicts[content_type][position]["content"] for position in positions]
+        assert db.find_similar_examples(content_type, topic, tone, audience, n_results=2) == expected
+
+
+def test_free_text_audience_is_not_interned():
+    columns = ExampleColumns([
+        {"content": f"example {i}", "topic": "t", "tone": "warm", "target_audience": f"audience {i}"}
+        for i in range(50)
+    ])
+    assert columns[7]["target_audience"] == "audience 7"
+    assert not any(string and string.startswith("audience") for string in columns.pool.strings)
+    # Each store has its own pool, dropped with it
+    assert ExampleColumns().pool is not columns.pool
@@ -0,0 +1,60 @@
+"""
+Several processes writing to one JSON store without the journal: the lock
+file, the .gen epoch file and atomic replaces keep every example.
+"""
+
+import multiprocessing
+
+from database import MarketingDatabase
+
+
+def _contents(db, content_type):
+    type_examples = db.examples.get(content_type, [])
+    return [type_examples.content(i) for i in range(len(type_examples))]
+
+
+def _add_many(data_file, worker, count):
+    db = MarketingDatabase(data_file, dedup=False)
+    for i in range(count):
+        db.add_example("ad_copy", f"worker {worker} example {i}", {"topic": f"w{worker}"})
+    db.close()
+
+
+def _run_workers(data_file, workers, count):
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_add_many, args=(data_file, w, count)) for w in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(120)
+        assert process.exitcode == 0
+
+
+def test_writers_lose_and_duplicate_nothing(tmp_path):
+    data_file = str(tmp_path / "data.json")
+    MarketingDatabase(data_file, dedup=False).close()  # Create the defaults first
+    before = len(MarketingDatabase(data_file, dedup=False).examples["ad_copy"])
+
+    _run_workers(data_file, 4, 15)
+
+    contents = _contents(MarketingDatabase(data_file, dedup=False), "ad_copy")
+    expected = {f"worker {w} example {i}" for w in range(4) for i in range(15)}
+    assert expected <= set(contents)
+    assert len(contents) == before + len(expected)  # Nothing written twice
+
+
+def test_open_store_sees_other_processes_rows_after_refresh(tmp_path):
+    data_file = str(tmp_path / "data.json")
+    db = MarketingDatabase(data_file, dedup=False)
+    # Searched once, so new rows must be added to a live index too
+    db.find_similar_examples("ad_copy", "anything")
+    before = len(db.examples["ad_copy"])
+
+    _run_workers(data_file, 2, 5)
+
+    db.refresh(force=True)
+    contents = _contents(db, "ad_copy")
+    assert len(contents) == before + 10
+    new_rows = {f"worker {w} example {i}" for w in range(2) for i in range(5)}
+    assert new_rows <= set(contents)
+    assert set(db.find_similar_examples("ad_copy", "worker example", n_results=10)) == new_rows
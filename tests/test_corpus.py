@@ -0,0 +1,81 @@
+"""
+The binary .corpus format: round trips, a journaled .corpus store, and
+damaged files.
+"""
+
+import pytest
+
+from columns import read_corpus, write_corpus
+from database import MarketingDatabase
+
+EXAMPLES = {
+    "ad_copy": [
+        {"content": "☕ Café crème, livré chez vous — 20% off", "topic": "café", "tone": "warm",
+         "target_audience": "amateurs de café"},
+        {"content": "No topic on this one", "topic": None, "tone": "playful"},
+        {"content": "Extra fields ride along", "topic": "shoes", "campaign": {"id": 7, "tags": ["a", "b"]},
+         "rating": 4.5},
+    ],
+    "blog_posts": [
+        {"content": "日本語のブログ記事 🏃‍♂️", "topic": "ランニング", "generated": "true", "model": "gpt-4o"},
+    ],
+    "social_media": [],
+}
+
+
+def _write(path, examples=EXAMPLES):
+    with open(path, 'wb') as f:
+        write_corpus(f, examples)
+
+
+def _contents(db, content_type):
+    type_examples = db.examples.get(content_type, [])
+    return [type_examples.content(i) for i in range(len(type_examples))]
+
+
+def test_round_trip_keeps_every_field(tmp_path):
+    path = str(tmp_path / "data.corpus")
+    _write(path)
+    loaded = read_corpus(path)
+    assert {k: list(v) for k, v in loaded.items()} == EXAMPLES
+    assert loaded["blog_posts"].content(0) == "日本語のブログ記事 🏃‍♂️"
+
+
+def test_journaled_corpus_store_replays_compacts_and_reopens(tmp_path):
+    data_file = str(tmp_path / "data.corpus")
+    _write(data_file)
+    db = MarketingDatabase(data_file, journal=True, dedup=False)
+    db.add_example("ad_copy", "journaled ünïcode example", {"topic": None, "tone": "warm"})
+    db.close()
+
+    replayed = MarketingDatabase(data_file, journal=True, dedup=False)
+    assert "journaled ünïcode example" in _contents(replayed, "ad_copy")
+    replayed.add_example("social_media", "second journaled example", {"topic": "t"})
+    replayed.compact(wait=True)
+    assert replayed.journal.recount() == 0
+    replayed.close()
+
+    # The compacted snapshot alone has everything
+    plain = MarketingDatabase(data_file, dedup=False)
+    ad_copy = list(plain.examples["ad_copy"])
+    assert ad_copy[:3] == EXAMPLES["ad_copy"]
+    assert ad_copy[3] == {"content": "journaled ünïcode example", "topic": None, "tone": "warm"}
+    assert _contents(plain, "social_media") == ["second journaled example"]
+
+
+@pytest.mark.parametrize("damage", [
+    lambda data: data[:len(data) // 2],          # Truncated mid-file
+    lambda data: data[:-3],                      # Footer length cut
+    lambda data: data[:40] + data[80:],          # Bytes missing from a section
+    lambda data: data[:-30] + b"\xff" + data[-29:],  # Corrupt footer
+    lambda data: b"",
+])
+def test_damaged_corpus_fails_loudly(tmp_path, damage):
+    path = str(tmp_path / "data.corpus")
+    _write(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(damage(data))
+    with pytest.raises(ValueError):
+        read_corpus(path)
@@ -0,0 +1,53 @@
+"""
+Near-duplicate detection, and the dedup.py cleanup command on a
+journal-mode store.
+"""
+
+import os
+import subprocess
+import sys
+
+from database import MarketingDatabase
+from dedup import DuplicateDetector
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEXT = "Fresh running shoes for every trail: light, grippy and built to last all season long"
+
+
+def _dedup(*args):
+    return subprocess.run([sys.executable, os.path.join(ROOT, "dedup.py"), *args],
+                          capture_output=True, text=True)
+
+
+def test_near_duplicate_is_caught():
+    detector = DuplicateDetector(0.85)
+    assert detector.add_if_new(0, TEXT) is None
+    assert detector.add_if_new(1, TEXT + "!") == ("near", 0)
+    assert detector.add_if_new(2, "A completely different email about coffee subscriptions") is None
+
+
+def test_cli_refuses_journal_store_without_flag(tmp_path):
+    data_file = str(tmp_path / "data.json")
+    db = MarketingDatabase(data_file, journal=True, dedup=False)
+    db.add_example("ad_copy", TEXT, {})
+    db.close()
+
+    result = _dedup("--data-file", data_file)
+    assert result.returncode != 0
+    assert "--journal" in result.stderr
+
+
+def test_cli_cleans_journal_store(tmp_path):
+    data_file = str(tmp_path / "data.json")
+    db = MarketingDatabase(data_file, journal=True, dedup=False)
+    before = len(db.examples["ad_copy"])
+    db.add_example("ad_copy", TEXT, {})
+    db.add_example("ad_copy", TEXT, {})
+    db.close()
+
+    result = _dedup("--data-file", data_file, "--journal")
+    assert result.returncode == 0, result.stderr
+
+    reopened = MarketingDatabase(data_file, journal=True, dedup=False)
+    assert len(reopened.examples["ad_copy"]) == before + 1
+    reopened.close()
@@ -0,0 +1,69 @@
+"""
+Embedding store: stored vectors always belong to the current examples.
+"""
+
+import json
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from database import MarketingDatabase
+from embeddings import EmbeddingStore, HashingEmbedder
+
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__()
+        self.embedded = 0
+
+    def embed(self, fields):
+        self.embedded += 1
+        return super().embed(fields)
+
+
+def _fields(topic, content):
+    return {"topic": topic, "target_audience": "", "tone": "", "content": content}
+
+
+SHOES = _fields("running shoes", "Light trail shoes with grip")
+COFFEE = _fields("coffee subscription", "Fresh beans at your door")
+YOGA = _fields("yoga mats", "Non-slip mats for every studio")
+
+
+def test_same_row_count_different_corpus_is_re_embedded(tmp_path):
+    embedder = CountingEmbedder()
+    store = EmbeddingStore(str(tmp_path), embedder)
+    store.sync("ad_copy", [SHOES, COFFEE])
+    assert embedder.embedded == 2
+
+    # Same number of rows, second one replaced (e.g. dedup cleanup, then an insert)
+    store.sync("ad_copy", [SHOES, YOGA])
+    assert embedder.embedded == 3  # Only the changed row
+    row, score = store.search_batch("ad_copy", [{"topic": "yoga mats"}], k=1)[0][0]
+    assert row == 1 and score > 0.5
+
+
+def test_unchanged_corpus_is_not_re_embedded(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.sync("ad_copy", [SHOES, COFFEE])
+    embedder = CountingEmbedder()
+    reopened = EmbeddingStore(str(tmp_path), embedder)
+    reopened.sync("ad_copy", [SHOES, COFFEE, YOGA])
+    assert embedder.embedded == 1
+
+
+def test_store_after_replacing_the_data_file(tmp_path):
+    data_file = str(tmp_path / "data.json")
+    db = MarketingDatabase(data_file, retrieval="embedding", dedup=False)
+    db.find_similar_examples("ad_copy", "anything")
+    count = len(db.examples["ad_copy"])
+    db.close()
+
+    # A different corpus with the same number of rows, under the same name
+    topics = ["yoga mats", "espresso machines", "hiking boots", "standing desks", "tea sampler"][:count]
+    with open(data_file, 'w') as f:
+        json.dump({"ad_copy": [{"content": f"All about {topic}", "topic": topic} for topic in topics]}, f)
+    reopened = MarketingDatabase(data_file, retrieval="embedding", dedup=False)
+    for topic in topics:
+        assert reopened.find_similar_examples("ad_copy", topic, n_results=1) == [f"All about {topic}"]
@@ -0,0 +1,58 @@
+"""
+GeneratorService: one shared generator per process, and a failed warm-up
+is retried rather than remembered.
+"""
+
+import threading
+import time
+
+import pytest
+
+import content_generator
+from generator_service import GeneratorService
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    """Replaces the real generator with a slow stand-in that lists every one built"""
+
+    class SlowGenerator:
+        built = []
+        failures = []
+
+        def __init__(self):
+            time.sleep(0.05)
+            if self.failures:
+                raise self.failures.pop()
+            self.built.append(self)
+
+    monkeypatch.delenv("MARKETING_API_PORT", raising=False)
+    monkeypatch.setattr(content_generator, "MarketingContentGenerator", SlowGenerator)
+    return SlowGenerator
+
+
+def test_concurrent_callers_share_one_generator(stand_in):
+    service = GeneratorService()
+    results = []
+    callers = [threading.Thread(target=lambda: results.append(service.get_generator(timeout=5)))
+               for _ in range(8)]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+
+    assert len(stand_in.built) == 1
+    assert results == [stand_in.built[0]] * 8
+    assert service.is_ready
+
+
+def test_failed_warmup_is_retried_on_the_next_call(stand_in):
+    stand_in.failures.append(RuntimeError("database unavailable"))
+    service = GeneratorService()
+    with pytest.raises(RuntimeError, match="database unavailable"):
+        service.get_generator(timeout=5)
+    assert not service.is_ready
+
+    generator = service.get_generator(timeout=5)
+    assert stand_in.built == [generator]
+    assert service.is_ready and service.get_generator(timeout=5) is generator
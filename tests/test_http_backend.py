@@ -0,0 +1,107 @@
+"""
+HTTPBackend against the stand-in server: URL schemes, timeouts on the
+async path, pooled connections left behind by other event loops, and
+replies that carry no completion or a malformed stream chunk.
+"""
+
+import asyncio
+import gc
+
+import pytest
+
+from fake_llm_server import FakeLLMServer
+from llm_backends import BackendError, HTTPBackend
+from resilience import is_transient
+
+
+def test_url_scheme_picks_port_and_tls():
+    plain = HTTPBackend("http://example.com/v1/chat/completions")
+    secure = HTTPBackend("https://example.com/v1/chat/completions")
+    assert (plain.port, plain.ssl) == (80, None)
+    assert secure.port == 443 and secure.ssl is not None
+    assert HTTPBackend("https://example.com:8443/v1/chat/completions").port == 8443
+
+
+def test_other_schemes_are_refused():
+    with pytest.raises(ValueError):
+        HTTPBackend("ftp://example.com/v1/chat/completions")
+
+
+def test_async_calls_give_up_after_timeout():
+    server = FakeLLMServer(port=0, latency=2.0)
+    backend = HTTPBackend(server.start_background(), timeout=0.2)
+
+    async def main():
+        with pytest.raises(TimeoutError):
+            await backend.acomplete("Now create the ad copy", "ad_copy", "shoes", "casual")
+        with pytest.raises(TimeoutError):
+            async for _ in backend.astream("Now create the ad copy", "ad_copy", "shoes", "casual", {}):
+                pass
+        backend.close()
+
+    asyncio.run(main())
+
+
+def test_idle_connections_of_other_loops_are_closed():
+    server = FakeLLMServer(port=0, latency=0.0, token_delay=0.0)
+    backend = HTTPBackend(server.start_background())
+
+    async def call():
+        return await backend.acomplete("Now create the ad copy", "ad_copy", "shoes", "casual")
+
+    old_loop = asyncio.new_event_loop()
+    old_loop.run_until_complete(call())
+    (_, _, old_writer), = backend._idle
+
+    async def from_new_loop():
+        await call()
+        await asyncio.sleep(0)
+
+    asyncio.run(from_new_loop())
+    old_loop.run_until_complete(asyncio.sleep(0))  # Let the scheduled close run
+    assert old_writer.is_closing()
+    backend.close()
+    old_loop.close()
+    gc.collect()
+
+
+@pytest.mark.parametrize("payload", [
+    b'{"choices": [], "model": "gpt-4o"}',
+    b'{"error": "overloaded"}',
+    b'{"choices": [{"index": 0}]}',
+    b'not json',
+])
+def test_reply_without_a_completion_is_a_backend_error(payload):
+    with pytest.raises(BackendError) as caught:
+        HTTPBackend._parse(200, payload)
+    assert caught.value.status == 200
+    assert not is_transient(caught.value)
+
+
+class BrokenStreamServer(FakeLLMServer):
+    """Streams one event whose data isn't JSON"""
+
+    async def _stream(self, request, writer):
+        event = b'data: {"choices": [{"delta": \n\n'
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\n"
+            b"Connection: keep-alive\r\n\r\n"
+            + f"{len(event):x}\r\n".encode("latin-1") + event + b"\r\n0\r\n\r\n"
+        )
+        await writer.drain()
+
+
+def test_malformed_stream_chunk_is_a_backend_error():
+    backend = HTTPBackend(BrokenStreamServer(port=0, latency=0.0).start_background())
+    with pytest.raises(BackendError, match="malformed stream chunk"):
+        list(backend.stream("Now create the ad copy", "ad_copy", "shoes", "casual", {}))
+
+    async def main():
+        with pytest.raises(BackendError, match="malformed stream chunk"):
+            async for _ in backend.astream("Now create the ad copy", "ad_copy", "shoes", "casual", {}):
+                pass
+        backend.close()
+
+    asyncio.run(main())
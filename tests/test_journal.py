@@ -0,0 +1,76 @@
+"""
+Journal mode of MarketingDatabase: replay, compaction, and several
+processes appending to the same store.
+"""
+
+import multiprocessing
+import os
+
+from database import MarketingDatabase
+
+
+def _contents(db, content_type):
+    type_examples = db.examples.get(content_type, [])
+    return [type_examples.content(i) for i in range(len(type_examples))]
+
+
+def test_journaled_examples_survive_reopen(tmp_path):
+    data_file = str(tmp_path / "data.json")
+    db = MarketingDatabase(data_file, journal=True, dedup=False)
+    db.add_example("ad_copy", "journaled example one", {"topic": "t"})
+    db.close()
+
+    reopened = MarketingDatabase(data_file, journal=True, dedup=False)
+    assert "journaled example one" in _contents(reopened, "ad_copy")
+    reopened.close()
+
+
+def test_compaction_folds_journal_into_snapshot(tmp_path):
+    data_file = str(tmp_path / "data.json")
+    db = MarketingDatabase(data_file, journal=True, dedup=False)
+    db.add_example("ad_copy", "to be compacted", {"topic": "t"})
+    db.compact(wait=True)
+    assert not os.path.exists(db.journal.path) or db.journal.recount() == 0
+    db.close()
+
+    # Without the journal the snapshot alone has it
+    plain = MarketingDatabase(data_file, dedup=False)
+    assert "to be compacted" in _contents(plain, "ad_copy")
+
+
+def test_compaction_with_empty_journal_is_a_no_op(tmp_path):
+    data_file = str(tmp_path / "data.json")
+    db = MarketingDatabase(data_file, journal=True, dedup=False)
+    before = os.stat(data_file).st_mtime_ns
+    db._run_compaction()  # Directly, so an error isn't lost on a background thread
+    db._run_compaction()
+    assert os.stat(data_file).st_mtime_ns == before
+    assert not os.path.exists(db._compacting_file)
+    db.close()
+
+
+def _add_many(data_file, worker, count):
+    db = MarketingDatabase(data_file, journal=True, dedup=False, compact_every=7)
+    for i in range(count):
+        db.add_example("ad_copy", f"worker {worker} example {i}", {"topic": f"w{worker}"})
+    db.close()
+
+
+def test_processes_appending_to_one_journal(tmp_path):
+    data_file = str(tmp_path / "data.json")
+    MarketingDatabase(data_file, journal=True, dedup=False).close()  # Create the defaults first
+
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_add_many, args=(data_file, w, 20)) for w in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(120)
+        assert process.exitcode == 0
+
+    db = MarketingDatabase(data_file, journal=True, dedup=False)
+    contents = _contents(db, "ad_copy")
+    expected = {f"worker {w} example {i}" for w in range(4) for i in range(20)}
+    assert expected <= set(contents)
+    assert len(contents) == len(set(contents))  # Nothing replayed twice
+    db.close()
@@ -0,0 +1,43 @@
+"""
+Prompt cache: the memory budget and invalidation per content type.
+"""
+
+import sys
+
+from database import MarketingDatabase
+from prompt_cache import PromptCache
+from prompt_engineer import PromptEngineer
+
+AD = {"content_type": "ad_copy", "topic": "running shoes", "tone": "energetic",
+      "target_audience": "athletes", "key_points": ["light", "grippy"]}
+EMAIL = {"content_type": "email_campaigns", "topic": "coffee subscription", "tone": "warm",
+         "target_audience": "coffee lovers", "key_points": ["fresh"]}
+
+
+def test_budget_counts_keys_as_well_as_prompts():
+    cache = PromptCache(max_bytes=10_000)
+    key = ("ad_copy", "x" * 4000, "warm", "everyone", ("quality",), None)
+    cache.put(key, "short prompt", "ad_copy", cache.generation("ad_copy"))
+    assert cache.stats()["bytes"] > sys.getsizeof(key[1]) + sys.getsizeof("short prompt")
+
+    # Three such keys don't fit in 10 kB, even though the prompts are tiny
+    for i in range(3):
+        key = ("ad_copy", f"{i}" * 4000, "warm", "everyone", ("quality",), None)
+        cache.put(key, "short prompt", "ad_copy", cache.generation("ad_copy"))
+    assert cache.stats()["bytes"] <= 10_000
+    assert cache.stats()["evictions"] >= 2
+
+
+def test_new_example_invalidates_only_its_content_type(tmp_path):
+    db = MarketingDatabase(str(tmp_path / "data.json"), dedup=False)
+    engineer = PromptEngineer(db)
+    ad_prompt = engineer.create_prompt(**AD)
+    engineer.create_prompt(**EMAIL)
+    assert engineer.cache.stats()["entries"] == 2
+
+    db.add_example("ad_copy", "Brand new ad about running shoes for athletes", {"topic": "running shoes"})
+
+    assert engineer.cache.get(engineer._cache_key(EMAIL)) is not None
+    assert engineer.cache.get(engineer._cache_key(AD)) is None
+    assert engineer.cache.stats()["invalidations"] == 1
+    assert engineer.create_prompt(**AD) != ad_prompt  # Rebuilt with the new example
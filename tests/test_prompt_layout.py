@@ -0,0 +1,82 @@
+"""
+Prompt layouts: prefix-stable prompts of one content type share their
+whole start, and the classic layout is still the original prompt.
+"""
+
+from database import MarketingDatabase
+from prefix_report import shared_prefixes
+from prompt_engineer import PromptEngineer
+
+BASE = {"content_type": "ad_copy", "topic": "running shoes", "tone": "energetic",
+        "target_audience": "athletes", "key_points": ["light", "grippy"], "brand_voice": None}
+VARIED = {**BASE, "tone": "warm", "target_audience": "weekend joggers", "key_points": ["cushioned"]}
+BRIEF = "--- THE BRIEF ---\nTOPIC: "
+
+
+def _original_prompt(style, topic, tone, target_audience, key_points, brand_voice, examples):
+    """The prompt as the first version of create_prompt() wrote it"""
+    prompt = f"""You are an elite marketing copywriter with 20 years of experience.
+You've written for Fortune 500 companies and won multiple advertising awards.
+Your copy converts readers into customers. You write in a {tone} tone.
+
+TASK: Create {style['name']} about {topic}
+
+TARGET AUDIENCE: {target_audience}
+TONE: {tone}
+KEY POINTS TO EMPHASIZE: {', '.join(key_points)}
+"""
+    if brand_voice:
+        prompt += f"\nBRAND VOICE GUIDELINES: {brand_voice}\n"
+    prompt += "\nSTRICT RULES YOU MUST FOLLOW:\n"
+    for i, rule in enumerate(style['rules'], 1):
+        prompt += f"{i}. {rule}\n"
+    if examples:
+        prompt += f"\n{'=' * 60}\nEXAMPLES OF EXCELLENT WORK (Study these patterns):\n{'=' * 60}\n"
+        for idx, example in enumerate(examples, 1):
+            prompt += f"\n--- EXAMPLE {idx} ---\n{example}\n"
+        prompt += f"\n{'=' * 60}\nNOTICE THE PATTERNS ABOVE. NOW CREATE SOMETHING ORIGINAL.\n{'=' * 60}\n"
+    prompt += "\nOUTPUT FORMAT (Follow this exactly):\n" + style['format']
+    prompt += f"""
+
+ADDITIONAL INSTRUCTIONS:
+• Be original - do not copy the examples word for word
+• Focus on benefits, not just features
+• Make it sound human, not robotic
+• Ensure every word earns its place
+• The content should feel {tone}
+
+Now create the {style['name']} for: {topic}
+
+YOUR RESPONSE:"""
+    return prompt
+
+
+def test_prefix_stable_prompts_share_everything_before_the_brief(tmp_path):
+    db = MarketingDatabase(str(tmp_path / "data.json"), dedup=False)
+    engineer = PromptEngineer(db, cache=False, layout="prefix_stable")
+    first, second = engineer.create_prompts([BASE, VARIED])
+
+    prefix = first[:first.index(BRIEF) + len(BRIEF)]
+    assert second.encode("utf-8").startswith(prefix.encode("utf-8"))  # Byte for byte
+    # Nothing about the request comes before the brief
+    for detail in ("energetic", "athletes", "grippy", "weekend joggers", "cushioned"):
+        assert detail not in prefix
+    assert "TONE: warm" in second and "weekend joggers" in second
+
+    shared = shared_prefixes([first, second])
+    assert shared[1] >= len(prefix)
+
+
+def test_classic_layout_is_the_original_prompt(tmp_path):
+    db = MarketingDatabase(str(tmp_path / "data.json"), dedup=False)
+    engineer = PromptEngineer(db, cache=False)
+    assert engineer.layout == "classic"
+    style = engineer.style_guides["ad_copy"]
+    examples = db.find_similar_examples("ad_copy", "running shoes", "energetic", "athletes", n_results=2)
+    for brand_voice in (None, "Bold and direct"):
+        args = ("running shoes", "energetic", "athletes", ["light", "grippy"], brand_voice, examples)
+        assert engineer.templates["ad_copy"].render(*args) == _original_prompt(style, *args)
+
+    # Classic prompts still lead with the request, so they part ways early
+    first, second = engineer.create_prompts([BASE, VARIED])
+    assert shared_prefixes([first, second])[1] < first.index("TASK:")
@@ -0,0 +1,179 @@
+"""
+ResilientBackend: the circuit breaker under errors, timeouts and
+cancellation, and retries / hedges each taking their own scheduler turn.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from llm_backends import BackendError, LLMBackend
+from resilience import CircuitOpenError, ResilientBackend
+from scheduler import RateLimitScheduler
+
+
+class ScriptedBackend(LLMBackend):
+    """Each call takes the next step: an exception to raise, seconds to sleep, or "ok" """
+
+    name = "scripted"
+
+    def __init__(self, *steps):
+        self.steps = list(steps)
+        self.calls = 0
+
+    def _step(self):
+        self.calls += 1
+        return self.steps.pop(0) if self.steps else "ok"
+
+    def _reply(self):
+        return {"content": f"reply {self.calls}", "model": "scripted",
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5}}
+
+    def complete(self, prompt, content_type, topic, tone):
+        step = self._step()
+        if isinstance(step, BaseException):
+            raise step
+        if isinstance(step, float):
+            time.sleep(step)
+        return self._reply()
+
+    async def acomplete(self, prompt, content_type, topic, tone):
+        step = self._step()
+        if isinstance(step, BaseException):
+            raise step
+        if isinstance(step, float):
+            await asyncio.sleep(step)
+        return self._reply()
+
+    async def astream(self, prompt, content_type, topic, tone, response):
+        step = self._step()
+        if isinstance(step, float):
+            await asyncio.sleep(step)
+        for piece in ("one ", "two"):
+            yield piece
+
+
+def _resilient(backend, **options):
+    return ResilientBackend(backend, **{"retries": 0, "base_backoff": 0.001, "failure_threshold": 3,
+                                        "reset_timeout": 0.05, **options})
+
+
+def _call(resilient):
+    return resilient.complete("prompt", "ad_copy", "shoes", "casual")
+
+
+def test_breaker_opens_then_half_open_trial_closes_it():
+    resilient = _resilient(ScriptedBackend(*[BackendError("down", status=503)] * 3))
+    for _ in range(3):
+        with pytest.raises(BackendError):
+            _call(resilient)
+    assert resilient.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        _call(resilient)
+
+    time.sleep(0.06)
+    assert _call(resilient)["content"]
+    assert resilient.breaker.state == "closed" and resilient.breaker.failures == 0
+
+
+def test_failed_trial_opens_the_circuit_again():
+    resilient = _resilient(ScriptedBackend(*[ConnectionRefusedError()] * 4))
+    for _ in range(3):
+        with pytest.raises(OSError):
+            _call(resilient)
+    time.sleep(0.06)
+    with pytest.raises(OSError):
+        _call(resilient)
+    assert resilient.breaker.state == "open" and resilient.breaker.times_opened == 2
+
+
+def test_backend_timeouts_count_as_failures():
+    resilient = _resilient(ScriptedBackend(*[TimeoutError()] * 3))
+    for _ in range(3):
+        with pytest.raises(TimeoutError):
+            _call(resilient)
+    assert resilient.breaker.state == "open"
+
+
+def test_client_errors_do_not_open_the_circuit():
+    resilient = _resilient(ScriptedBackend(*[BackendError("bad request", status=400)] * 5))
+    for _ in range(5):
+        with pytest.raises(BackendError):
+            _call(resilient)
+    assert resilient.breaker.state == "closed"
+
+
+def test_cancelled_call_leaves_failures_alone():
+    resilient = _resilient(ScriptedBackend(ConnectionResetError(), ConnectionResetError(), 1.0))
+    for _ in range(2):
+        with pytest.raises(OSError):
+            _call(resilient)
+
+    async def give_up():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(resilient.acomplete("prompt", "ad_copy", "shoes", "casual"), 0.05)
+
+    asyncio.run(give_up())
+    assert resilient.breaker.state == "closed" and resilient.breaker.failures == 2
+
+
+def test_cancelled_trial_keeps_the_circuit_half_open():
+    resilient = _resilient(ScriptedBackend(*[ConnectionResetError()] * 3, 1.0))
+    for _ in range(3):
+        with pytest.raises(OSError):
+            _call(resilient)
+    time.sleep(0.06)
+
+    async def give_up_on_trial():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(resilient.acomplete("prompt", "ad_copy", "shoes", "casual"), 0.05)
+        stream = resilient.astream("prompt", "ad_copy", "shoes", "casual", {})
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(stream.__anext__(), 0.05)
+
+    resilient.backend.steps = [1.0, 1.0]
+    asyncio.run(give_up_on_trial())
+    assert resilient.breaker.state == "half_open"
+    assert resilient.breaker.allow()  # The trial slot was freed
+
+
+def test_each_retry_takes_a_scheduler_turn_and_429s_pause_it(make_generator):
+    backend = ScriptedBackend(BackendError("slow down", status=429, retry_after=0.05))
+    scheduler = RateLimitScheduler(requests_per_minute=6000)
+    generator = make_generator(_resilient(backend, retries=2), scheduler=scheduler)
+
+    result = asyncio.run(generator.agenerate("ad_copy", "coffee subscription", use_cache=False))
+    assert result["success"]
+    assert backend.calls == 2
+    assert scheduler.granted == 2
+    assert scheduler.rate_limited == 1
+
+
+def test_hedged_copies_are_scheduled_and_their_spend_recorded(make_generator):
+    backend = ScriptedBackend(0.3, 0.0)
+    scheduler = RateLimitScheduler(requests_per_minute=6000)
+    generator = make_generator(_resilient(backend, hedge=True, hedge_after=0.05), scheduler=scheduler)
+
+    result = generator.generate("ad_copy", "coffee subscription", use_cache=False)
+    assert result["success"]
+    time.sleep(0.4)  # The slow first copy finishes in the background
+    assert scheduler.granted == 2
+    (counters,) = [c for (content_type, _), c in generator.usage.totals.items() if content_type == "ad_copy"]
+    assert counters["requests"] == 1 and counters["discarded"] == 1
+    assert counters["prompt_tokens"] == 20
+
+
+def test_waiting_for_a_scheduler_turn_does_not_trigger_hedges(make_generator):
+    backend = ScriptedBackend()
+    scheduler = RateLimitScheduler(requests_per_minute=120, burst_seconds=0.5)  # One at a time, 2 a second
+    resilient = _resilient(backend, hedge=True, hedge_after=0.1)
+    generator = make_generator(resilient, scheduler=scheduler)
+
+    async def main():
+        return await asyncio.gather(*(generator.agenerate("ad_copy", f"topic {i}", use_cache=False)
+                                      for i in range(3)))
+
+    assert all(result["success"] for result in asyncio.run(main()))
+    assert resilient.counts["hedges"] == 0
+    assert scheduler.granted == backend.calls == 3
@@ -0,0 +1,66 @@
+"""
+Response cache in front of the model: hits, bypassing it, and what its
+key depends on.
+"""
+
+import pytest
+
+from llm_backends import LLMBackend
+from response_cache import ResponseCache
+
+REQUEST = {"content_type": "email_campaigns", "topic": "coffee subscription", "tone": "warm"}
+
+
+class CountingBackend(LLMBackend):
+    name = "counting"
+
+    def __init__(self, temperature=0.7):
+        self.temperature = temperature
+        self.calls = 0
+
+    def complete(self, prompt, content_type, topic, tone):
+        self.calls += 1
+        return {"content": f"Reply number {self.calls} about {topic}", "model": "gpt-4o-mini"}
+
+    def cache_params(self):
+        return {"backend": self.name, "temperature": self.temperature}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "cache"))
+
+
+def test_identical_request_is_a_hit(make_generator, cache):
+    backend = CountingBackend()
+    generator = make_generator(backend, cache)
+    first = generator.generate(**REQUEST)
+    # Padding and the examples the first call added don't change the key
+    second = generator.generate(**{**REQUEST, "topic": "  coffee subscription "})
+    assert backend.calls == 1
+    assert second["cached"] and second["content"] == first["content"]
+    assert second["tokens_used"] == 0 and not second["saved_to_db"]
+    assert generator.response_cache.hits == 1
+
+
+def test_use_cache_false_calls_the_model(make_generator, cache):
+    backend = CountingBackend()
+    generator = make_generator(backend, cache)
+    generator.generate(**REQUEST)
+    bypassed = generator.generate(**REQUEST, use_cache=False)
+    assert backend.calls == 2
+    assert not bypassed["cached"] and bypassed["content"] == "Reply number 2 about coffee subscription"
+    # ...and doesn't overwrite what is cached
+    assert generator.generate(**REQUEST)["content"] == "Reply number 1 about coffee subscription"
+
+
+def test_key_follows_backend_cache_params(make_generator, cache):
+    warm = make_generator(CountingBackend(temperature=0.7), cache)
+    spec = warm._normalize_request(REQUEST)
+    warm.generate(**REQUEST)
+
+    hot_backend = CountingBackend(temperature=1.2)
+    hot = make_generator(hot_backend, cache)
+    assert hot._request_key(spec) != warm._request_key(spec)
+    assert not hot.generate(**REQUEST)["cached"]
+    assert hot_backend.calls == 1
@@ -0,0 +1,36 @@
+"""
+BM25 ranking: field weights and the per-term champion lists.
+"""
+
+from retrieval import BM25Index, tokenize
+
+
+def test_topic_match_outranks_content_only_match():
+    index = BM25Index()
+    index.build([
+        (0, {"topic": "garden tools", "content": "Everything you need for running a garden"}),
+        (1, {"topic": "running shoes", "content": "Light and grippy for every trail"}),
+        (2, {"topic": "coffee", "content": "Fresh beans every morning"}),
+    ])
+    ranked = [doc_id for doc_id, _ in index.search("running", k=3)]
+    assert ranked == [1, 0]  # Topic counts 3x content; no match, no result
+
+
+def test_champion_list_keeps_only_the_best_postings():
+    index = BM25Index(champion_size=3)
+    # Documents 0-4 mention "shoes" once in their content; 5 and 6 in the topic
+    for doc_id in range(5):
+        index.add(doc_id, {"topic": "sale", "content": "shoes for everyone"})
+    index.add(5, {"topic": "shoes", "content": "trail shoes"})
+    index.add(6, {"topic": "shoes", "content": "road"})
+
+    postings = index.champions["shoes"]
+    assert len(postings) == 3
+    assert {5, 6} <= {doc_id for _, doc_id in postings}
+    assert index.doc_freq["shoes"] == 7  # Document frequency still counts everyone
+    assert [doc_id for doc_id, _ in index.search("shoes", k=10)][:2] == [5, 6]
+    assert len(index.search("shoes", k=10)) == 3
+
+
+def test_tokenize_drops_stopwords_and_single_characters():
+    assert tokenize("The BEST shoes for a 5k & you!") == ["best", "shoes", "5k"]
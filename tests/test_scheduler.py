@@ -0,0 +1,118 @@
+"""
+RateLimitScheduler: lane and flow order, 429 pauses, token accounting,
+and cancelled waiters.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from fake_llm_server import FakeLLMServer
+from llm_backends import BackendError, HTTPBackend
+from scheduler import RateLimitScheduler
+
+
+def _one_at_a_time():
+    """A fresh grant every 0.1 s, none saved up"""
+    return RateLimitScheduler(requests_per_minute=600, burst_seconds=0.1)
+
+
+def _grant_order(scheduler, jobs):
+    """Run (name, lane, flow) jobs, queued in that order behind a first call; returns who went when"""
+    order = []
+
+    def job(name):
+        async def run():
+            order.append(name)
+            return {}
+        return run
+
+    async def main():
+        await scheduler.acall(job("first"), 0)
+        tasks = []
+        for name, lane, flow in jobs:
+            tasks.append(asyncio.ensure_future(scheduler.acall(job(name), 0, lane, flow)))
+            await asyncio.sleep(0)  # Queued in this order
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    return order[1:]
+
+
+def test_interactive_lane_goes_first():
+    order = _grant_order(_one_at_a_time(), [
+        ("bulk 1", "bulk", None), ("bulk 2", "bulk", None), ("click", "interactive", None),
+    ])
+    assert order == ["click", "bulk 1", "bulk 2"]
+
+
+def test_flows_take_turns():
+    order = _grant_order(_one_at_a_time(), [
+        ("big 1", "bulk", "big"), ("big 2", "bulk", "big"), ("big 3", "bulk", "big"), ("small", "bulk", "small"),
+    ])
+    assert order == ["big 1", "small", "big 2", "big 3"]
+
+
+def test_unknown_lane_is_refused():
+    with pytest.raises(ValueError):
+        RateLimitScheduler(requests_per_minute=60).call(lambda: {}, 0, lane="urgent")
+
+
+def test_429_pauses_every_lane():
+    scheduler = RateLimitScheduler(requests_per_minute=6000)
+
+    def rate_limited():
+        raise BackendError("slow down", status=429, retry_after=0.3)
+
+    with pytest.raises(BackendError):
+        scheduler.call(rate_limited, 10)
+    assert scheduler.rate_limited == 1
+    started = time.monotonic()
+    scheduler.call(lambda: {}, 10, lane="bulk")
+    assert time.monotonic() - started >= 0.25
+
+
+def test_server_429_reaches_the_scheduler():
+    server = FakeLLMServer(port=0, latency=0.0, requests_per_minute=1)
+    backend = HTTPBackend(server.start_background())
+    scheduler = RateLimitScheduler(requests_per_minute=6000)
+
+    async def main():
+        await scheduler.acall(lambda: backend.acomplete("hello", "ad_copy", "shoes", "casual"), 10)
+        with pytest.raises(BackendError) as raised:
+            await scheduler.acall(lambda: backend.acomplete("hello", "ad_copy", "shoes", "casual"), 10)
+        backend.close()
+        return raised.value
+
+    error = asyncio.run(main())
+    assert error.status == 429 and error.retry_after > 0
+    assert scheduler.rate_limited == 1
+    assert scheduler.stats()["paused_seconds"] > 0
+
+
+def test_reported_usage_corrects_the_token_estimate():
+    scheduler = RateLimitScheduler(tokens_per_minute=6000, completion_tokens=300)
+    full = scheduler.tokens.level
+    scheduler.call(lambda: {"usage": {"prompt_tokens": 100, "completion_tokens": 50}}, 100)
+    assert full - scheduler.tokens.level == pytest.approx(150, abs=5)  # Not the 400 estimated
+    assert scheduler.completion_tokens == pytest.approx(275)
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    scheduler = _one_at_a_time()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        return {}
+
+    async def main():
+        await scheduler.acall(work, 0)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(scheduler.acall(work, 0), 0.01)
+        assert scheduler.stats()["waiting"] == {"interactive": 0, "bulk": 0}
+        await scheduler.acall(work, 0)
+
+    asyncio.run(main())
+    assert len(calls) == 2 and scheduler.granted == 2
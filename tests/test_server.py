@@ -0,0 +1,110 @@
+"""
+The HTTP API turns malformed requests away with a 400 (411 for a chunked
+body), and gives up on a body that never arrives.
+"""
+
+import http.client
+import json
+import socket
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlsplit
+
+import pytest
+
+from content_generator import MarketingContentGenerator
+from database import MarketingDatabase
+from server import GenerationServer
+
+
+@pytest.fixture(scope="module")
+def generator(tmp_path_factory):
+    database = MarketingDatabase(str(tmp_path_factory.mktemp("server") / "data.json"), dedup=False)
+    return MarketingContentGenerator(response_cache=False, database=database)
+
+
+@pytest.fixture(scope="module")
+def base_url(generator):
+    return GenerationServer(generator, port=0, workers=2).start_background()
+
+
+def _post(base_url, path, payload):
+    request = urllib.request.Request(base_url + path, json.dumps(payload).encode("utf-8"),
+                                     {"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_valid_requests_are_served(base_url):
+    status, payload = _post(base_url, "/generate", {"content_type": "ad_copy", "topic": "coffee",
+                                                    "key_points": ["fresh"], "brand_voice": None})
+    assert status == 200 and payload["success"]
+    status, payload = _post(base_url, "/generate/batch", {
+        "requests": [{"content_type": "ad_copy", "topic": "coffee"}], "concurrency": 2, "timeout": 5,
+    })
+    assert status == 200 and len(payload["results"]) == 1
+
+
+@pytest.mark.parametrize("fields", [
+    {"tone": 3},
+    {"target_audience": ["students"]},
+    {"brand_voice": {"name": "x"}},
+    {"key_points": "quality"},
+    {"key_points": ["quality", 2]},
+    {"use_cache": "yes"},
+    {"timeout": -1},
+])
+def test_bad_generate_fields_are_rejected(base_url, fields):
+    status, payload = _post(base_url, "/generate", {"content_type": "ad_copy", "topic": "coffee", **fields})
+    assert status == 400, payload
+
+
+@pytest.mark.parametrize("options", [
+    {"concurrency": 0},
+    {"concurrency": "lots"},
+    {"concurrency": 2.5},
+    {"timeout": 0},
+    {"timeout": "soon"},
+    {"use_cache": 1},
+])
+def test_bad_batch_options_are_rejected(base_url, options):
+    status, payload = _post(base_url, "/generate/batch",
+                            {"requests": [{"content_type": "ad_copy", "topic": "coffee"}], **options})
+    assert status == 400, payload
+
+
+def test_chunked_body_is_refused_with_411(base_url):
+    host, port = urlsplit(base_url).hostname, urlsplit(base_url).port
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    body = iter([json.dumps({"content_type": "ad_copy", "topic": "coffee"}).encode("utf-8")])
+    connection.request("POST", "/generate", body, {"Content-Type": "application/json"}, encode_chunked=True)
+    response = connection.getresponse()
+    assert response.status == 411
+    assert "Content-Length" in json.load(response)["error"]
+    connection.close()
+
+
+@pytest.mark.parametrize("content_type", ["press_release", "../../evil", "ad_copy/../../x"])
+def test_unknown_content_types_are_rejected_and_not_stored(base_url, generator, content_type):
+    before = generator.db.get_stats()
+    status, payload = _post(base_url, "/generate", {"content_type": content_type, "topic": "coffee"})
+    assert status == 400 and "content_type" in payload["error"]
+    status, payload = _post(base_url, "/generate/batch", {"requests": [
+        {"content_type": "ad_copy", "topic": "coffee"}, {"content_type": content_type, "topic": "coffee"},
+    ]})
+    assert status == 400 and payload["error"].startswith("Request 1:")
+    assert generator.db.get_stats() == before
+    assert content_type not in generator.usage.to_prometheus()
+
+
+def test_stalled_body_is_dropped_after_the_keepalive_timeout(generator):
+    url = GenerationServer(generator, port=0, workers=1, keepalive_timeout=0.3).start_background()
+    with socket.create_connection((urlsplit(url).hostname, urlsplit(url).port), timeout=5) as client:
+        client.sendall(b"POST /generate HTTP/1.1\r\nHost: x\r\nContent-Length: 4194304\r\n\r\n{")
+        started = time.monotonic()
+        assert client.recv(1024) == b""  # Closed without an answer
+        assert time.monotonic() - started < 3
@@ -0,0 +1,44 @@
+"""
+SQLite storage: seeding a new database, and two connections (as two app
+processes would have) seeing each other's inserts.
+"""
+
+from database import default_examples
+from sqlite_database import SQLiteMarketingDatabase
+
+TEXT = "Fresh running shoes for every trail: light, grippy and built to last all season long"
+
+
+def test_new_database_starts_with_default_examples(tmp_path):
+    db = SQLiteMarketingDatabase(str(tmp_path / "data.db"))
+    assert db.get_stats() == {k: len(v) for k, v in default_examples().items()}
+    db.close()
+
+    reopened = SQLiteMarketingDatabase(str(tmp_path / "data.db"))  # Not seeded twice
+    assert sum(reopened.get_stats().values()) == sum(len(v) for v in default_examples().values())
+    reopened.close()
+
+
+def test_other_connections_inserts_reach_listeners(tmp_path):
+    first = SQLiteMarketingDatabase(str(tmp_path / "data.db"))
+    second = SQLiteMarketingDatabase(str(tmp_path / "data.db"))
+    heard = []
+    first.add_listener(heard.append)
+    first.find_similar_examples("ad_copy", "shoes")
+    assert heard == []
+
+    second.add_example("social_media", TEXT, {"topic": "trail shoes"})
+    assert TEXT in first.find_similar_examples("social_media", "trail shoes")
+    assert heard == ["social_media"]
+    first.close()
+    second.close()
+
+
+def test_near_duplicates_from_other_connections_are_caught(tmp_path):
+    first = SQLiteMarketingDatabase(str(tmp_path / "data.db"))
+    second = SQLiteMarketingDatabase(str(tmp_path / "data.db"))
+    assert first.add_example("ad_copy", "A warm wool blanket for cold winter nights by the fire", {})
+    assert second.add_example("ad_copy", TEXT, {})  # first's detector is built by now
+    assert not first.add_example("ad_copy", TEXT + "!", {})
+    first.close()
+    second.close()
@@ -0,0 +1,48 @@
+"""
+Streaming through the generator, including a model that sends nothing.
+"""
+
+import asyncio
+
+from llm_backends import LLMBackend
+
+
+class EmptyStreamBackend(LLMBackend):
+    name = "empty"
+
+    def stream(self, prompt, content_type, topic, tone, response):
+        return iter(())
+
+    async def astream(self, prompt, content_type, topic, tone, response):
+        for piece in ():
+            yield piece
+
+
+def test_stream_yields_text_and_result(make_generator):
+    generator = make_generator()
+    stream = generator.generate_stream("ad_copy", "coffee subscription", "warm")
+    text = "".join(stream)
+    assert text and stream.result["success"]
+    assert stream.result["content"] == text
+    assert stream.result["time_to_first_token"] >= 0
+
+
+def test_empty_stream_is_an_error_result(make_generator):
+    generator = make_generator(EmptyStreamBackend())
+    stream = generator.generate_stream("ad_copy", "coffee subscription")
+    assert list(stream) == []
+    assert not stream.result["success"]
+    assert "no content" in stream.result["error"]
+
+
+def test_empty_async_stream_is_an_error_result(make_generator):
+    generator = make_generator(EmptyStreamBackend())
+
+    async def main():
+        stream = generator.agenerate_stream("ad_copy", "coffee subscription")
+        return [piece async for piece in stream], stream.result
+
+    pieces, result = asyncio.run(main())
+    assert pieces == []
+    assert not result["success"]
+    assert "no content" in result["error"]
@@ -0,0 +1,54 @@
+"""
+Usage accounting (the rolling windows and the totals agree) and the
+stage tracer.
+"""
+
+import json
+
+from telemetry import NULL_SPAN, Tracer, UsageTracker
+
+
+def test_cached_and_coalesced_requests_count_in_windows_and_totals():
+    tracker = UsageTracker()
+    tracker.record("ad_copy", "gpt-4o", 100, 20, 0.001)
+    tracker.record("ad_copy", "gpt-4o", 0, 0, 0.0, cached=True)
+    tracker.record("ad_copy", "gpt-4o", 0, 0, 0.0, coalesced=True)
+
+    (totals,) = tracker.to_dict()["totals"]
+    for window in tracker.to_dict()["rolling"].values():
+        for field in ("requests", "cached", "coalesced", "prompt_tokens", "completion_tokens"):
+            assert window[field] == totals[field]
+    assert (totals["requests"], totals["cached"], totals["coalesced"]) == (3, 1, 1)
+
+
+def test_disabled_tracer_hands_out_the_null_span(tmp_path):
+    tracer = Tracer()
+    with tracer.span("model_call") as span:
+        assert span is NULL_SPAN
+    assert tracer.summary() == {}
+    assert tracer.dump_chrome_trace(str(tmp_path / "trace.json")) == 0
+
+
+def test_summary_percentiles_for_known_durations():
+    tracer = Tracer(enabled=True)
+    for ms in range(100, 0, -1):  # 1ms to 100ms, out of order
+        tracer.record("db_write", 0, ms * 1_000_000)
+    stats = tracer.summary()["db_write"]
+    assert stats["count"] == 100 and stats["mean_ms"] == 50.5
+    assert (stats["p50_ms"], stats["p90_ms"], stats["p99_ms"], stats["max_ms"]) == (51, 91, 100, 100)
+
+
+def test_chrome_trace_holds_nested_spans(tmp_path):
+    tracer = Tracer(enabled=True)
+    with tracer.span("generate"):
+        with tracer.span("build_prompt"):
+            pass
+    path = tmp_path / "trace.json"
+    assert tracer.dump_chrome_trace(str(path)) == 2
+
+    with open(path, encoding="utf-8") as f:
+        events = {event["name"]: event for event in json.load(f)["traceEvents"]}
+    outer, inner = events["generate"], events["build_prompt"]
+    assert outer["ph"] == inner["ph"] == "X"
+    assert outer["ts"] <= inner["ts"]
+    assert inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
@@ -0,0 +1,22 @@
+"""
+Token estimates: only stored examples are cached, prompts are not.
+"""
+
+from tokens import count_tokens, estimate_tokens, pack_examples
+
+
+def test_cached_and_uncached_estimates_agree():
+    text = "🏃‍♂️ Run Faster, Feel Lighter. Our cloud-foam technology makes every step feel like flying."
+    assert estimate_tokens(text) == count_tokens(text) > 0
+
+
+def test_counting_prompts_does_not_fill_the_cache():
+    before = estimate_tokens.cache_info().currsize
+    for i in range(100):
+        count_tokens(f"A one-off prompt number {i}")
+    assert estimate_tokens.cache_info().currsize == before
+
+
+def test_pack_examples_skips_what_does_not_fit():
+    assert pack_examples(["short one", "x " * 500, "another short one"], 2, budget=50) == \
+        ["short one", "another short one"]
@@ -0,0 +1,79 @@
+"""
+Several variants from one prompt: one backend call, distinct replies, and
+a response cache entry of their own.
+"""
+
+from content_generator import MarketingContentGenerator
+from llm_backends import DemoBackend, LLMBackend
+from response_cache import ResponseCache
+
+
+class CountingDemoBackend(DemoBackend):
+    """Records the calls the generator makes (not the ones complete_variants makes itself)"""
+
+    def __init__(self):
+        super().__init__(MarketingContentGenerator.DEMO_CONTENT)
+        self.calls = []
+        self._in_variants = False
+
+    def complete(self, prompt, content_type, topic, tone):
+        if not self._in_variants:
+            self.calls.append("complete")
+        return super().complete(prompt, content_type, topic, tone)
+
+    def complete_variants(self, prompt, content_type, topic, tone, n):
+        self.calls.append(("variants", n))
+        self._in_variants = True
+        try:
+            return super().complete_variants(prompt, content_type, topic, tone, n)
+        finally:
+            self._in_variants = False
+
+
+class NumberedBackend(LLMBackend):
+    """Every reply is different and reports its usage"""
+
+    name = "numbered"
+
+    def __init__(self):
+        self.count = 0
+
+    def complete(self, prompt, content_type, topic, tone):
+        self.count += 1
+        return {"content": f"reply {self.count}", "model": "gpt-4o",
+                "usage": {"prompt_tokens": 10, "completion_tokens": 2}}
+
+
+def test_variants_come_from_one_backend_call(make_generator):
+    backend = CountingDemoBackend()
+    generator = make_generator(backend)
+    result = generator.generate("ad_copy", "organic coffee", "warm", n_variants=3)
+    assert result["success"]
+    assert backend.calls == [("variants", 3)]
+    assert len(result["variants"]) == len(set(result["variants"])) == 3
+    assert result["content"] == result["variants"][0]
+
+
+def test_default_variants_are_distinct_and_usage_adds_up(make_generator):
+    generator = make_generator(NumberedBackend())
+    result = generator.generate("ad_copy", "organic coffee", n_variants=4)
+    assert sorted(result["variants"]) == ["reply 1", "reply 2", "reply 3", "reply 4"]
+    assert result["prompt_tokens"] == 40 and result["completion_tokens"] == 8
+
+
+def test_variant_count_is_part_of_the_cache_key(make_generator, tmp_path):
+    backend = CountingDemoBackend()
+    cache = ResponseCache(str(tmp_path / "cache"))
+    generator = make_generator(backend, response_cache=cache)
+
+    first = generator.generate("ad_copy", "organic coffee", "warm", n_variants=3)
+    again = generator.generate("ad_copy", "organic coffee", "warm", n_variants=3)
+    assert again["cached"] and again["variants"] == first["variants"]
+    assert backend.calls == [("variants", 3)]
+
+    # A single reply isn't served from the three-variant entry, nor the other way round
+    single = generator.generate("ad_copy", "organic coffee", "warm")
+    assert not single["cached"] and "variants" not in single
+    assert backend.calls == [("variants", 3), "complete"]
+    two = generator.generate("ad_copy", "organic coffee", "warm", n_variants=2)
+    assert not two["cached"] and len(two["variants"]) == 2
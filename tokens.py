@@ -0,0 +1,72 @@
+"""
+Token Estimation
+A quick local stand-in for the model's tokenizer, good enough to keep
+prompts inside a budget without downloading anything.
+"""
+
+import re
+from functools import lru_cache
+
+# Roughly how BPE tokenizers split text: runs of letters, short groups of
+# digits, and every other symbol (punctuation, emoji) on its own
+PIECES = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+
+# What "--- EXAMPLE n ---" and the blank lines around an example cost
+EXAMPLE_OVERHEAD = 8
+
+
+def count_tokens(text):
+    """
+    Approximate token count of text.
+    Long words count as several tokens (about one per 6 letters); non-ASCII
+    symbols such as emoji usually take two. Use this for one-off text such
+    as whole prompts and replies.
+    """
+    count = 0
+    for piece in PIECES.findall(text):
+        if piece.isascii():
+            count += 1 + (len(piece) - 1) // 6
+        else:
+            count += 2
+    return count
+
+
+@lru_cache(maxsize=65536)
+def estimate_tokens(text):
+    """
+    count_tokens, cached per string: for stored examples, which are
+    measured again for every prompt they might go into. Don't pass it
+    prompts or replies - each unique one would sit in the cache.
+    """
+    return count_tokens(text)
+
+
+def pack_examples(candidates, max_examples, budget=None):
+    """
+    Pick few-shot examples for a prompt.
+
+    candidates come best match first. Each one is taken if it still fits
+    in the token budget, until max_examples are chosen; an example that is
+    too long is skipped in favour of the next, shorter one. budget=None
+    keeps the old behaviour (the first max_examples, whatever their size).
+    """
+    if budget is None:
+        return list(candidates[:max_examples])
+
+    chosen = []
+    remaining = budget
+    for example in candidates:
+        if len(chosen) >= max_examples:
+            break
+        cost = estimate_tokens(example) + EXAMPLE_OVERHEAD
+        if cost <= remaining:
+            chosen.append(example)
+            remaining -= cost
+    return chosen
+
+
+if __name__ == "__main__":
+    sample = "🏃‍♂️ Run Faster, Feel Lighter. Our cloud-foam technology makes every step feel like flying."
+    print(f"{estimate_tokens(sample)} tokens (approx.) for: {sample}")
+    picked = pack_examples(["short one", "x " * 500, "another short one"], 2, budget=50)
+    print(f"Packed {len(picked)} examples into a 50 token budget: {picked}")